@@ -0,0 +1,85 @@
+"""Move finished bookings out of the hot `bookings` table into `bookings_archive`.
+
+    python archive.py --older-than-days 365
+    POST /api/admin/archive-bookings?olderThanDays=365
+
+Analytics, overlap checks and listings only ever need recent and future
+bookings, but every one of them pays for years of returned and cancelled
+rows in the table and its indexes. Rows whose return_date_time is older
+than the cutoff are moved in chunks, oldest first, each chunk in its own
+transaction: copy into the archive, then delete exactly the rows that
+were copied. An interrupted run therefore leaves every booking in exactly
+one table, and the next run simply continues with what is left.
+
+Historical reads go through database.booking_history() (hot UNION ALL
+archive); archived rows keep their id, reference and row_version.
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert, literal, select
+
+import database
+from database import Booking, BookingArchive, BOOKING_COLUMN_NAMES
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_CHUNK_ROWS = int(os.getenv("ARCHIVE_CHUNK_ROWS", "1000"))
+
+
+def archive_chunk(conn, cutoff: datetime, chunk_rows: int, archived_at: datetime) -> int:
+    """Move up to `chunk_rows` bookings returned before `cutoff`; returns how many moved."""
+    hot, cold = Booking.__table__, BookingArchive.__table__
+    oldest = select(hot.c.id).where(hot.c.return_date_time < cutoff).order_by(hot.c.return_date_time).limit(chunk_rows)
+    if conn.dialect.name == "postgresql":
+        # Lock the chunk so a concurrent update cannot land between the copy and the delete.
+        oldest = oldest.with_for_update(skip_locked=True)
+    moved = conn.execute(insert(cold).from_select(
+        [*BOOKING_COLUMN_NAMES, "archived_at"],
+        select(*(hot.c[n] for n in BOOKING_COLUMN_NAMES), literal(archived_at)).where(hot.c.id.in_(oldest)),
+    ).returning(cold.c.id)).scalars().all()
+    if moved:
+        conn.execute(hot.delete().where(hot.c.id.in_(moved)))
+    return len(moved)
+
+
+def archive_bookings(older_than_days: int = ARCHIVE_AFTER_DAYS, chunk_rows: int = ARCHIVE_CHUNK_ROWS,
+                     max_chunks: Optional[int] = None, engine=None, now: Optional[datetime] = None) -> dict:
+    """Archive bookings returned more than `older_than_days` ago, `chunk_rows` per transaction.
+
+    `max_chunks` bounds one run (e.g. per request); `remaining` says whether
+    eligible rows are left for the next one.
+    """
+    engine = engine or database.engine
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+    archived = chunks = 0
+    remaining = True
+    while max_chunks is None or chunks < max_chunks:
+        with engine.begin() as conn:
+            moved = archive_chunk(conn, cutoff, chunk_rows, now)
+        if moved:
+            archived += moved
+            chunks += 1
+        if moved < chunk_rows:
+            remaining = False
+            break
+    return {"archived": archived, "chunks": chunks, "cutoff": cutoff.isoformat(), "remaining": remaining}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--chunk-rows", type=int, default=ARCHIVE_CHUNK_ROWS)
+    parser.add_argument("--max-chunks", type=int, default=None)
+    args = parser.parse_args()
+
+    database.init_db()
+    stats = archive_bookings(args.older_than_days, args.chunk_rows, args.max_chunks)
+    print(f"Archived {stats['archived']:,} bookings returned before {stats['cutoff']} in {stats['chunks']} chunks"
+          + (" (more remain)" if stats["remaining"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Car assignment strategies and the re-optimization pass.
+
+create_booking may give a window to any free car of the category; which one
+matters over time. Picking the first free car in fleet order (first-fit)
+scatters rentals across the fleet, leaving many short idle gaps, and a long
+rental can later fail although the fleet has plenty of idle time in total.
+
+- first_fit: first free car in fleet order (the historical behaviour).
+- best_fit: the car whose idle gap around the window is smallest, i.e. the
+  tightest hole that still contains it; cars idle on one or both sides are
+  used last, and among those the one whose nearest booking is closest.
+
+Strategies are pure functions over `Gaps` (car_id -> (prev_end, next_start),
+None for an open side), so main.py and bench_assignment.py run the same
+code. Select one with ASSIGNMENT_STRATEGY (default best_fit).
+
+reassign() is the re-optimization pass: future, unstarted bookings of a
+group of identical cars are replaced from scratch with a strategy, around
+fixed occupancy (started bookings, holds). main applies the result only when
+consolidation() improves.
+"""
+import math
+import os
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+Interval = Tuple[datetime, datetime]
+Gap = Tuple[Optional[datetime], Optional[datetime]]
+Gaps = Dict[int, Gap]
+Strategy = Callable[[Sequence[int], Gaps, datetime, datetime], List[int]]
+
+
+def first_fit(car_ids: Sequence[int], gaps: Gaps, start: datetime, end: datetime) -> List[int]:
+    return list(car_ids)
+
+
+def fit_key(gap: Gap, start: datetime, end: datetime) -> Tuple[float, float]:
+    """(hole length, slack left next to the window) in seconds; smaller is a tighter fit."""
+    prev_end, next_start = gap
+    hole = (next_start - prev_end).total_seconds() if prev_end and next_start else math.inf
+    if prev_end is None and next_start is None:
+        return hole, math.inf
+    slack = 0.0
+    if prev_end is not None:
+        slack += (start - prev_end).total_seconds()
+    if next_start is not None:
+        slack += (next_start - end).total_seconds()
+    return hole, slack
+
+
+def best_fit(car_ids: Sequence[int], gaps: Gaps, start: datetime, end: datetime) -> List[int]:
+    # sorted() is stable: ties keep fleet order.
+    return sorted(car_ids, key=lambda c: fit_key(gaps.get(c, (None, None)), start, end))
+
+
+STRATEGIES: Dict[str, Strategy] = {"first_fit": first_fit, "best_fit": best_fit}
+
+
+def get_strategy(name: str) -> Strategy:
+    try:
+        return STRATEGIES[name.strip().lower().replace("-", "_")]
+    except KeyError:
+        raise ValueError(f"Unknown assignment strategy {name!r}; expected one of {sorted(STRATEGIES)}") from None
+
+
+STRATEGY_NAME = os.getenv("ASSIGNMENT_STRATEGY", "best_fit")
+STRATEGY = get_strategy(STRATEGY_NAME)
+
+
+def gap_around(intervals: Iterable[Interval], start: datetime, end: datetime) -> Optional[Gap]:
+    """(prev_end, next_start) around [start, end) in a car's schedule, or None if it overlaps."""
+    prev_end = next_start = None
+    for s, e in intervals:
+        if s < end and e > start:
+            return None
+        if e <= start and (prev_end is None or e > prev_end):
+            prev_end = e
+        elif s >= end and (next_start is None or s < next_start):
+            next_start = s
+    return prev_end, next_start
+
+
+def reassign(
+    movable: Sequence[Tuple[Hashable, datetime, datetime, int]],
+    fixed: Dict[int, List[Interval]],
+    car_ids: Sequence[int],
+    strategy: Strategy = best_fit,
+) -> Optional[Dict[Hashable, int]]:
+    """Place every (key, start, end, current_car) on car_ids around `fixed`; None if one does not fit.
+
+    Bookings are placed by start time, longest first on ties; a booking stays
+    on its current car whenever that is as good as the strategy's choice.
+    """
+    schedule = {c: list(fixed.get(c, ())) for c in car_ids}
+    placed: Dict[Hashable, int] = {}
+    for key, start, end, current in sorted(movable, key=lambda m: (m[1], m[1] - m[2])):
+        gaps = {}
+        for c in car_ids:
+            gap = gap_around(schedule[c], start, end)
+            if gap is not None:
+                gaps[c] = gap
+        if not gaps:
+            return None
+        candidates = sorted(gaps, key=lambda c: c != current)
+        car = strategy(candidates, gaps, start, end)[0]
+        schedule[car].append((start, end))
+        placed[key] = car
+    return placed
+
+
+def consolidation(schedules: Dict[int, List[Interval]], start: datetime, end: datetime) -> float:
+    """Sum of squared idle-block lengths (hours) within [start, end): higher means fewer, longer free blocks.
+
+    Total idle time is the same for any assignment of the same bookings, so
+    this only rewards putting it together.
+    """
+    total = 0.0
+    for intervals in schedules.values():
+        cursor = start
+        for s, e in sorted(intervals):
+            if e <= cursor:
+                continue
+            if s > cursor:
+                total += ((min(s, end) - cursor).total_seconds() / 3600) ** 2
+            cursor = max(cursor, e)
+            if cursor >= end:
+                break
+        if cursor < end:
+            total += ((end - cursor).total_seconds() / 3600) ** 2
+    return total
@@ -0,0 +1,222 @@
+"""Per-car availability bitmaps at 15-minute slot granularity.
+
+Each car's calendar over a rolling horizon (AVAILABILITY_HORIZON_DAYS,
+default 180) is a Python int: bit i is set when an active booking touches
+slot i, the i-th SLOT_MINUTES slot after `start`. A window [pickup, return)
+is then checked against a whole category with one AND per car.
+
+Slots are coarser than bookings, so the bitmap alone is conservative:
+- no shared slot                   -> free (exact);
+- a shared slot strictly inside the window -> busy (exact: that booking
+  reaches into the window);
+- only the window's partial first/last slot is shared -> the car's
+  intervals are checked with the exact overlap rule
+  (start < return AND end > pickup), same as main.overlap_clause.
+
+Temporary holds (main's /api/holds) occupy cars the same way as bookings.
+The engine is built in bulk with one query and updated incrementally by
+this worker's creates/cancels/holds. Other workers' writes are picked up through
+a generation token in the shared app cache (bumped on every write; a
+changed token means rebuild) and, as a backstop, a rebuild after
+MAX_AGE seconds. Windows outside the horizon return None so callers fall
+back to SQL.
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from cache import CacheBackend
+
+SLOT_MINUTES = 15
+SLOT = timedelta(minutes=SLOT_MINUTES)
+HORIZON_DAYS = int(os.getenv("AVAILABILITY_HORIZON_DAYS", "180"))
+MAX_AGE = float(os.getenv("AVAILABILITY_MAX_AGE", "30"))
+ENABLED = os.getenv("AVAILABILITY_BITMAPS", "1") == "1"
+
+Interval = Tuple[datetime, datetime]
+
+
+def floor_slot(dt: datetime) -> datetime:
+    return dt.replace(minute=dt.minute - dt.minute % SLOT_MINUTES, second=0, microsecond=0)
+
+
+class SlotBitmaps:
+    """Bitmaps and intervals for a fixed horizon; not thread-safe on its own."""
+
+    def __init__(self, start: datetime, days: int = HORIZON_DAYS):
+        self.start = floor_slot(start)
+        self.slots = days * 24 * 60 // SLOT_MINUTES
+        self.end = self.start + self.slots * SLOT
+        self.bits: Dict[int, int] = {}
+        # Keys are booking ids, or ("hold", hold_id) for temporary holds.
+        self.intervals: Dict[int, Dict[Hashable, Interval]] = {}  # car_id -> key -> (start, end)
+        self.car_of: Dict[Hashable, int] = {}  # key -> car_id
+
+    def _slot_range(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """[first, last) slot indexes touched by [start, end), clipped to the horizon."""
+        first = int((max(start, self.start) - self.start) // SLOT)
+        last_exact = (min(end, self.end) - self.start) / SLOT
+        last = int(last_exact) + (0 if last_exact == int(last_exact) else 1)
+        return first, max(first, last)
+
+    def _mask(self, start: datetime, end: datetime) -> int:
+        first, last = self._slot_range(start, end)
+        return ((1 << (last - first)) - 1) << first
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return start >= self.start and end <= self.end
+
+    def add(self, key: Hashable, car_id: int, start: datetime, end: datetime) -> None:
+        if end <= start or end <= self.start or start >= self.end:
+            return
+        self.remove(key)
+        self.intervals.setdefault(car_id, {})[key] = (start, end)
+        self.car_of[key] = car_id
+        self.bits[car_id] = self.bits.get(car_id, 0) | self._mask(start, end)
+
+    def remove(self, key: Hashable) -> None:
+        car_id = self.car_of.pop(key, None)
+        if car_id is None:
+            return
+        remaining = self.intervals[car_id]
+        remaining.pop(key, None)
+        bits = 0
+        for s, e in remaining.values():
+            bits |= self._mask(s, e)
+        self.bits[car_id] = bits
+
+    def busy(self, car_ids: Iterable[int], start: datetime, end: datetime) -> Set[int]:
+        first, last = self._slot_range(start, end)
+        window = ((1 << (last - first)) - 1) << first
+        # Slots entirely inside [start, end): any booking touching one overlaps the window.
+        inner_first = first + (0 if start == self.start + first * SLOT else 1)
+        inner_last = last - (0 if end == self.start + last * SLOT else 1)
+        inner = ((1 << (inner_last - inner_first)) - 1) << inner_first if inner_last > inner_first else 0
+        busy = set()
+        for car_id in car_ids:
+            hit = self.bits.get(car_id, 0) & window
+            if not hit:
+                continue
+            if hit & inner or any(s < end and e > start for s, e in self.intervals[car_id].values()):
+                busy.add(car_id)
+        return busy
+
+
+class AvailabilityEngine:
+    """Thread-safe SlotBitmaps kept in sync with the bookings table (see module doc)."""
+
+    def __init__(self, cache: Callable[[], CacheBackend], loader: Callable, days: int = HORIZON_DAYS, max_age: float = MAX_AGE,
+                 clock: Callable[[], datetime] = datetime.utcnow):
+        # A getter, not the backend: serve.py swaps main.app_cache in each forked worker.
+        self._cache = cache
+        # loader(db, start, end) -> iterable of (key, car_id, start, end) for everything occupying a car.
+        self.loader = loader
+        self.days = days
+        self.max_age = max_age
+        # Naive UTC, like the booking and hold timestamps the bitmaps are compared with.
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._maps: Optional[SlotBitmaps] = None
+        self._seen: Optional[str] = None
+        self._built_at = 0.0
+        self.rebuilds = 0
+
+    def _token(self) -> str:
+        cache = self._cache()
+        token = cache.get("availability", "generation")
+        if token is None:
+            token = uuid.uuid4().hex
+            cache.set("availability", "generation", token)
+        return token
+
+    def _stale(self, token: str) -> bool:
+        maps = self._maps
+        return (
+            maps is None
+            or token != self._seen
+            or time.monotonic() - self._built_at > self.max_age
+            # Roll the horizon forward once it is a day old.
+            or self.clock() - maps.start > timedelta(days=2)
+        )
+
+    def rebuild(self, db) -> None:
+        maps = SlotBitmaps(self.clock() - timedelta(days=1), self.days)
+        for key, car_id, start, end in self.loader(db, maps.start, maps.end):
+            maps.add(key, car_id, start, end)
+        self._maps = maps
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    def busy_car_ids(self, db, car_ids: List[int], start: datetime, end: datetime) -> Optional[Set[int]]:
+        """Busy subset of car_ids, rebuilding first if stale; None if the window is off-horizon."""
+        with self._lock:
+            token = self._token()
+            if self._stale(token):
+                self.rebuild(db)
+                self._seen = token
+            if not self._maps.covers(start, end):
+                return None
+            return self._maps.busy(car_ids, start, end)
+
+    def busy_car_ids_if_fresh(self, car_ids: List[int], start: datetime, end: datetime) -> Optional[Set[int]]:
+        """Like busy_car_ids() but never queries: None unless the bitmaps are current."""
+        with self._lock:
+            token = self._cache().get("availability", "generation")
+            if token is None or self._stale(token) or not self._maps.covers(start, end):
+                return None
+            return self._maps.busy(car_ids, start, end)
+
+    def _bump(self) -> None:
+        # Called with the lock held, after a local write was applied.
+        cache = self._cache()
+        previous = cache.get("availability", "generation")
+        token = uuid.uuid4().hex
+        cache.delete("availability", "generation")  # broadcast to other workers' near caches
+        cache.set("availability", "generation", token)
+        # If someone else wrote since our last sync we are missing their change: rebuild next time.
+        # Bitmaps already known to be stale (_seen None) stay stale.
+        self._seen = token if self._seen is not None and previous == self._seen else None
+
+    def mark_stale(self) -> None:
+        """The bitmaps disagreed with the database; rebuild on next use."""
+        with self._lock:
+            self._seen = None
+
+    def booking_added(self, key: Hashable, car_id: int, start: datetime, end: Optional[datetime],
+                      replaces: Optional[Hashable] = None) -> None:
+        """Record a new booking (or hold); `replaces` drops the entry it supersedes in the same step."""
+        with self._lock:
+            if self._maps is not None:
+                if replaces is not None:
+                    self._maps.remove(replaces)
+                if end is not None:
+                    self._maps.add(key, car_id, start, end)
+            self._bump()
+
+    def bookings_added(self, entries: Iterable[Tuple[Hashable, int, datetime, datetime]]) -> None:
+        """booking_added() for a batch of (key, car_id, start, end), with one generation bump."""
+        with self._lock:
+            if self._maps is not None:
+                for key, car_id, start, end in entries:
+                    self._maps.add(key, car_id, start, end)
+            self._bump()
+
+    def booking_removed(self, key: Hashable) -> None:
+        with self._lock:
+            if self._maps is not None:
+                self._maps.remove(key)
+            self._bump()
+
+    def stats(self) -> dict:
+        with self._lock:
+            maps = self._maps
+            return {
+                "enabled": ENABLED,
+                "rebuilds": self.rebuilds,
+                "horizonStart": maps.start.isoformat() if maps else None,
+                "cars": len(maps.bits) if maps else 0,
+                "bookings": len(maps.car_of) if maps else 0,
+            }
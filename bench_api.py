@@ -0,0 +1,191 @@
+"""In-process benchmark of every API endpoint (no server, no network).
+
+    python bench_api.py --cars 500 --bookings 20000 --requests 400 --concurrency 8
+    python bench_api.py --compare bench_results/<older>.json
+
+Drives main.app through httpx's ASGI transport against a throwaway SQLite
+file bulk-loaded by generate_data.py with a synthetic fleet and booking
+history, then reports
+throughput and p50/p95/p99 per endpoint. Each run is written to
+bench_results/<timestamp>-<commit>.json so runs can be diffed across commits.
+Note that ASGI transport awaits background tasks (calendar sync, skipped
+without Google credentials) before returning, so they count towards
+create_booking latency here.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bench_common import git_revision, summarize_ms
+
+ADMIN_HEADERS = {"X-Admin-Key": os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")}
+CATEGORIES = ["Economy", "Sedan", "SUV", "Luxury"]
+HORIZON_START = datetime(2027, 1, 1)
+ENDPOINTS = [
+    "check_availability", "create_booking", "get_booking",
+    "get_all_bookings", "admin_analytics", "cancel_booking",
+]
+
+
+def seed(database, cars: int, bookings: int, rnd: random.Random) -> list:
+    """Bulk-load the fleet and booking history; returns phone numbers of active bookings."""
+    import generate_data
+
+    database.init_db()
+    generate_data.generate(cars, bookings, seed=rnd.randrange(2**31), start=HORIZON_START - timedelta(days=365))
+    with database.engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT DISTINCT phone_number FROM bookings WHERE status != 'cancelled' LIMIT 100000"
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+def window(rnd: random.Random) -> dict:
+    start = HORIZON_START + timedelta(hours=rnd.randrange(0, 24 * 365))
+    return {
+        "pickupDateTime": start.strftime("%Y-%m-%d %H:%M"),
+        "returnDateTime": (start + timedelta(hours=rnd.choice([2, 4, 24, 72]))).strftime("%Y-%m-%d %H:%M"),
+        "carCategory": rnd.choice(CATEGORIES),
+    }
+
+
+def request_factory(name: str, rnd: random.Random, phones: list):
+    """Returns a callable producing (method, url, kwargs) for one request of this endpoint."""
+    cancel_pool = phones[:]
+    rnd.shuffle(cancel_pool)
+
+    def make():
+        if name == "check_availability":
+            return "POST", "/api/check-availability", {"json": window(rnd)}
+        if name == "create_booking":
+            return "POST", "/api/create-booking", {"json": {
+                **window(rnd), "fullName": "Bench Caller", "phoneNumber": f"0311{rnd.randrange(10**7):07d}",
+                "pickupLocation": "Airport", "dropoffLocation": "City",
+            }}
+        if name == "get_booking":
+            return "POST", "/api/get-booking", {"json": {"phoneNumber": rnd.choice(phones)}}
+        if name == "cancel_booking":
+            return "POST", "/api/cancel-booking", {"json": {"phoneNumber": cancel_pool.pop()}}
+        if name == "get_all_bookings":
+            return "GET", "/api/get-all-bookings", {"params": {"limit": 50, "offset": rnd.randrange(0, 500)}, "headers": ADMIN_HEADERS}
+        if name == "admin_analytics":
+            return "GET", "/api/admin/analytics", {"headers": ADMIN_HEADERS}
+        raise ValueError(name)
+
+    return make
+
+
+async def run_endpoint(client, name: str, total: int, concurrency: int, make) -> dict:
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(make())
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                method, url, kwargs = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            r = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - t0)
+            if r.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        **summarize_ms(latencies),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    tmp = tempfile.mkdtemp(prefix="rentacar-bench-api-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["MIGRATION_LOCK_PATH"] = os.path.join(tmp, "migrate.lock")
+    import logging
+    logging.disable(logging.INFO)
+
+    import database
+    import main
+
+    rnd = random.Random(args.seed)
+    t0 = time.perf_counter()
+    phones = seed(database, args.cars, args.bookings, rnd)
+    seed_seconds = time.perf_counter() - t0
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.endpoints:
+            total = min(args.requests, len(phones)) if name == "cancel_booking" else args.requests
+            results[name] = await run_endpoint(client, name, total, args.concurrency, request_factory(name, rnd, phones))
+            r = results[name]
+            print(f"{name:<20} {r['throughput_rps']:>9} req/s  p50={r['p50_ms']:>8}ms  "
+                  f"p95={r['p95_ms']:>8}ms  p99={r['p99_ms']:>8}ms  errors={r['errors']}")
+
+    return {
+        "commit": git_revision(),
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "config": {
+            "cars": args.cars, "bookings": args.bookings, "requests": args.requests,
+            "concurrency": args.concurrency, "seed": args.seed, "seed_seconds": round(seed_seconds, 2),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    print(f"\nvs {baseline_path} ({baseline.get('commit')}):")
+    for name, r in current["results"].items():
+        b = baseline["results"].get(name)
+        if not b:
+            continue
+        def delta(key):
+            return (r[key] - b[key]) / b[key] * 100 if b[key] else 0.0
+        print(f"{name:<20} rps {delta('throughput_rps'):+6.1f}%  p50 {delta('p50_ms'):+6.1f}%  p99 {delta('p99_ms'):+6.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--out-dir", default="bench_results")
+    parser.add_argument("--compare", help="earlier result JSON to diff against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(args.out_dir, f"{stamp}-{report['commit']}.json")
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Wrote {path}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Acceptance rate and utilization of each car-assignment strategy on synthetic demand.
+
+    python bench_assignment.py --cars 8 --days 60 --load 0.9 --seeds 5
+
+Requests arrive in booking order with a random lead time and a duration mix
+of short (hours), daily and long (5-10 day) rentals, sized so booked demand
+is about `--load` of fleet capacity. Each request goes to the car the
+strategy prefers among those free for the window, or is rejected. Strategies
+are the ones create_booking uses (assignment.py); "best_fit+reopt" also runs
+the re-optimization pass on unstarted bookings once per simulated day, as
+REOPTIMIZE_INTERVAL_SECONDS would. Reports, averaged over seeds:
+acceptance (all and long rentals), utilization of fleet hours, and wall time.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import assignment
+from bench_common import git_revision
+
+START = datetime(2027, 1, 1)
+
+
+def demand(rnd: random.Random, cars: int, days: int, load: float) -> list:
+    """[(arrival, start, end, kind)] sorted by arrival."""
+    capacity_hours = cars * days * 24
+    booked_hours = 0.0
+    requests = []
+    while booked_hours < capacity_hours * load:
+        kind = rnd.choices(["short", "daily", "long"], weights=[6, 3, 1])[0]
+        hours = {
+            "short": lambda: rnd.randint(2, 8),
+            "daily": lambda: 24 * rnd.randint(1, 3),
+            "long": lambda: 24 * rnd.randint(5, 10),
+        }[kind]()
+        start = START + timedelta(hours=rnd.randrange(0, days * 24 - hours))
+        arrival = start - timedelta(hours=rnd.randint(1, 14 * 24))
+        requests.append((arrival, start, start + timedelta(hours=hours), kind))
+        booked_hours += hours
+    requests.sort()
+    return requests
+
+
+def simulate(requests: list, cars: int, days: int, strategy, reopt: bool) -> dict:
+    car_ids = list(range(1, cars + 1))
+    schedule = {c: [] for c in car_ids}  # car -> [(start, end, booking_key)]
+    accepted = {"short": 0, "daily": 0, "long": 0}
+    offered = {"short": 0, "daily": 0, "long": 0}
+    next_reopt = None
+    moved = 0
+    for key, (arrival, start, end, kind) in enumerate(requests):
+        if reopt and (next_reopt is None or arrival >= next_reopt):
+            moved += reoptimize(schedule, car_ids, arrival)
+            next_reopt = arrival + timedelta(days=1)
+        offered[kind] += 1
+        gaps = {}
+        for c in car_ids:
+            gap = assignment.gap_around(((s, e) for s, e, _ in schedule[c]), start, end)
+            if gap is not None:
+                gaps[c] = gap
+        if not gaps:
+            continue
+        car = strategy(list(gaps), gaps, start, end)[0]
+        schedule[car].append((start, end, key))
+        accepted[kind] += 1
+
+    horizon_end = START + timedelta(days=days)
+    used = sum(
+        (min(e, horizon_end) - max(s, START)).total_seconds() / 3600
+        for intervals in schedule.values() for s, e, _ in intervals
+    )
+    total = sum(offered.values())
+    return {
+        "acceptance": round(sum(accepted.values()) / total, 4) if total else 0.0,
+        "long_acceptance": round(accepted["long"] / offered["long"], 4) if offered["long"] else 0.0,
+        "utilization": round(used / (len(car_ids) * days * 24), 4),
+        "moved": moved,
+    }
+
+
+def reoptimize(schedule: dict, car_ids: list, now: datetime) -> int:
+    """The same pass main.reoptimize_assignments() runs, on the simulated fleet."""
+    fixed = {c: [(s, e) for s, e, _ in schedule[c] if s <= now] for c in car_ids}
+    movable = [(k, s, e, c) for c in car_ids for s, e, k in schedule[c] if s > now]
+    if len(movable) < 2:
+        return 0
+    placed = assignment.reassign(movable, fixed, car_ids)
+    if placed is None:
+        return 0
+    proposed = {c: list(fixed[c]) for c in car_ids}
+    for k, s, e, _ in movable:
+        proposed[placed[k]].append((s, e))
+    current = {c: [(s, e) for s, e, _ in schedule[c]] for c in car_ids}
+    horizon_end = max(e for _, _, e, _ in movable)
+    if assignment.consolidation(proposed, now, horizon_end) <= assignment.consolidation(current, now, horizon_end):
+        return 0
+    for c in car_ids:
+        schedule[c] = [(s, e, k) for s, e, k in schedule[c] if s <= now]
+    for k, s, e, c in movable:
+        schedule[placed[k]].append((s, e, k))
+    return sum(1 for k, _, _, c in movable if placed[k] != c)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cars", type=int, default=8)
+    ap.add_argument("--days", type=int, default=60)
+    ap.add_argument("--load", type=float, default=0.9, help="offered demand as a fraction of fleet hours")
+    ap.add_argument("--seeds", type=int, default=5)
+    args = ap.parse_args()
+
+    variants = {
+        "first_fit": (assignment.first_fit, False),
+        "best_fit": (assignment.best_fit, False),
+        "best_fit+reopt": (assignment.best_fit, True),
+    }
+    results = {}
+    for name, (strategy, reopt) in variants.items():
+        runs = []
+        t0 = time.perf_counter()
+        for seed in range(args.seeds):
+            requests = demand(random.Random(seed), args.cars, args.days, args.load)
+            runs.append(simulate(requests, args.cars, args.days, strategy, reopt))
+        elapsed = time.perf_counter() - t0
+        results[name] = {
+            metric: round(sum(r[metric] for r in runs) / len(runs), 4)
+            for metric in ("acceptance", "long_acceptance", "utilization", "moved")
+        }
+        results[name]["wall_s"] = round(elapsed, 3)
+
+    print(json.dumps({
+        "commit": git_revision(), "cars": args.cars, "days": args.days, "load": args.load,
+        "seeds": args.seeds, "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
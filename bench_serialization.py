@@ -0,0 +1,89 @@
+"""Serialization cost of the get-all-bookings payload, per 1k bookings.
+
+    python bench_serialization.py --bookings 1000 --repeat 50
+
+Compares, on the same synthetic booking dicts get_all_bookings builds:
+- validated: what FastAPI does with a returned dict and response_model
+  (validate into AllBookingsResponse, dump by alias, stdlib json.dumps);
+- fast_stdlib: fast_json.model_response() with the stdlib encoder;
+- fast_orjson: fast_json.model_response() with orjson (skipped if not installed).
+Reports p50/p95/mean per payload and the mean cost scaled to 1k bookings.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bench_common import git_revision, summarize_ms
+
+
+def booking_dicts(n: int, rnd: random.Random) -> list:
+    start = datetime(2027, 1, 1)
+    rows = []
+    for i in range(n):
+        pickup = start + timedelta(hours=rnd.randrange(0, 24 * 365))
+        ret = pickup + timedelta(hours=rnd.choice([2, 4, 24, 72]))
+        rows.append({
+            "id": i + 1,
+            "bookingReference": f"RC-{pickup:%Y%m%d}-{i % 10000:04d}",
+            "customerName": f"Caller {i}",
+            "customerPhone": f"0300{rnd.randrange(10**7):07d}",
+            "pickupDateTime": pickup.isoformat(),
+            "returnDateTime": ret.isoformat(),
+            "duration": "1d 2h",
+            "pickupLocation": "Airport",
+            "dropoffLocation": "Clifton",
+            "carCategory": rnd.choice(["Economy", "Sedan", "SUV", "Luxury"]),
+            "status": "booked",
+            "calendarStatus": "pending",
+        })
+    return rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--bookings", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    import fast_json
+    from main import AllBookingsResponse
+
+    rows = booking_dicts(args.bookings, random.Random(args.seed))
+    payload = {"success": True, "bookings": rows, "total": len(rows), "message": f"Retrieved {len(rows)} bookings."}
+
+    def validated():
+        model = AllBookingsResponse.model_validate(payload)
+        return json.dumps(model.model_dump(mode="json", by_alias=True)).encode("utf-8")
+
+    def fast():
+        return fast_json.model_response(AllBookingsResponse, payload).body
+
+    orjson = fast_json.orjson
+    variants = {"validated": (validated, None), "fast_stdlib": (fast, None)}
+    if orjson is not None:
+        variants["fast_orjson"] = (fast, orjson)
+    else:
+        print("orjson not installed; skipping fast_orjson (pip install .[fast])")
+
+    results = {}
+    for name, (fn, encoder) in variants.items():
+        fast_json.orjson = encoder
+        fn()  # warm-up
+        samples = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        summary = summarize_ms(samples)
+        summary["mean_ms_per_1k"] = round(summary["mean_ms"] * 1000 / max(1, args.bookings), 3)
+        results[name] = summary
+    fast_json.orjson = orjson
+
+    print(json.dumps({"commit": git_revision(), "bookings": args.bookings, "repeat": args.repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Throughput of the booking endpoints as serve.py scales from 1 to N workers.
+
+    python bench_workers.py --workers 1 2 4 --duration 10 --clients 8
+
+For every worker count this starts serve.py against a fresh SQLite file,
+seeds a fleet, drives a create/check/get mix from several client processes
+and records requests/second and latency percentiles. Results are printed and
+written as JSON (default: bench_workers.json).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+from bench_common import percentile
+
+CATEGORIES = ["Economy", "Sedan", "SUV", "Luxury"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(db_url: str, cars: int) -> None:
+    code = (
+        "import database\n"
+        "database.init_db()\n"
+        "db = database.SessionLocal()\n"
+        f"db.add_all([database.Car(name=f'Bench Car {{i}}', category={CATEGORIES!r}[i % 4], status='available') for i in range({cars})])\n"
+        "db.commit()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, env={**os.environ, "DATABASE_URL": db_url})
+
+
+def wait_ready(base: str, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base}/docs", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def client_loop(base: str, duration: float, seed_value: int) -> list:
+    rnd = random.Random(seed_value)
+    session = requests.Session()
+    samples = []
+    deadline = time.time() + duration
+    refs = []
+    while time.time() < deadline:
+        start = datetime(2027, 1, 1) + timedelta(hours=rnd.randrange(0, 24 * 365))
+        window = {
+            "pickupDateTime": start.strftime("%Y-%m-%d %H:%M"),
+            "returnDateTime": (start + timedelta(hours=rnd.choice([2, 4, 24, 72]))).strftime("%Y-%m-%d %H:%M"),
+            "carCategory": rnd.choice(CATEGORIES),
+        }
+        roll = rnd.random()
+        t0 = time.perf_counter()
+        if roll < 0.4:
+            name = "check_availability"
+            r = session.post(f"{base}/api/check-availability", json=window)
+        elif roll < 0.7 or not refs:
+            name = "create_booking"
+            r = session.post(f"{base}/api/create-booking", json={
+                **window,
+                "fullName": "Bench Caller",
+                "phoneNumber": f"0300{rnd.randrange(10**7):07d}",
+                "pickupLocation": "Airport",
+                "dropoffLocation": "City",
+            })
+            if r.ok and r.json().get("bookingReference"):
+                refs.append(r.json()["bookingReference"])
+        else:
+            name = "get_booking"
+            r = session.post(f"{base}/api/get-booking", json={"bookingReference": rnd.choice(refs)})
+        samples.append((name, time.perf_counter() - t0, r.status_code))
+    return samples
+
+
+def run_one(workers: int, args) -> dict:
+    tmp = tempfile.mkdtemp(prefix="rentacar-bench-")
+    db_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    seed(db_url, args.cars)
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": db_url, "MIGRATION_LOCK_PATH": os.path.join(tmp, "migrate.lock")}
+    proc = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base)
+        with ProcessPoolExecutor(args.clients) as pool:
+            futures = [pool.submit(client_loop, base, args.duration, i) for i in range(args.clients)]
+            samples = [s for f in futures for s in f.result()]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    per_endpoint = {}
+    for name in sorted({s[0] for s in samples}):
+        lat = [s[1] * 1000 for s in samples if s[0] == name]
+        per_endpoint[name] = {
+            "requests": len(lat),
+            "p50_ms": round(percentile(lat, 50), 2),
+            "p95_ms": round(percentile(lat, 95), 2),
+            "p99_ms": round(percentile(lat, 99), 2),
+        }
+    return {
+        "workers": workers,
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s[2] >= 500),
+        "throughput_rps": round(len(samples) / args.duration, 1),
+        "endpoints": per_endpoint,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--cars", type=int, default=400)
+    parser.add_argument("--out", default="bench_workers.json")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.workers:
+        r = run_one(n, args)
+        results.append(r)
+        print(f"workers={n:<3} {r['throughput_rps']:>8} req/s  errors={r['errors']}  "
+              + "  ".join(f"{k}: p50={v['p50_ms']}ms p99={v['p99_ms']}ms" for k, v in r["endpoints"].items()))
+
+    base_rps = results[0]["throughput_rps"] or 1
+    for r in results:
+        r["speedup"] = round(r["throughput_rps"] / base_rps, 2)
+    with open(args.out, "w") as fh:
+        json.dump({"cpu_count": os.cpu_count(), "generated_at": datetime.utcnow().isoformat(), "runs": results}, fh, indent=2)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+import json
+import logging
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class CacheBackend:
+    """Namespaced cache interface shared by every read path in main.py.
+
+    Keys are hashable, JSON-friendly values (strings or tuples of scalars);
+    values must be JSON-serializable so the shared backend can store them.
+    """
+
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, namespace: str, *keys: Hashable) -> None:
+        raise NotImplementedError
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+    def publish_event(self, message: dict) -> None:
+        """Best-effort fan-out of a small JSON message to the other workers sharing this backend."""
+
+    def on_event(self, callback) -> None:
+        """Call `callback(message)` for every publish_event() from another worker."""
+
+    def close(self) -> None:
+        pass
+
+
+class InProcessBackend(CacheBackend):
+    """One TTLCache per namespace. Correct only while a single worker serves traffic."""
+
+    def __init__(self, namespaces: Optional[dict] = None, default_size: int = 256, default_ttl: float = 30.0):
+        self._namespaces = dict(namespaces or {})
+        self._default = (default_size, default_ttl)
+        self._caches: dict = {}
+        self._lock = threading.Lock()
+
+    def _cache(self, namespace: str) -> TTLCache:
+        c = self._caches.get(namespace)
+        if c is None:
+            with self._lock:
+                c = self._caches.get(namespace)
+                if c is None:
+                    size, ttl = self._namespaces.get(namespace, self._default)
+                    c = self._caches[namespace] = TTLCache(maxsize=size, ttl=ttl)
+        return c
+
+    def get(self, namespace, key, default=None):
+        return self._cache(namespace).get(key, default)
+
+    def set(self, namespace, key, value, ttl=None):
+        self._cache(namespace).set(key, value, ttl)
+
+    def delete(self, namespace, *keys):
+        self._cache(namespace).delete(*keys)
+
+    def clear(self, namespace=None):
+        targets = [namespace] if namespace else list(self._caches)
+        for ns in targets:
+            self._cache(ns).clear()
+
+    def stats(self):
+        return {"backend": "memory", "namespaces": {ns: c.stats() for ns, c in self._caches.items()}}
+
+
+class RespConnection:
+    """Minimal blocking client for the Redis serialization protocol (RESP2).
+
+    Any socket error or timeout inside execute() closes the socket: a reply
+    left unread would otherwise be taken as the answer to the next command.
+    The next execute() reconnects, at most once per `retry_after` seconds,
+    failing fast in between so an outage does not cost every caller a timeout.
+    With connect=False the first execute() opens the connection.
+    """
+
+    def __init__(self, host: str, port: int, db: int = 0, timeout: Optional[float] = 2.0,
+                 retry_after: float = 1.0, connect: bool = True):
+        self._addr = (host, port)
+        self._db = db
+        self._timeout = timeout
+        self.retry_after = retry_after
+        self._retry_at = 0.0
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+        if connect:
+            with self._lock:
+                self._connect()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection(self._addr, timeout=self._timeout)
+        self._reader = self._sock.makefile("rb")
+        if self._db:
+            self.send("SELECT", self._db)
+            self.read_reply()
+
+    def send(self, *args) -> None:
+        parts = [b"*%d\r\n" % len(args)]
+        for a in args:
+            if not isinstance(a, bytes):
+                a = str(a).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(a), a))
+        self._sock.sendall(b"".join(parts))
+
+    def read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Cache server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self._reader.read(n + 2)[:-2]
+            return data
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self.read_reply() for _ in range(n)]
+        raise RuntimeError(f"Unexpected RESP reply: {line!r}")
+
+    def execute(self, *args) -> Any:
+        with self._lock:
+            if self._sock is None:
+                if time.monotonic() < self._retry_at:
+                    raise ConnectionError("Cache server unavailable")
+                try:
+                    self._connect()
+                except (OSError, ConnectionError):
+                    self._drop()
+                    raise
+            try:
+                self.send(*args)
+                return self.read_reply()
+            except (OSError, ConnectionError, ValueError):
+                # ValueError: a garbled reply; the stream position is unknown too.
+                self._drop()
+                raise
+
+    def _drop(self) -> None:
+        self.close()
+        self._sock = self._reader = None
+        self._retry_at = time.monotonic() + self.retry_after
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        self._sock.settimeout(timeout)
+
+    def close(self) -> None:
+        if self._sock is None:
+            return
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class RedisBackend(CacheBackend):
+    """Shared cache on a Redis-protocol server, fronted by a per-worker near cache.
+
+    Values live in the server so every worker sees the same data. Reads are
+    served from a small local TTLCache first; any delete is published on
+    `channel` so the other workers drop their near-cache copies immediately.
+
+    The cache is an optimisation, so a server outage degrades instead of
+    failing requests: reads become misses and writes, deletes and publishes
+    apply to the near cache only (other workers' near copies then expire
+    within near_cache_ttl; their subscriber drop flushes them anyway).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0,
+                 prefix: str = "rentacar", namespaces: Optional[dict] = None,
+                 default_ttl: float = 30.0, near_cache_ttl: float = 5.0):
+        self.prefix = prefix
+        self.channel = f"{prefix}:invalidate"
+        self.node_id = uuid.uuid4().hex
+        self._conn_args = (host, port, db)
+        # Lazy: a server that is down at startup degrades the cache instead of failing the app.
+        self._conn = RespConnection(host, port, db, connect=False)
+        self._namespace_ttls = {ns: ttl for ns, (_, ttl) in (namespaces or {}).items()}
+        self._default_ttl = default_ttl
+        self._near = InProcessBackend(
+            {ns: (size, min(ttl, near_cache_ttl)) for ns, (size, ttl) in (namespaces or {}).items()},
+            default_ttl=near_cache_ttl,
+        )
+        self.remote_hits = 0
+        self.remote_misses = 0
+        self.remote_errors = 0
+        self._degraded = False
+        self.invalidations_received = 0
+        self._event_callbacks = []
+        self._closed = threading.Event()
+        self._sub_conn: Optional[RespConnection] = None
+        # Set once the first subscribe attempt has finished, either way: startup
+        # waits for a live channel but not for a server that is down.
+        self._first_attempt = threading.Event()
+        self._listener = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._listener.start()
+        self._first_attempt.wait(timeout=2.0)
+
+    def _remote(self, *args) -> Any:
+        """Run a command on the server; _UNAVAILABLE instead of raising when it cannot be reached."""
+        try:
+            reply = self._conn.execute(*args)
+        except (OSError, ConnectionError, ValueError) as e:
+            self.remote_errors += 1
+            if not self._degraded:
+                self._degraded = True
+                logger.warning("Cache server unreachable (%s); serving from the near cache only", e)
+            return _UNAVAILABLE
+        if self._degraded:
+            self._degraded = False
+            logger.info("Cache server reachable again")
+        return reply
+
+    def _key(self, namespace: str, key: Hashable) -> str:
+        return f"{self.prefix}:{namespace}:{json.dumps(key, separators=(',', ':'), default=str)}"
+
+    def get(self, namespace, key, default=None):
+        value = self._near.get(namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+        raw = self._remote("GET", self._key(namespace, key))
+        if raw is None or raw is _UNAVAILABLE:
+            self.remote_misses += 1
+            return default
+        self.remote_hits += 1
+        value = json.loads(raw)
+        self._near.set(namespace, key, value)
+        return value
+
+    def set(self, namespace, key, value, ttl=None):
+        ttl = self._namespace_ttls.get(namespace, self._default_ttl) if ttl is None else ttl
+        self._remote("SET", self._key(namespace, key), json.dumps(value, default=str), "PX", int(ttl * 1000))
+        self._near.set(namespace, key, value)
+
+    def delete(self, namespace, *keys):
+        if not keys:
+            return
+        self._remote("DEL", *[self._key(namespace, k) for k in keys])
+        self._near.delete(namespace, *keys)
+        self._publish({"ns": namespace, "keys": list(keys)})
+
+    def clear(self, namespace=None):
+        pattern = f"{self.prefix}:{namespace}:*" if namespace else f"{self.prefix}:*"
+        cursor = b"0"
+        while True:
+            reply = self._remote("SCAN", cursor, "MATCH", pattern, "COUNT", 500)
+            if reply is _UNAVAILABLE:
+                break
+            cursor, found = reply
+            if found:
+                self._remote("DEL", *found)
+            if cursor in (b"0", 0, "0"):
+                break
+        self._near.clear(namespace)
+        self._publish({"ns": namespace, "all": True})
+
+    def publish_event(self, message: dict) -> None:
+        self._publish({"event": message})
+
+    def on_event(self, callback) -> None:
+        self._event_callbacks.append(callback)
+
+    def _publish(self, message: dict) -> None:
+        message["from"] = self.node_id
+        self._remote("PUBLISH", self.channel, json.dumps(message))
+
+    def _listen(self) -> None:
+        """Subscriber thread: apply invalidations published by other workers."""
+        while not self._closed.is_set():
+            conn = None
+            try:
+                conn = self._sub_conn = RespConnection(*self._conn_args, timeout=None)
+                conn.send("SUBSCRIBE", self.channel)
+                conn.read_reply()
+                self._first_attempt.set()
+                while not self._closed.is_set():
+                    reply = conn.read_reply()
+                    if not reply or reply[0] != b"message":
+                        continue
+                    self._apply_invalidation(json.loads(reply[2]))
+            except (OSError, ConnectionError, ValueError):
+                if self._closed.is_set():
+                    return
+                logger.warning("Cache invalidation channel dropped; near cache flushed, reconnecting")
+                self._near.clear()
+                self._first_attempt.set()
+                self._closed.wait(1.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _apply_invalidation(self, message: dict) -> None:
+        if message.get("from") == self.node_id:
+            return
+        if "event" in message:
+            for callback in self._event_callbacks:
+                try:
+                    callback(message["event"])
+                except Exception:
+                    logger.exception("Cache event callback failed")
+            return
+        self.invalidations_received += 1
+        if message.get("all"):
+            self._near.clear(message.get("ns"))
+        else:
+            self._near.delete(message["ns"], *[_tuplify(k) for k in message.get("keys", [])])
+
+    def stats(self):
+        near = self._near.stats()
+        return {
+            "backend": "redis",
+            "remoteHits": self.remote_hits,
+            "remoteMisses": self.remote_misses,
+            "remoteErrors": self.remote_errors,
+            "invalidationsReceived": self.invalidations_received,
+            "namespaces": near["namespaces"],
+        }
+
+    def close(self):
+        self._closed.set()
+        self._conn.close()
+        if self._sub_conn is not None:
+            self._sub_conn.close()
+
+
+_MISSING = object()
+_UNAVAILABLE = object()
+
+
+def _tuplify(key: Any) -> Any:
+    # JSON turns tuple keys into lists; restore them so near-cache keys match.
+    return tuple(_tuplify(k) for k in key) if isinstance(key, list) else key
+
+
+def make_cache(url: str = "memory://", namespaces: Optional[dict] = None) -> CacheBackend:
+    """Build a backend from a CACHE_URL: memory:// or redis://host:port/db.
+
+    `namespaces` maps namespace -> (maxsize, ttl seconds).
+    """
+    parsed = urlparse(url)
+    if parsed.scheme in ("", "memory"):
+        return InProcessBackend(namespaces)
+    if parsed.scheme == "redis":
+        db = int(parsed.path.lstrip("/") or 0)
+        return RedisBackend(parsed.hostname or "127.0.0.1", parsed.port or 6379, db, namespaces=namespaces)
+    raise ValueError(f"Unsupported CACHE_URL scheme: {parsed.scheme}")
@@ -3,6 +3,8 @@ import datetime
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 
+import tracing
+
 # Scopes required for Google Calendar
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
@@ -22,6 +24,7 @@ def get_calendar_service():
         print(f"ERROR: Failed to initialize Google Calendar service: {e}")
         return None
 
+@tracing.traced("calendar_service.create_calendar_event")
 def create_calendar_event(booking):
     """
     Creates an event on the Google Calendar.
@@ -0,0 +1,157 @@
+"""Booking change feed for dashboards: one in-process broadcaster, Server-Sent Events out.
+
+    booking_events.publish("booking.created", booking={...})   # any thread
+    GET /api/admin/booking-events                             # EventSource
+
+Each event is encoded to its SSE frame once, at publish time, and the same
+bytes are queued for every connected client, so fan-out costs one
+call_soon_threadsafe per client and no serialization. Handlers run in the
+threadpool while streams live on the event loop; each subscriber owns an
+asyncio.Queue on that loop.
+
+A client that falls QUEUE_SIZE events behind is not allowed to hold memory:
+its queue is emptied and it gets a `resync` event, after which it should
+re-fetch the list once. The last HISTORY events are kept so a reconnecting
+EventSource (Last-Event-ID) gets what it missed; an id from another
+process or from before the history window also yields `resync`.
+
+With several workers (serve.py), each worker's broadcaster forwards its
+events to the others through the shared cache's pub/sub (CacheBackend.
+publish_event; a no-op for memory://), so every dashboard sees every write.
+"""
+import asyncio
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Set, Tuple
+
+import metrics
+
+QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+HISTORY = int(os.getenv("EVENT_HISTORY", "512"))
+HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+events_total = metrics.REGISTRY.register(metrics.Counter(
+    "rentacar_booking_events_total", "Booking change events published, by type and origin.", ("type", "origin")))
+event_subscribers = metrics.REGISTRY.register(metrics.Gauge(
+    "rentacar_booking_event_subscribers", "Connected booking-event streams."))
+event_resyncs_total = metrics.REGISTRY.register(metrics.Counter(
+    "rentacar_booking_event_resyncs_total", "Streams told to re-fetch (slow consumer or unknown Last-Event-ID).", ("reason",)))
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+
+
+def sse_frame(event_id: str, event_type: str, data: dict) -> bytes:
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class Subscription:
+    __slots__ = ("loop", "queue")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=size)
+
+    def offer(self, frame: bytes) -> None:
+        # Runs on the subscriber's loop.
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            event_resyncs_total.inc("slow_consumer")
+
+
+class Broadcaster:
+    def __init__(self, relay: Optional[Callable[[], object]] = None, history: int = HISTORY, queue_size: int = QUEUE_SIZE):
+        # A getter, not the backend: serve.py swaps main.app_cache in each forked worker.
+        self._relay = relay
+        self.queue_size = queue_size
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+
+    def publish(self, event_type: str, **data) -> None:
+        """Send an event to local streams and, through the relay, to other workers' streams."""
+        self._deliver(event_type, data, "local")
+        if self._relay is not None:
+            self._relay().publish_event({"type": event_type, "data": data})
+
+    def receive(self, message: dict) -> None:
+        """Relay callback: an event published by another worker."""
+        self._deliver(message["type"], message["data"], "relay")
+
+    def _deliver(self, event_type: str, data: dict, origin: str) -> None:
+        with self._lock:
+            self._seq += 1
+            frame = sse_frame(f"{self.epoch}-{self._seq}", event_type, data)
+            self._history.append((self._seq, frame))
+            subscribers = list(self._subscribers)
+        events_total.inc(event_type, origin)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, frame)
+            except RuntimeError:  # loop closed under a vanished client
+                self.unsubscribe(sub)
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, last_event_id: Optional[str] = None) -> Tuple[Subscription, List[bytes]]:
+        """New subscription plus the frames to send first (missed events, or a resync)."""
+        sub = Subscription(loop, self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+            backlog = self._backlog(last_event_id)
+        event_subscribers.inc()
+        return sub, backlog
+
+    def _backlog(self, last_event_id: Optional[str]) -> List[bytes]:
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            event_resyncs_total.inc("unknown_id")
+            return [RESYNC]
+        seq = int(seq)
+        oldest = self._history[0][0] if self._history else self._seq + 1
+        if seq < oldest - 1:
+            event_resyncs_total.inc("history_gap")
+            return [RESYNC]
+        return [frame for s, frame in self._history if s > seq]
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub not in self._subscribers:
+                return
+            self._subscribers.discard(sub)
+        event_subscribers.dec()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "published": self._seq, "history": len(self._history)}
+
+
+async def sse_stream(broadcaster: Broadcaster, is_disconnected: Callable[[], Awaitable[bool]],
+                     last_event_id: Optional[str] = None, heartbeat: float = HEARTBEAT_SECONDS):
+    """Async generator of SSE bytes for one client; ends when the client disconnects."""
+    sub, backlog = broadcaster.subscribe(asyncio.get_running_loop(), last_event_id)
+    try:
+        yield b"retry: 3000\n\n"
+        for frame in backlog:
+            yield frame
+        while True:
+            try:
+                frame = await asyncio.wait_for(sub.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                # Comment line: keeps proxies from closing an idle stream.
+                yield b": keepalive\n\n"
+                continue
+            yield frame
+    finally:
+        broadcaster.unsubscribe(sub)
@@ -0,0 +1,65 @@
+"""Fast JSON responses for handlers that already build response-shaped dicts.
+
+When a handler returns a Response, FastAPI skips `response_model`
+validation and jsonable_encoder entirely (the model still documents the
+endpoint in OpenAPI). model_response() relies on that: the handler's dict,
+already keyed by alias with JSON-ready values, is laid out field by field
+like the model's own output (defaults filled in, unknown keys dropped) and
+encoded once.
+
+orjson is used when installed (`pip install .[fast]`); otherwise the stdlib
+encoder with compact separators.
+"""
+import json
+from functools import lru_cache
+from typing import Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json", by_alias=True)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _fields(model_cls: Type[BaseModel]) -> tuple:
+    """(alias, required, default) for every field, in declaration order."""
+    return tuple(
+        (field.alias or name, field.is_required(), field.default)
+        for name, field in model_cls.model_fields.items()
+    )
+
+
+def model_response(model_cls: Type[BaseModel], data: dict, status_code: int = 200) -> FastJSONResponse:
+    """Serialize `data` as `model_cls` would, without validating it again.
+
+    Top-level keys are filled/ordered/filtered like the model does; nested
+    objects are written as given, so they must already be alias-keyed and
+    complete. Only for dicts the handler built itself from trusted values.
+    """
+    body = {
+        alias: data[alias] if required else data.get(alias, default)
+        for alias, required, default in _fields(model_cls)
+    }
+    return FastJSONResponse(body, status_code=status_code)
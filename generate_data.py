@@ -0,0 +1,276 @@
+"""Bulk synthetic fleet + booking-history generator for load and benchmark runs.
+
+    python generate_data.py --cars 20000 --bookings 10000000
+    DATABASE_URL=postgresql://... python generate_data.py --cars 500 --bookings 200000
+
+Bookings never overlap on a car: each car's calendar is walked forward with
+exponential idle gaps, daytime-weighted pickup hours and a short/day/week
+rental-length mix; ~10% of rows are cancelled. On SQLite the rows go through
+sqlite3.executemany with load-time pragmas (no journal, no fsync, exclusive
+lock) and the bookings indexes are dropped during the load and rebuilt once
+afterwards. Other databases use batched SQLAlchemy insert() executemany.
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+CATEGORY_MIX = [("Economy", 0.35), ("Sedan", 0.30), ("SUV", 0.25), ("Luxury", 0.10)]
+CAR_MODELS = {
+    "Economy": ["Suzuki Alto", "Suzuki Cultus", "Toyota Vitz"],
+    "Sedan": ["Toyota Corolla", "Honda Civic", "Honda City"],
+    "SUV": ["Toyota Prado", "Kia Sportage", "Toyota Fortuner"],
+    "Luxury": ["Mercedes E-Class", "BMW 5 Series", "Audi A6"],
+}
+DAILY_RATES = {"Economy": 4500.0, "Sedan": 7000.0, "SUV": 12000.0, "Luxury": 25000.0}
+LOCATIONS = ["Airport", "Clifton", "DHA Phase 6", "Gulshan", "Saddar", "Bahria Town", "PECHS", "North Nazimabad"]
+# Pickup hour weights: most rentals start during the working day.
+PICKUP_HOURS = list(range(24))
+PICKUP_HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 12, 14, 14, 12, 10, 10, 10, 10, 10, 9, 8, 6, 4, 3, 2, 1]
+
+BOOKING_COLUMNS = (
+    "booking_reference", "full_name", "phone_number", "pickup_location", "dropoff_location",
+    "car_category", "notes", "pickup_date_time", "return_date_time", "assigned_car_id",
+    "status", "calendar_status", "calendar_event_id", "created_at", "cancelled_at",
+    "row_version", "updated_at",
+)
+
+
+def _ts(dt: datetime) -> str:
+    # Same text layout SQLAlchemy's SQLite DateTime type writes, so range filters compare correctly.
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def car_rows(n: int, rnd: random.Random) -> list:
+    cats, weights = zip(*CATEGORY_MIX)
+    rows = []
+    for i in range(n):
+        cat = rnd.choices(cats, weights)[0]
+        rows.append({
+            "id": i + 1,
+            "plate_number": f"{''.join(rnd.choices('ABCDEFGHJKLMNPRSTUVWXYZ', k=3))}-{rnd.randrange(100, 9999)}",
+            "category": cat,
+            "name": rnd.choice(CAR_MODELS[cat]),
+            "status": "available",
+            "daily_rate": DAILY_RATES[cat],
+            "created_at": datetime(2024, 1, 1),
+        })
+    return rows
+
+
+def booking_rows(cars: list, total: int, start: datetime, rnd: random.Random,
+                 mean_gap_hours: float = 36.0, now: Optional[datetime] = None) -> Iterator[tuple]:
+    """Yield booking tuples in BOOKING_COLUMNS order, round-robin across cars.
+
+    Times are tracked as integer minutes since `start` and formatted through a
+    per-day string cache; building datetime objects per row was the bottleneck.
+    """
+    now = now or datetime.utcnow()
+    now_min = int((now - start).total_seconds() // 60)
+    n_cars = len(cars)
+    car_ids = [c["id"] for c in cars]
+    car_cats = [c["category"] for c in cars]
+    mean_gap_min = mean_gap_hours * 60
+    cursors = [int(rnd.random() * mean_gap_min) for _ in cars]
+    day_seq = {}
+    days = {}
+
+    def day_strings(d: int) -> tuple:
+        v = days.get(d)
+        if v is None:
+            iso = (start + timedelta(days=d)).strftime("%Y-%m-%d")
+            v = days[d] = (iso, iso.replace("-", ""))
+        return v
+
+    def ts(m: int) -> str:
+        d, rem = divmod(m, 1440)
+        return f"{day_strings(d)[0]} {rem // 60:02d}:{rem % 60:02d}:00.000000"
+
+    rand, expo = rnd.random, rnd.expovariate
+    hours_pool = rnd.choices(PICKUP_HOURS, PICKUP_HOUR_WEIGHTS, k=4096)
+    n_locations = len(LOCATIONS)
+    gap_rate = 1.0 / mean_gap_min
+
+    for i in range(total):
+        c = i % n_cars
+        # Next pickup: idle gap after the previous return, snapped to a weighted daytime hour.
+        t = cursors[c] + int(expo(gap_rate))
+        pickup = (t // 1440) * 1440 + hours_pool[i & 4095] * 60 + int(rand() * 4) * 15
+        if pickup < t:
+            pickup += 1440
+
+        r = rand()
+        if r < 0.40:
+            length = (2 + int(rand() * 7)) * 60          # same-day rental
+        elif r < 0.85:
+            length = (1 + int(rand() * 3)) * 1440        # 1-3 days
+        else:
+            length = (4 + int(rand() * 7)) * 1440        # 4-10 days
+        ret = pickup + length
+        cursors[c] = ret
+
+        # Booked 1h-14d ahead; rows for future pickups were booked at some point in the last 30 days.
+        created = pickup - 60 - int(rand() * 60 * 24 * 14)
+        if created > now_min:
+            created = now_min - int(rand() * 60 * 24 * 30)
+        day = day_strings(created // 1440)[1]
+        seq = day_seq.get(day, 0) + 1
+        day_seq[day] = seq
+
+        cancelled = rand() < 0.10
+        status = "cancelled" if cancelled else ("confirmed" if rand() < 0.3 else "booked")
+        synced = rand() < 0.7
+        yield (
+            f"RC-{day}-{seq:04d}",
+            f"Caller {i}",
+            f"03{int(rand() * 1e9):09d}",
+            LOCATIONS[int(rand() * n_locations)],
+            LOCATIONS[int(rand() * n_locations)],
+            car_cats[c],
+            None,
+            ts(pickup),
+            ts(ret),
+            car_ids[c],
+            status,
+            "created" if synced else "skipped",
+            f"evt{i}" if synced else None,
+            ts(created),
+            ts(created + 60) if cancelled else None,
+            i + 1,
+            ts(created + 60) if cancelled else ts(created),
+        )
+
+
+SQLITE_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA locking_mode=EXCLUSIVE",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",   # 256 MiB page cache
+]
+
+
+def load_sqlite(path: str, cars: list, bookings: Iterator[tuple], batch_size: int, progress) -> None:
+    conn = sqlite3.connect(path, isolation_level=None)
+    for p in SQLITE_LOAD_PRAGMAS:
+        conn.execute(p)
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name='bookings' AND sql IS NOT NULL"
+    ).fetchall()
+    conn.execute("BEGIN")
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    conn.executemany(
+        "INSERT INTO cars (id, plate_number, category, name, status, daily_rate, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(c["id"], c["plate_number"], c["category"], c["name"], c["status"], c["daily_rate"], _ts(c["created_at"]))
+         for c in cars],
+    )
+    sql = f"INSERT INTO bookings ({', '.join(BOOKING_COLUMNS)}) VALUES ({', '.join('?' * len(BOOKING_COLUMNS))})"
+    batch, done = [], 0
+    for row in bookings:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            done += len(batch)
+            batch = []
+            progress(done)
+    if batch:
+        conn.executemany(sql, batch)
+        progress(done + len(batch))
+    for _, ddl in indexes:
+        conn.execute(ddl)
+    conn.execute("COMMIT")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def load_sqlalchemy(engine, cars: list, bookings: Iterator[tuple], batch_size: int, progress) -> None:
+    from sqlalchemy import insert
+    import database
+
+    with engine.begin() as conn:
+        conn.execute(insert(database.Car.__table__), cars)
+    batch, done = [], 0
+    table = database.Booking.__table__
+    for row in bookings:
+        d = dict(zip(BOOKING_COLUMNS, row))
+        for k in ("pickup_date_time", "return_date_time", "created_at", "cancelled_at", "updated_at"):
+            if d[k] is not None:
+                d[k] = datetime.fromisoformat(d[k])
+        batch.append(d)
+        if len(batch) >= batch_size:
+            with engine.begin() as conn:
+                conn.execute(insert(table), batch)
+            done += len(batch)
+            batch = []
+            progress(done)
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(table), batch)
+        progress(done + len(batch))
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("SELECT setval(pg_get_serial_sequence('cars', 'id'), (SELECT MAX(id) FROM cars))")
+
+
+def generate(cars: int, bookings: int, seed: int = 42, start: Optional[datetime] = None,
+             batch_size: int = 50_000, engine=None, verbose: bool = False) -> dict:
+    """Create the schema if needed, wipe existing cars/bookings, and bulk-load synthetic data."""
+    import database
+
+    engine = engine or database.engine
+    rnd = random.Random(seed)
+    start = start or datetime(2025, 1, 1)
+    database.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM bookings")
+        conn.exec_driver_sql("DELETE FROM cars")
+
+    fleet = car_rows(cars, rnd)
+    rows = booking_rows(fleet, bookings, start, rnd)
+    t0 = time.perf_counter()
+
+    def progress(done: int) -> None:
+        if verbose:
+            elapsed = time.perf_counter() - t0
+            print(f"  {done:>12,} bookings  {done / elapsed:>10,.0f} rows/s", end="\r", flush=True)
+
+    if engine.dialect.name == "sqlite":
+        engine.dispose()
+        load_sqlite(engine.url.database, fleet, rows, batch_size, progress)
+    else:
+        load_sqlalchemy(engine, fleet, rows, batch_size, progress)
+    with engine.begin() as conn:
+        # Continue the change counter after the loaded rows' versions.
+        database.migrate_row_versions(conn)
+        conn.exec_driver_sql(
+            "UPDATE row_versions SET value = (SELECT COALESCE(MAX(row_version), 0) FROM bookings) WHERE name = 'bookings'"
+        )
+    elapsed = time.perf_counter() - t0
+    if verbose:
+        print()
+    return {"cars": cars, "bookings": bookings, "seconds": round(elapsed, 2),
+            "rows_per_second": round(bookings / elapsed) if elapsed else 0}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", default="2025-01-01", help="first day of the booking history")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    import database
+    print(f"Loading {args.cars:,} cars / {args.bookings:,} bookings into {database.engine.url!r}")
+    stats = generate(args.cars, args.bookings, args.seed, datetime.fromisoformat(args.start),
+                     args.batch_size, verbose=True)
+    print(f"Done in {stats['seconds']}s ({stats['rows_per_second']:,} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""Load generator that replays voice-agent call flows against a running server.
+
+    python load_test.py --base-url http://127.0.0.1:8000 --concurrency 50 --duration 60
+    python load_test.py --rate 20 --duration 60 --mix booking_call=6,inquiry_call=3,overlap_analytics=1
+    python load_test.py --flows recorded_calls.json --concurrency 10
+
+Each simulated call is a session that runs one flow (a sequence of API
+steps, like a real conversation: availability -> create -> get -> maybe
+cancel). Closed-loop mode keeps --concurrency sessions busy; open-loop mode
+starts sessions at a Poisson --rate per second. The report has throughput,
+per-step latency percentiles, error rates, flow assertion failures and, by
+querying the database afterwards, any double-booked cars.
+
+Recorded flows (--flows) are JSON: {"flows": {"name": [{"method": "POST",
+"path": "/api/get-booking", "json": {...}}, ...]}}. String values may use
+{phone}, {name}, {pickup}, {return}, {category} and {ref} (the reference
+from the latest create-booking step in that session).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from bench_common import git_revision, summarize_ms
+
+CATEGORIES = ["Economy", "Sedan", "SUV", "Luxury"]
+ADMIN_KEY = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+
+
+class FlowFailure(Exception):
+    """A step returned something a real agent conversation would treat as wrong."""
+
+
+class Session:
+    """One simulated call: its own caller identity, timing samples and failures."""
+
+    def __init__(self, client, stats: "Stats", rnd: random.Random, think_ms: float = 0.0):
+        self.client = client
+        self.stats = stats
+        self.rnd = rnd
+        self.think_ms = think_ms
+        self.vars = {
+            "phone": f"0345{rnd.randrange(10**7):07d}",
+            "name": f"Load Caller {rnd.randrange(10**6)}",
+            "category": rnd.choice(CATEGORIES),
+            "ref": "",
+        }
+        self.set_window(random_window(rnd))
+
+    def set_window(self, window: tuple) -> None:
+        self.vars["pickup"], self.vars["return"] = window
+
+    async def call(self, step: str, method: str, path: str, **kwargs) -> dict:
+        if self.think_ms:
+            await asyncio.sleep(self.rnd.expovariate(1.0 / self.think_ms) / 1000)
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.request(method, path, **kwargs)
+        except Exception as e:
+            self.stats.record(step, time.perf_counter() - t0, None)
+            raise FlowFailure(f"{step}: transport error {e!r}")
+        self.stats.record(step, time.perf_counter() - t0, r.status_code)
+        if r.status_code >= 400:
+            raise FlowFailure(f"{step}: HTTP {r.status_code}")
+        return r.json()
+
+    def booking_payload(self, **overrides) -> dict:
+        payload = {
+            "fullName": self.vars["name"],
+            "phoneNumber": self.vars["phone"],
+            "pickupLocation": "Airport",
+            "dropoffLocation": "City Center",
+            "carCategory": self.vars["category"],
+            "pickupDateTime": self.vars["pickup"],
+            "returnDateTime": self.vars["return"],
+        }
+        payload.update(overrides)
+        return payload
+
+    def window_payload(self) -> dict:
+        return {"pickupDateTime": self.vars["pickup"], "returnDateTime": self.vars["return"],
+                "carCategory": self.vars["category"]}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.status: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.flows: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.failures: List[str] = []
+
+    def record(self, step: str, seconds: float, status: Optional[int]) -> None:
+        self.latencies[step].append(seconds)
+        self.status[step][str(status) if status else "error"] += 1
+
+    def flow_done(self, name: str, failure: Optional[str]) -> None:
+        self.flows[name]["ok" if failure is None else "failed"] += 1
+        if failure and len(self.failures) < 50:
+            self.failures.append(f"{name}: {failure}")
+
+
+def random_window(rnd: random.Random) -> tuple:
+    start = datetime(2027, 1, 1) + timedelta(hours=rnd.randrange(0, 24 * 365))
+    end = start + timedelta(hours=rnd.choice([2, 4, 8, 24, 48]))
+    return start.strftime("%Y-%m-%d %H:%M"), end.strftime("%Y-%m-%d %H:%M")
+
+
+# --- Scripted flows ---
+
+async def booking_call(s: Session) -> None:
+    """Typical booking conversation."""
+    await s.call("caller_context", "POST", "/api/caller-context", json={"phoneNumber": s.vars["phone"]})
+    avail = await s.call("check_availability", "POST", "/api/check-availability", json=s.window_payload())
+    if not avail.get("available"):
+        s.set_window(random_window(s.rnd))   # the agent offers another slot
+        avail = await s.call("check_availability", "POST", "/api/check-availability", json=s.window_payload())
+        if not avail.get("available"):
+            return
+    created = await s.call("create_booking", "POST", "/api/create-booking", json=s.booking_payload())
+    if not created.get("success"):
+        if created.get("error") == "NO_AVAILABILITY":
+            return   # lost a race for the last car; a real agent would re-offer
+        raise FlowFailure(f"create_booking: {created.get('error')}")
+    s.vars["ref"] = created["bookingReference"]
+    for _ in range(s.rnd.choice([1, 2])):   # caller confirms details
+        got = await s.call("get_booking", "POST", "/api/get-booking", json={"bookingReference": s.vars["ref"]})
+        if not got.get("success"):
+            raise FlowFailure("get_booking: freshly created booking not found")
+    if s.rnd.random() < 0.15:
+        cancelled = await s.call("cancel_booking", "POST", "/api/cancel-booking", json={"phoneNumber": s.vars["phone"]})
+        if not cancelled.get("success"):
+            raise FlowFailure("cancel_booking failed")
+
+
+async def inquiry_call(s: Session) -> None:
+    """Caller only asks about availability and an existing booking."""
+    for _ in range(2):
+        s.vars["category"] = s.rnd.choice(CATEGORIES)
+        await s.call("check_availability", "POST", "/api/check-availability", json=s.window_payload())
+    await s.call("get_booking", "POST", "/api/get-booking", json={"phoneNumber": s.vars["phone"]})
+
+
+async def overlap_analytics(s: Session, window: Optional[tuple] = None, category: str = "SUV") -> dict:
+    """Formerly test_overlap_analytics.py: overlapping bookings must land on distinct cars
+    until the category is exhausted, after which create-booking reports NO_AVAILABILITY."""
+    ana = await s.call("admin_analytics", "GET", "/api/admin/analytics", headers={"X-Admin-Key": ADMIN_KEY})
+    if ana.get("ok") is not True:
+        raise FlowFailure("analytics not ok")
+
+    s.vars["category"] = category
+    if window:
+        s.set_window(window)
+    free = (await s.call("check_availability", "POST", "/api/check-availability", json=s.window_payload()))["availableCount"]
+
+    cars = []
+    for i in range(free + 1):
+        d = await s.call("create_booking", "POST", "/api/create-booking",
+                         json=s.booking_payload(fullName=f"Overlap Tester {i + 1}", phoneNumber=f"{s.vars['phone']}{i}"))
+        if not d.get("success"):
+            if d.get("error") != "NO_AVAILABILITY":
+                raise FlowFailure(f"unexpected error {d.get('error')}")
+            break
+        cars.append(d["assignedCar"]["id"])
+    else:
+        raise FlowFailure(f"booked {len(cars)} overlapping {category} cars but only {free} were free")
+
+    if len(set(cars)) != len(cars):
+        raise FlowFailure(f"same car assigned twice for one window: {cars}")
+    return {"free": free, "cars": cars}
+
+
+FLOWS: Dict[str, Callable] = {
+    "booking_call": booking_call,
+    "inquiry_call": inquiry_call,
+    "overlap_analytics": overlap_analytics,
+}
+
+
+def recorded_flow(steps: list) -> Callable:
+    """Wrap a recorded list of steps as a flow."""
+
+    async def run(s: Session) -> None:
+        for i, step in enumerate(steps):
+            body = _fill(step.get("json"), s.vars)
+            name = step.get("name") or step["path"].rsplit("/", 1)[-1].replace("-", "_")
+            d = await s.call(name, step.get("method", "POST"), step["path"], json=body,
+                             headers=step.get("headers"), params=step.get("params"))
+            if isinstance(d, dict) and d.get("bookingReference"):
+                s.vars["ref"] = d["bookingReference"]
+
+    return run
+
+
+def _fill(value, variables: dict):
+    if isinstance(value, str):
+        return value.format_map(variables)
+    if isinstance(value, dict):
+        return {k: _fill(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, variables) for v in value]
+    return value
+
+
+# --- Drivers ---
+
+async def run_session(client, stats, rnd, flows, weights, think_ms) -> None:
+    name = rnd.choices(list(flows), weights)[0]
+    s = Session(client, stats, rnd, think_ms)
+    failure = None
+    try:
+        await flows[name](s)
+    except FlowFailure as e:
+        failure = str(e)
+    except Exception as e:
+        failure = f"crash: {e!r}"
+    stats.flow_done(name, failure)
+
+
+async def drive(args, flows: Dict[str, Callable], weights: List[float]) -> Stats:
+    import httpx
+
+    stats = Stats()
+    rnd = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        deadline = time.perf_counter() + args.duration
+        if args.rate:
+            # Open loop: Poisson arrivals regardless of how fast the server answers.
+            tasks = set()
+            while time.perf_counter() < deadline:
+                t = asyncio.create_task(run_session(client, stats, random.Random(rnd.random()), flows, weights, args.think_ms))
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
+                await asyncio.sleep(rnd.expovariate(args.rate))
+            if tasks:
+                await asyncio.wait(tasks, timeout=args.timeout)
+        else:
+            async def loop(i):
+                local = random.Random(rnd.random())
+                while time.perf_counter() < deadline:
+                    await run_session(client, stats, local, flows, weights, args.think_ms)
+            await asyncio.gather(*(loop(i) for i in range(args.concurrency)))
+    return stats
+
+
+def find_double_bookings(database_url: Optional[str] = None, limit: int = 20) -> dict:
+    """Active bookings that overlap on the same car (should always be zero)."""
+    from sqlalchemy import create_engine, text
+
+    if database_url is None:
+        import database
+        engine = database.engine
+    else:
+        engine = create_engine(database_url)
+    sql = """
+        SELECT a.assigned_car_id, a.booking_reference, b.booking_reference
+          FROM bookings a JOIN bookings b
+            ON a.assigned_car_id = b.assigned_car_id AND a.id < b.id
+         WHERE a.status IN ('booked', 'confirmed') AND b.status IN ('booked', 'confirmed')
+           AND a.pickup_date_time < b.return_date_time AND a.return_date_time > b.pickup_date_time
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql)).fetchall()
+    return {"count": len(rows), "examples": [list(r) for r in rows[:limit]]}
+
+
+def build_report(args, stats: Stats, elapsed: float, violations: Optional[dict]) -> dict:
+    steps = {}
+    total = 0
+    for step, lat in sorted(stats.latencies.items()):
+        codes = dict(stats.status[step])
+        errors = sum(n for code, n in codes.items() if code == "error" or int(code) >= 400)
+        total += len(lat)
+        steps[step] = {"requests": len(lat), "error_rate": round(errors / len(lat), 4), "status": codes, **summarize_ms(lat)}
+    return {
+        "commit": git_revision(),
+        "generated_at": datetime.utcnow().isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k != "flows"},
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "steps": steps,
+        "flows": {k: dict(v) for k, v in stats.flows.items()},
+        "flow_failures": stats.failures,
+        "double_bookings": violations,
+    }
+
+
+def parse_mix(mix: str, flows: Dict[str, Callable]) -> List[float]:
+    weights = dict.fromkeys(flows, 0.0)
+    for part in mix.split(","):
+        name, _, w = part.partition("=")
+        if name not in flows:
+            raise SystemExit(f"unknown flow in --mix: {name}")
+        weights[name] = float(w or 1)
+    return [weights[n] for n in flows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=20, help="closed-loop sessions")
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop session arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause before each step")
+    parser.add_argument("--mix", default="booking_call=6,inquiry_call=3,overlap_analytics=1")
+    parser.add_argument("--flows", help="JSON file of recorded flows (replaces the scripted mix)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"),
+                        help="database to scan for double bookings (default: database.py's)")
+    parser.add_argument("--skip-db-check", action="store_true")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    if args.flows:
+        with open(args.flows) as fh:
+            flows = {name: recorded_flow(steps) for name, steps in json.load(fh)["flows"].items()}
+        weights = [1.0] * len(flows)
+    else:
+        flows = FLOWS
+        weights = parse_mix(args.mix, flows)
+
+    t0 = time.perf_counter()
+    stats = asyncio.run(drive(args, flows, weights))
+    elapsed = time.perf_counter() - t0
+    violations = None if args.skip_db_check else find_double_bookings(args.database_url)
+    report = build_report(args, stats, elapsed, violations)
+
+    print(f"{report['requests']} requests in {report['elapsed_seconds']}s = {report['throughput_rps']} req/s")
+    for step, r in report["steps"].items():
+        print(f"  {step:<20} n={r['requests']:<6} err={r['error_rate']:<6} p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms")
+    print(f"  flows: {report['flows']}")
+    for f in report["flow_failures"][:10]:
+        print(f"  FAIL {f}")
+    if violations is not None:
+        print(f"  double-booked pairs: {violations['count']}")
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
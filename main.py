@@ -1,32 +1,132 @@
+import csv
+import hashlib
+import hmac
+import io
+import json
 import random
 import string
+import threading
 import os
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 from dateutil import parser as dtparser
 from typing import List, Optional, Tuple
-from fastapi import FastAPI, Depends, HTTPException, Header, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Header, BackgroundTasks, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, case
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, or_, func, case, exists, select, insert, update, union, union_all, literal, cast, String
+from sqlalchemy.exc import IntegrityError
 
 import database
 import logging
-logging.basicConfig(level=logging.INFO)
+import structured_log
+if os.getenv("LOG_FORMAT", "json") == "json":
+    structured_log.setup_logging(level=logging.INFO)
+else:
+    logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from database import Car, Booking, get_db, init_db, SessionLocal, engine
+from database import Car, Booking, BookingArchive, CarHold, get_db, init_db, SessionLocal, engine
 import calendar_service
+from cache import make_cache
+import metrics
+import query_guard
+import profiling
+import tracing
+import fast_json
+import vapi_tools
+from singleflight import SingleFlight
+import availability
+import assignment
+import archive
+import events
+import secrets
+from timers import ExpiryTimer
 
 KHI_TZ = ZoneInfo("Asia/Karachi")
 DEBUG_BOOKING = os.getenv("DEBUG_BOOKING", "0") == "1"
 
-def dlog(msg: str, **kwargs):
-    if DEBUG_BOOKING:
-        logger.info("[DEBUG_BOOKING] " + msg + " | " + str(kwargs))
+def dlog(event: str, **fields):
+    """Booking trace event; pass expensive fields as lambdas so they are only built when emitted."""
+    structured_log.log_event(logger, event, level=logging.INFO if DEBUG_BOOKING else logging.DEBUG, **fields)
+
+# Shared read cache (memory:// for one worker, redis://host:port/db across workers).
+# Namespaces: "booking" = get-booking answers, "fleet" = active cars per category,
+# "analytics" = admin dashboard summary. Each maps to (maxsize, ttl seconds).
+def build_app_cache():
+    cache = make_cache(
+        os.getenv("CACHE_URL", "memory://"),
+        namespaces={
+            "booking": (int(os.getenv("BOOKING_CACHE_SIZE", "512")), float(os.getenv("BOOKING_CACHE_TTL", "30"))),
+            "fleet": (64, float(os.getenv("FLEET_CACHE_TTL", "60"))),
+            "analytics": (4, float(os.getenv("ANALYTICS_CACHE_TTL", "10"))),
+            "idempotency": (int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "4096")), float(os.getenv("IDEMPOTENCY_TTL", "600"))),
+        },
+    )
+    # Booking events published by other workers reach this worker's dashboard streams.
+    cache.on_event(lambda message: booking_events.receive(message))
+    return cache
+
+# Dashboard change feed (GET /api/admin/booking-events); see events.py.
+booking_events = events.Broadcaster(lambda: app_cache)
+
+app_cache = build_app_cache()
+
+def booking_cache_keys(reference: Optional[str], phone: Optional[str], full_name: Optional[str]) -> list:
+    keys = []
+    if reference:
+        keys.append(("ref", reference))
+    if phone:
+        keys.append(("phone", phone, None))
+        if full_name:
+            keys.append(("phone", phone, full_name))
+    return keys
+
+def booking_row_cache_keys(b: Booking) -> list:
+    """Every get-booking key that could resolve to this row (read before commit expires it)."""
+    return booking_cache_keys(b.booking_reference, b.phone_number, b.full_name)
+
+def invalidate_booking_caches(keys: list) -> None:
+    app_cache.delete("booking", *keys)
+    app_cache.delete("analytics", "summary")
+
+def after_commit(effect, *args, **kwargs) -> None:
+    """Run a post-commit side effect (cache invalidation, bitmaps, events) best-effort.
+
+    The write is already durable, so a failure here (e.g. Redis unreachable)
+    must not turn the response into an error that a client would retry into
+    a duplicate. It is logged, and the bitmaps are rebuilt on next use.
+    """
+    try:
+        effect(*args, **kwargs)
+    except Exception:
+        logger.exception("Post-commit %s failed", getattr(effect, "__name__", effect))
+        availability_engine.mark_stale()
 
 app = FastAPI(title="Renta Car Backend")
 
+class InstrumentedRoute(profiling.ProfilingRoute):
+    """Every handler runs in a tracing span, inside the optional cProfile capture."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, tracing.wrap_endpoint(endpoint), **kwargs)
+
+# Must be set before any route is declared so every handler is instrumented.
+app.router.route_class = InstrumentedRoute
+
+metrics.install_db_metrics()
+app.add_middleware(metrics.PrometheusMiddleware)
+tracing.configure_from_env()
+tracing.install_db_tracing()
+app.add_middleware(tracing.TracingMiddleware)
+if DEBUG_BOOKING:
+    # Logs statements a single request repeats (N+1 loops) while debugging.
+    app.add_middleware(query_guard.RepeatedQueryMiddleware)
+app.add_middleware(profiling.ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -35,10 +135,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database on startup
+# Initialize database on startup (serve.py migrates once before forking and sets RENTACAR_DB_READY)
 @app.on_event("startup")
 def on_startup():
-    init_db()
+    if os.getenv("RENTACAR_DB_READY") != "1":
+        init_db()
+    purge_expired_holds()
+    if REOPTIMIZE_INTERVAL_SECONDS > 0:
+        reoptimize_timer.schedule("reoptimize", time.time() + REOPTIMIZE_INTERVAL_SECONDS)
 
 # --- Pydantic Models ---
 from pydantic import BaseModel, Field
@@ -63,6 +167,8 @@ class CreateBookingRequest(BaseModel):
     dropoff_location: str = Field(..., alias="dropoffLocation")
     car_category: str = Field(..., alias="carCategory")
     notes: Optional[str] = None
+    # From POST /api/holds: book the held car (if the hold is still live and covers this window).
+    hold_id: Optional[str] = Field(None, alias="holdId")
 
     model_config = {
         "populate_by_name": True
@@ -88,6 +194,52 @@ class BookingResponse(BaseModel):
         "populate_by_name": True
     }
 
+class GroupCarRequest(BaseModel):
+    car_category: str = Field(..., alias="carCategory")
+    quantity: int = Field(1, ge=1)
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+class CreateGroupBookingRequest(BaseModel):
+    full_name: str = Field(..., alias="fullName")
+    phone_number: str = Field(..., alias="phoneNumber")
+    pickup_date_time: str = Field(..., alias="pickupDateTime")
+    return_date_time: Optional[str] = Field(None, alias="returnDateTime")
+    pickup_location: str = Field(..., alias="pickupLocation")
+    dropoff_location: str = Field(..., alias="dropoffLocation")
+    cars: List[GroupCarRequest] = Field(..., min_length=1)
+    notes: Optional[str] = None
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+class GroupBookingItem(BaseModel):
+    booking_reference: str = Field(..., alias="bookingReference")
+    car_category: str = Field(..., alias="carCategory")
+    assigned_car: CarInfo = Field(..., alias="assignedCar")
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+class GroupBookingResponse(BaseModel):
+    success: bool
+    message: str
+    error: Optional[str] = None
+    bookings: List[GroupBookingItem] = []
+    # Requested minus assignable cars per category, when the group could not be placed.
+    shortfall: Optional[dict] = None
+    pickup_date_time: Optional[str] = Field(None, alias="pickupDateTime")
+    return_date_time: Optional[str] = Field(None, alias="returnDateTime")
+    calendar_status: Optional[str] = Field(None, alias="calendarStatus")
+
+    model_config = {
+        "populate_by_name": True
+    }
+
 class CheckAvailabilityRequest(BaseModel):
     pickup_date_time: str = Field(..., alias="pickupDateTime")
     return_date_time: str = Field(..., alias="returnDateTime")
@@ -119,6 +271,7 @@ class GetBookingRequest(BaseModel):
 
 class SingleBookingInfo(BaseModel):
     id: Optional[int] = None
+    booking_reference: Optional[str] = Field(None, alias="bookingReference")
     customer_name: str = Field(..., alias="customerName")
     customer_phone: str = Field(..., alias="customerPhone")
     pickup_date_time: str = Field(..., alias="pickupDateTime")
@@ -145,56 +298,248 @@ class AllBookingsResponse(BaseModel):
         "populate_by_name": True
     }
 
-def is_car_available(db: Session, car_id: int, pickup_dt_str: str, return_dt_str: str):
+# Bookings in these statuses hold their car for the booked window.
+ACTIVE_BOOKING_STATUSES = ("booked", "confirmed")
+
+def overlap_clause(pickup_dt: datetime, return_dt: datetime):
     # Overlap Rule: new_start < existing_end AND new_end > existing_start
-    overlapping_booking = db.query(Booking).filter(
-        Booking.assigned_car_id == car_id,
-        Booking.status == "confirmed",
-        and_(
-            Booking.pickup_date_time < return_dt_str,
-            Booking.return_date_time > pickup_dt_str
+    if database.is_postgres():
+        # Same rule as a range test, served by the exclusion constraint's GiST index.
+        return and_(
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            database.booking_window.op("&&")(func.tsrange(pickup_dt, return_dt, "[)")),
         )
-    ).first()
-    return overlapping_booking is None
+    return and_(
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        Booking.pickup_date_time < return_dt,
+        Booking.return_date_time > pickup_dt,
+    )
 
-def safe_calendar_sync(booking_id: int) -> None:
-    """Background: sync booking to Google Calendar with elite tracking."""
+def hold_overlap_clause(pickup_dt: datetime, return_dt: datetime, exclude_hold: Optional[str] = None):
+    """Unexpired holds overlapping the window (same rule as bookings)."""
+    clause = and_(
+        CarHold.expires_at > datetime.utcnow(),
+        CarHold.pickup_date_time < return_dt,
+        CarHold.return_date_time > pickup_dt,
+    )
+    return and_(clause, CarHold.id != exclude_hold) if exclude_hold else clause
+
+def is_car_available(db: Session, car_id: int, pickup_dt: datetime, return_dt: datetime):
+    overlapping = db.execute(union_all(
+        select(Booking.assigned_car_id).where(Booking.assigned_car_id == car_id, overlap_clause(pickup_dt, return_dt)),
+        select(CarHold.car_id).where(CarHold.car_id == car_id, hold_overlap_clause(pickup_dt, return_dt)),
+    ).limit(1)).first()
+    return overlapping is None
+
+def category_fleet(db: Session, category: str) -> List[dict]:
+    """Active cars in a category (case-insensitive), served from the shared fleet cache."""
+    key = category.lower()
+    fleet = app_cache.get("fleet", key)
+    if fleet is None:
+        cars = db.query(Car.id, Car.plate_number, Car.name, Car.category).filter(
+            func.lower(Car.category) == key,
+            Car.status.in_(["active", "available"]),
+        ).order_by(Car.id).all()
+        fleet = [
+            {"id": c.id, "plateNumber": c.plate_number, "name": c.name, "category": c.category}
+            for c in cars
+        ]
+        app_cache.set("fleet", key, fleet)
+    return fleet
+
+def busy_car_ids(db: Session, car_ids: List[int], pickup_dt: datetime, return_dt: datetime,
+                 exclude_hold: Optional[str] = None) -> set:
+    """Subset of `car_ids` with an overlapping active booking or hold, in one query."""
+    if not car_ids:
+        return set()
+    rows = db.execute(union(
+        select(Booking.assigned_car_id).where(Booking.assigned_car_id.in_(car_ids), overlap_clause(pickup_dt, return_dt)),
+        select(CarHold.car_id).where(CarHold.car_id.in_(car_ids), hold_overlap_clause(pickup_dt, return_dt, exclude_hold)),
+    )).all()
+    return {r[0] for r in rows}
+
+def ensure_no_clash(db: Session, car_ids: List[int], pickup_dt: datetime, return_dt: datetime,
+                    own_bookings: List[int] = (), own_hold: Optional[str] = None) -> None:
+    """Post-insert overlap check against other bookings and live holds on `car_ids`.
+
+    Run after flushing our own rows. On SQLite the transaction then holds
+    the write lock, so every other committed row is visible and none can
+    commit until we do. PostgreSQL's exclusion constraint only covers
+    bookings, so there the car rows are locked first: every creator of a
+    booking or hold passes through here, so creators for the same car
+    serialize and each sees the others' committed rows. A clash raises an
+    IntegrityError that is_overlap_violation() recognises, so callers
+    handle it exactly like the constraint firing.
+    """
+    if database.is_postgres():
+        # NO KEY UPDATE: conflicts with other lockers but not with the KEY SHARE
+        # lock our own insert's foreign-key check took (FOR UPDATE would deadlock).
+        db.execute(select(Car.id).where(Car.id.in_(car_ids)).order_by(Car.id).with_for_update(key_share=True)).all()
+    clash = db.execute(union_all(
+        select(Booking.assigned_car_id).where(
+            Booking.assigned_car_id.in_(car_ids), Booking.id.notin_(list(own_bookings)), overlap_clause(pickup_dt, return_dt)),
+        select(CarHold.car_id).where(CarHold.car_id.in_(car_ids), hold_overlap_clause(pickup_dt, return_dt, own_hold)),
+    ).limit(1)).first()
+    if clash is not None:
+        raise IntegrityError("overlap check", None, Exception(f"{database.OVERLAP_CONSTRAINT}: car {clash[0]} taken concurrently"))
+
+def car_gaps(db: Session, car_ids: List[int], pickup_dt: datetime, return_dt: datetime) -> dict:
+    """car_id -> (prev_end, next_start) around the window, or None if the car is busy; one query.
+
+    Same occupancy as busy_car_ids() (active bookings and live holds); cars
+    with nothing scheduled get (None, None).
+    """
+    if not car_ids:
+        return {}
+    occupied = union_all(
+        select(Booking.assigned_car_id.label("car_id"), Booking.pickup_date_time.label("start"),
+               Booking.return_date_time.label("end")).where(
+            Booking.assigned_car_id.in_(car_ids), Booking.status.in_(ACTIVE_BOOKING_STATUSES)),
+        select(CarHold.car_id, CarHold.pickup_date_time, CarHold.return_date_time).where(
+            CarHold.car_id.in_(car_ids), CarHold.expires_at > datetime.utcnow()),
+    ).subquery()
+    rows = db.execute(select(
+        occupied.c.car_id,
+        func.max(case((and_(occupied.c.start < return_dt, occupied.c.end > pickup_dt), 1), else_=0)),
+        func.max(case((occupied.c.end <= pickup_dt, occupied.c.end))),
+        func.min(case((occupied.c.start >= return_dt, occupied.c.start))),
+    ).group_by(occupied.c.car_id)).all()
+    gaps = {car_id: (None, None) for car_id in car_ids}
+    for car_id, busy, prev_end, next_start in rows:
+        gaps[car_id] = None if busy else (as_datetime(prev_end), as_datetime(next_start))
+    return gaps
+
+def as_datetime(value) -> Optional[datetime]:
+    # SQLite hands aggregates of DATETIME columns back as text.
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def occupancy_rows(db: Session, start: datetime, end: datetime) -> list:
+    """Everything occupying a car within [start, end) for the slot bitmaps: bookings and live holds."""
+    rows = db.execute(union_all(
+        select(literal("b"), cast(Booking.id, String), Booking.assigned_car_id,
+               Booking.pickup_date_time, Booking.return_date_time).where(
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            Booking.assigned_car_id.isnot(None),
+            Booking.return_date_time > start,
+            Booking.pickup_date_time < end,
+        ),
+        select(literal("h"), CarHold.id, CarHold.car_id, CarHold.pickup_date_time, CarHold.return_date_time).where(
+            hold_overlap_clause(start, end),
+        ),
+    )).all()
+    return [(int(key) if kind == "b" else ("hold", key), car_id, p, r) for kind, key, car_id, p, r in rows]
+
+# Slot bitmaps answer availability without SQL while in sync (see availability.py).
+availability_engine = availability.AvailabilityEngine(lambda: app_cache, occupancy_rows)
+
+def find_available_cars(db: Session, category: str, pickup_dt: datetime, return_dt: datetime) -> List[dict]:
+    """All active cars in `category` with no overlapping booking, as CarInfo dicts."""
+    fleet = category_fleet(db, category)
+    car_ids = [c["id"] for c in fleet]
+    busy = availability_engine.busy_car_ids(db, car_ids, pickup_dt, return_dt) if availability.ENABLED else None
+    if busy is None:
+        busy = busy_car_ids(db, car_ids, pickup_dt, return_dt)
+    return [c for c in fleet if c["id"] not in busy]
+
+def find_assignable_cars(db: Session, category: str, pickup_dt: datetime, return_dt: datetime) -> List[dict]:
+    """Cars create_booking may assign, in the order assignment.STRATEGY prefers them."""
+    return assignable_cars_by_category(db, [category], pickup_dt, return_dt)[category]
+
+def assignable_cars_by_category(db: Session, categories: List[str], pickup_dt: datetime, return_dt: datetime) -> dict:
+    """category -> assignable cars, from one availability snapshot (one query for all categories).
+
+    Current bitmaps narrow the candidates, SQL has the final say: the bitmaps
+    can lag other workers' writes, so the remaining candidates are always
+    confirmed in the database; a disagreement marks them stale. Best-fit gets
+    each car's gap from the same query (car_gaps) that confirms it is free.
+    """
+    fleets = {cat: category_fleet(db, cat) for cat in categories}
+    candidates = [c["id"] for fleet in fleets.values() for c in fleet]
+    known_busy = availability_engine.busy_car_ids_if_fresh(candidates, pickup_dt, return_dt) if availability.ENABLED else None
+    if known_busy:
+        candidates = [i for i in candidates if i not in known_busy]
+    gaps = None
+    if assignment.STRATEGY is assignment.first_fit:
+        busy = busy_car_ids(db, candidates, pickup_dt, return_dt)
+    else:
+        gaps = car_gaps(db, candidates, pickup_dt, return_dt)
+        busy = {car_id for car_id, gap in gaps.items() if gap is None}
+    if known_busy is not None and busy:
+        availability_engine.mark_stale()
+    busy |= known_busy or set()
+    result = {}
+    for cat, fleet in fleets.items():
+        free = [c for c in fleet if c["id"] not in busy]
+        if gaps is not None:
+            by_id = {c["id"]: c for c in free}
+            free = [by_id[i] for i in assignment.STRATEGY(list(by_id), gaps, pickup_dt, return_dt)]
+        result[cat] = free
+    return result
+
+def safe_calendar_sync(booking_id: int, traceparent: Optional[str] = None) -> None:
+    """Background: sync booking to Google Calendar with elite tracking.
+
+    `traceparent` is the creating request's span, passed explicitly because
+    the task runs after that request has finished.
+    """
+    with tracing.start_span("safe_calendar_sync", traceparent=traceparent, **{"booking.id": booking_id}):
+        _calendar_sync([booking_id])
+
+def safe_calendar_sync_batch(booking_ids: List[int], traceparent: Optional[str] = None) -> None:
+    """Background: calendar sync for a group booking, one task and one session for all of it."""
+    with tracing.start_span("safe_calendar_sync_batch", traceparent=traceparent, **{"booking.count": len(booking_ids)}):
+        _calendar_sync(booking_ids)
+
+def _calendar_sync(booking_ids: List[int]) -> None:
+    started = time.perf_counter()
     db = SessionLocal()
     try:
-        b = db.query(Booking).filter(Booking.id == booking_id).first()
-        if not b:
-            return
-
+        bookings = {b.id: b for b in db.query(Booking).filter(Booking.id.in_(booking_ids)).all()}
         cal_id = os.getenv("GOOGLE_CALENDAR_ID")
         sa_file = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
-
-        if not cal_id or not sa_file:
-            b.calendar_status = "skipped"
-            db.commit()
-            return
-
-        start_dt = b.pickup_date_time
-        end_dt = b.return_date_time or (start_dt + timedelta(hours=1))
-
-        try:
-            # Note: We assume calendar_service.create_calendar_event exists and is functional
-            # Refactored to match user's requested logic flow
-            result = calendar_service.create_calendar_event(b)
-            if result:
-                b.calendar_status = "created"
-                if isinstance(result, dict):
-                    b.calendar_event_id = result.get("id")
-            else:
+        cache_keys = []
+        outcomes = []
+        changes = []
+        for booking_id in booking_ids:
+            t0 = time.perf_counter()
+            b = bookings.get(booking_id)
+            if not b:
+                outcomes.append(("missing", time.perf_counter() - t0))
+                continue
+            cache_keys.extend(booking_row_cache_keys(b))
+            if not cal_id or not sa_file:
+                b.calendar_status = "skipped"
+                outcomes.append(("skipped", time.perf_counter() - t0))
+                changes.append((b.id, b.booking_reference, b.calendar_status))
+                continue
+
+            try:
+                # Note: We assume calendar_service.create_calendar_event exists and is functional
+                # Refactored to match user's requested logic flow
+                result = calendar_service.create_calendar_event(b)
+                if result:
+                    b.calendar_status = "created"
+                    if isinstance(result, dict):
+                        b.calendar_event_id = result.get("id")
+                else:
+                    b.calendar_status = "failed"
+            except Exception as e:
+                logger.exception("Calendar sync failed for booking_id=%s", booking_id)
                 b.calendar_status = "failed"
-        except Exception as e:
-            logger.exception("Calendar sync failed for booking_id=%s", booking_id)
-            b.calendar_status = "failed"
+            outcomes.append((b.calendar_status, time.perf_counter() - t0))
+            changes.append((b.id, b.booking_reference, b.calendar_status))
         db.commit()
+        after_commit(invalidate_booking_caches, cache_keys)
+        for booking_id, reference, status in changes:
+            after_commit(booking_events.publish, "booking.calendar", id=booking_id, bookingReference=reference, calendarStatus=status)
     except Exception:
         logger.exception("Calendar sync fatal error")
         db.rollback()
+        outcomes = [("error", time.perf_counter() - started)] * len(booking_ids)
     finally:
         db.close()
+    for outcome, seconds in outcomes:
+        metrics.calendar_sync_seconds.observe(seconds, outcome)
 
 # --- Helpers ---
 
@@ -207,6 +552,11 @@ def mask_phone(phone: str) -> str:
     # Keep first two and last two
     return f"{p[:2]}***{p[-2:]}"
 
+structured_log.configure_redaction({
+    "fullName": mask_name, "full_name": mask_name,
+    "phoneNumber": mask_phone, "phone_number": mask_phone, "phone": mask_phone,
+})
+
 def parse_datetime_robust(dt_str: str) -> datetime:
     s = dt_str.strip()
     dt = dtparser.parse(s)
@@ -230,114 +580,105 @@ def normalize_category(cat: str) -> str:
     }
     return mapping.get(c, cat.strip().title())
 
-@app.post("/api/create-booking", response_model=BookingResponse)
-def create_booking(payload: CreateBookingRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    logger.info("CREATE_BOOKING HIT | payload=%s", payload.model_dump(by_alias=True))
-
-    # 1) Parse pickup
-    try:
-        pickup_dt = parse_datetime_robust(payload.pickup_date_time)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid pickupDateTime: {str(e)}")
-
-    # 2) Parse/Default return
+REFERENCE_RETRIES = 8
+REFERENCE_BACKOFF_SECONDS = 0.01
+
+# --- Create-booking idempotency ---
+# Voice-agent retries of a timed-out create-booking replay the stored response
+# instead of booking again. The key is the Idempotency-Key header, or a hash of
+# the normalized payload when the caller sends none. Stored in app_cache's
+# "idempotency" namespace (bounded, TTL). A per-key lock makes concurrent
+# duplicates in one worker wait for the first instead of racing it, without
+# holding up requests under other keys.
+IDEMPOTENCY_IN_FLIGHT = {}  # key -> [lock, requests holding or waiting]; only keys in flight
+IDEMPOTENCY_IN_FLIGHT_GUARD = threading.Lock()
+
+@contextmanager
+def idempotency_slot(key: str):
+    with IDEMPOTENCY_IN_FLIGHT_GUARD:
+        entry = IDEMPOTENCY_IN_FLIGHT.get(key)
+        if entry is None:
+            entry = IDEMPOTENCY_IN_FLIGHT[key] = [threading.Lock(), 0]
+        entry[1] += 1
     try:
-        if payload.return_date_time:
-            return_dt = parse_datetime_robust(payload.return_date_time)
-        else:
-            return_dt = pickup_dt + timedelta(hours=1)  # default 1 hour
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid returnDateTime: {str(e)}")
-
-    if return_dt <= pickup_dt:
-        return {
-            "success": False,
-            "error": "VALIDATION_ERROR",
-            "message": "Return time must be after pickup.",
-        }
-
-    # 3) Normalize category
-    cat = normalize_category(payload.car_category)
-
-    # 4) Find an available car (accept active/available) + case-insensitive category
-    car = db.query(Car).filter(
-        func.lower(Car.category) == cat.lower(),
-        Car.status.in_(["active", "available"])
-    ).first()
-
-    if not car:
-        return {
-            "success": False,
-            "error": "NO_AVAILABILITY",
-            "message": f"No cars available in category: {cat}.",
-        }
+        with entry[0]:
+            yield
+    finally:
+        with IDEMPOTENCY_IN_FLIGHT_GUARD:
+            entry[1] -= 1
+            if not entry[1]:
+                del IDEMPOTENCY_IN_FLIGHT[key]
 
-    # 5) Save booking
-    booking_ref = generate_elite_reference(db)
+def booking_payload_fingerprint(payload: CreateBookingRequest) -> str:
+    def norm(v: Optional[str]) -> str:
+        return " ".join((v or "").split()).casefold()
 
-    booking = Booking(
-        booking_reference=booking_ref,
-        full_name=payload.full_name.strip(),
-        phone_number=payload.phone_number.strip(),
-        pickup_location=payload.pickup_location.strip(),
-        dropoff_location=payload.dropoff_location.strip(),
-        car_category=cat,
-        notes=payload.notes,
-        pickup_date_time=pickup_dt,
-        return_date_time=return_dt,
-        assigned_car_id=car.id,
-        status="booked",
-    )
-
-    try:
-        db.add(booking)
-        db.commit()
-        db.refresh(booking)
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-
-    # 6) Calendar sync (best-effort)
-    background_tasks.add_task(safe_calendar_sync, booking.id)
+    def when(v: Optional[str]) -> str:
+        try:
+            return parse_datetime_robust(v).isoformat() if v else ""
+        except Exception:
+            return norm(v)
+
+    canonical = [
+        norm(payload.full_name),
+        "".join(ch for ch in payload.phone_number if ch.isdigit() or ch == "+"),
+        norm(payload.pickup_location),
+        norm(payload.dropoff_location),
+        normalize_category(payload.car_category),
+        when(payload.pickup_date_time),
+        when(payload.return_date_time),
+        norm(payload.notes),
+    ]
+    return hashlib.sha256(json.dumps(canonical).encode("utf-8")).hexdigest()
+
+def booking_idempotency_key(header_key: Optional[str], fingerprint: str) -> str:
+    return f"key:{header_key.strip()}" if header_key and header_key.strip() else f"payload:{fingerprint}"
+
+def remember_idempotent_booking(key: str, fingerprint: str, resp: dict, references: List[str]) -> None:
+    """Store a replayable response for the booking(s) it created (one, or every member of a group)."""
+    app_cache.set("idempotency", key, {"fingerprint": fingerprint, "response": resp, "references": references})
+    # Reverse entries so cancelling any of them can drop the replay (forget_idempotent_booking).
+    for reference in references:
+        app_cache.set("idempotency", f"booking:{reference}", key)
+
+def forget_idempotent_booking(reference: str) -> None:
+    """A cancelled booking must not be replayed: a retry after cancelling books again."""
+    key = app_cache.get("idempotency", f"booking:{reference}")
+    if key is None:
+        return
+    stored = app_cache.get("idempotency", key)
+    references = set(stored.get("references", ())) if stored else set()
+    references.add(reference)
+    app_cache.delete("idempotency", key, *[f"booking:{r}" for r in references])
+
+@tracing.traced()
+def generate_elite_reference(db: Session) -> str:
+    return allocate_reference_block(db, 1)[0]
 
-    # 7) Return response (masking OK for voice)
-    return {
-        "success": True,
-        "message": "Booking created successfully.",
-        "status": "booked",
-        "bookingReference": booking.booking_reference,
-        "assignedCar": {
-            "id": car.id,
-            "plateNumber": car.plate_number,
-            "name": car.name,
-            "category": car.category,
-        },
-        "pickupDateTime": booking.pickup_date_time.isoformat(),
-        "returnDateTime": booking.return_date_time.isoformat() if booking.return_date_time else None,
-        "carCategory": booking.car_category,
-        "pickupLocation": booking.pickup_location,
-        "dropoffLocation": booking.dropoff_location,
-        "fullName": mask_name(booking.full_name),
-        "phoneNumber": mask_phone(booking.phone_number),
-        "calendarStatus": booking.calendar_status or "pending",
-    }
+def allocate_reference_block(db: Session, count: int) -> List[str]:
+    """`count` consecutive references after today's last one.
 
-def generate_elite_reference(db: Session) -> str:
+    Nothing is reserved: a concurrent creator taking a number in the block
+    surfaces as a unique violation on insert, and the caller retries.
+    """
     today_str = datetime.now().strftime("%Y%m%d")
     prefix = f"RC-{today_str}-"
-    last_booking = db.query(Booking).filter(
-        Booking.booking_reference.like(f"{prefix}%")
-    ).order_by(Booking.booking_reference.desc()).first()
-    
-    if last_booking:
+    # Archived bookings keep their references, so today's last one may be in either table.
+    last = union_all(*(
+        select(func.max(model.booking_reference).label("ref")).where(model.booking_reference.like(f"{prefix}%"))
+        for model in (Booking, BookingArchive)
+    )).subquery()
+    last_reference = db.execute(select(func.max(last.c.ref))).scalar()
+
+    if last_reference:
         try:
-            last_seq = int(last_booking.booking_reference.split("-")[-1])
+            last_seq = int(last_reference.split("-")[-1])
             new_seq = last_seq + 1
         except:
             new_seq = 1
     else:
         new_seq = 1
-    return f"{prefix}{new_seq:04d}"
+    return [f"{prefix}{seq:04d}" for seq in range(new_seq, new_seq + count)]
 
 @app.get("/api/admin/analytics")
 def admin_analytics(
@@ -348,6 +689,10 @@ def admin_analytics(
     if x_admin_key != env_admin_key:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
+    cached = app_cache.get("analytics", "summary")
+    if cached is not None:
+        return cached
+
     now = datetime.utcnow()
     today_start = datetime(now.year, now.month, now.day)
     next_24h = now + timedelta(hours=24)
@@ -371,7 +716,7 @@ def admin_analytics(
           .all()
     )
 
-    return {
+    summary = {
         "ok": True,
         "total_bookings": total,
         "bookings_by_status": by_status,
@@ -381,6 +726,51 @@ def admin_analytics(
         "calendar_status_counts": cal_stats,
         "generated_at": now.isoformat()
     }
+    app_cache.set("analytics", "summary", summary)
+    return summary
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/admin/cache-stats")
+def admin_cache_stats(x_admin_key: str = Header(None, alias="X-Admin-Key")):
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    return {"ok": True, "cache": app_cache.stats(), "singleflight": {"availability": availability_flight.stats()},
+            "availability": availability_engine.stats()}
+
+@app.get("/api/admin/profiles")
+def admin_list_profiles(x_admin_key: str = Header(None, alias="X-Admin-Key")):
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    return {"ok": True, "profiles": profiling.store.list()}
+
+@app.get("/api/admin/profiles/{profile_id}")
+def admin_get_profile(
+    profile_id: str,
+    format: str = "prof",
+    sort: str = "cumulative",
+    x_admin_key: str = Header(None, alias="X-Admin-Key"),
+):
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    rec = profiling.store.get(profile_id)
+    if rec is None or rec.stats is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return Response(content=rec.text(sort=sort), media_type="text/plain")
+    return Response(
+        content=rec.dump(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+    )
 
 def calculate_duration_str(start: datetime, end: datetime) -> str:
     try:
@@ -395,8 +785,33 @@ def calculate_duration_str(start: datetime, end: datetime) -> str:
         return "Unknown"
 
 @app.post("/api/create-booking", response_model=BookingResponse)
-def create_booking(payload: CreateBookingRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    dlog("payload_received", payload=payload.model_dump(by_alias=True))
+def create_booking(
+    payload: CreateBookingRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    fingerprint = booking_payload_fingerprint(payload)
+    key = booking_idempotency_key(idempotency_key, fingerprint)
+    with idempotency_slot(key):
+        stored = app_cache.get("idempotency", key)
+        if stored is not None:
+            if stored["fingerprint"] != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different booking payload.")
+            dlog("idempotent_replay", key=key)
+            metrics.idempotent_replays_total.inc()
+            response = fast_json.model_response(BookingResponse, stored["response"])
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+
+        resp = _create_booking(payload, background_tasks, db)
+        # Only successes are replayed; a failed attempt may succeed when retried.
+        if resp.get("success"):
+            remember_idempotent_booking(key, fingerprint, resp, [resp["bookingReference"]])
+    return fast_json.model_response(BookingResponse, resp)
+
+def _create_booking(payload: CreateBookingRequest, background_tasks: BackgroundTasks, db: Session) -> dict:
+    dlog("payload_received", payload=lambda: payload.model_dump(by_alias=True))
     try:
         pickup_dt = parse_datetime_robust(payload.pickup_date_time)
         # Fix 1.4: Always set return_dt (default to +1h)
@@ -416,20 +831,19 @@ def create_booking(payload: CreateBookingRequest, background_tasks: BackgroundTa
     cat = normalize_category(payload.car_category)
     dlog("category_normalized", raw=payload.car_category, normalized=cat)
 
-    # Fix 1.5: Assign the first non-overlapping car
-    cars = db.query(Car).filter(
-        func.lower(Car.category) == cat.lower(),
-        Car.status.in_(["active", "available"])
-    ).all()
-    dlog("car_candidates", count=len(cars))
-
-    assigned = None
-    for c in cars:
-        if not has_overlap(db, c.id, pickup_dt, return_dt):
-            assigned = c
-            break
+    # Fix 1.5: Assign a non-overlapping car (best fit by default; the held one, if the caller holds a car)
+    hold = usable_hold(db, payload.hold_id, cat, pickup_dt, return_dt) if payload.hold_id else None
+    if hold is not None:
+        held_car = next((c for c in category_fleet(db, cat) if c["id"] == hold.car_id), None)
+        if held_car and not busy_car_ids(db, [hold.car_id], pickup_dt, return_dt, exclude_hold=hold.id):
+            cars = [held_car]
+        else:
+            hold = None
+    if hold is None:
+        cars = find_assignable_cars(db, cat, pickup_dt, return_dt)
+    dlog("car_candidates", count=len(cars), hold=payload.hold_id if hold is not None else None)
 
-    if not assigned:
+    if not cars:
         dlog("no_availability", category=cat)
         return {
             "success": False,
@@ -437,11 +851,7 @@ def create_booking(payload: CreateBookingRequest, background_tasks: BackgroundTa
             "message": f"No {cat} cars available for that time slot.",
         }
 
-    dlog("assigned_car", assigned_car_id=assigned.id)
-    booking_ref = generate_elite_reference(db)
-
     booking = Booking(
-        booking_reference=booking_ref,
         full_name=payload.full_name.strip(),
         phone_number=payload.phone_number.strip(),
         pickup_location=payload.pickup_location.strip(),
@@ -450,50 +860,226 @@ def create_booking(payload: CreateBookingRequest, background_tasks: BackgroundTa
         notes=payload.notes,
         pickup_date_time=pickup_dt,
         return_date_time=return_dt,
-        assigned_car_id=assigned.id,
         status="booked",
     )
 
+    # Another worker may claim the same next reference between our read and insert
+    # (retry with a fresh one), or, on PostgreSQL, the same car for an overlapping
+    # window (the exclusion constraint rejects it; move on to the next free car).
+    candidates = iter(cars)
+    assigned = next(candidates)
+    attempt = 0
+    while True:
+        dlog("assigned_car", assigned_car_id=assigned["id"])
+        booking.assigned_car_id = assigned["id"]
+        booking.booking_reference = generate_elite_reference(db)
+        try:
+            db.add(booking)
+            if hold is not None:
+                db.delete(hold)
+            db.flush()
+            ensure_no_clash(db, [assigned["id"]], pickup_dt, return_dt, own_bookings=[booking.id])
+            # Read everything the response needs before commit expires the row,
+            # so no refresh SELECT is needed afterwards.
+            booking_id = booking.id
+            cache_keys = booking_row_cache_keys(booking)
+            event_item = booking_event_item(booking)
+            resp = {
+                "success": True,
+                "message": "Booking created successfully.",
+                "status": "booked",
+                "bookingReference": booking.booking_reference,
+                "assignedCar": assigned,
+                "pickupDateTime": booking.pickup_date_time.isoformat(),
+                "returnDateTime": booking.return_date_time.isoformat() if booking.return_date_time else None,
+                "carCategory": booking.car_category,
+                "pickupLocation": booking.pickup_location,
+                "dropoffLocation": booking.dropoff_location,
+                "fullName": mask_name(booking.full_name),
+                "phoneNumber": mask_phone(booking.phone_number),
+                "calendarStatus": booking.calendar_status or "pending",
+            }
+            db.commit()
+            dlog("booking_saved", booking_id=booking_id, ref=resp["bookingReference"])
+            break
+        except IntegrityError as e:
+            db.rollback()
+            if database.is_overlap_violation(e):
+                dlog("car_taken_concurrently", car_id=assigned["id"])
+                assigned = next(candidates, None)
+                if assigned is None:
+                    return {
+                        "success": False,
+                        "error": "NO_AVAILABILITY",
+                        "message": f"No {cat} cars available for that time slot.",
+                    }
+                continue
+            attempt += 1
+            dlog("reference_collision", ref=booking.booking_reference, attempt=attempt)
+            if attempt >= REFERENCE_RETRIES:
+                raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+            # Jittered backoff so a burst of creators doesn't keep re-reading the same next number.
+            time.sleep(random.uniform(0, REFERENCE_BACKOFF_SECONDS * attempt))
+        except Exception as e:
+            db.rollback()
+            dlog("database_error", error=str(e))
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    after_commit(invalidate_booking_caches, cache_keys)
+    after_commit(
+        availability_engine.booking_added, booking_id, assigned["id"], pickup_dt, return_dt,
+        replaces=("hold", payload.hold_id) if hold is not None else None,
+    )
+    after_commit(booking_events.publish, "booking.created", booking=event_item)
+    background_tasks.add_task(safe_calendar_sync, booking_id, tracing.current_traceparent())
+
+    dlog("response_prepared", resp=lambda: resp)
+    return resp
+
+# --- Group bookings ---
+# Corporate clients book many cars for one window. All cars are assigned
+# against one availability snapshot, inserted with one multi-row INSERT under
+# a contiguous block of references, and committed once: the group is booked
+# entirely or not at all. A conflict with a concurrent writer (reference or
+# car taken) rolls the whole attempt back and retries on a fresh snapshot.
+
+GROUP_BOOKING_MAX_CARS = int(os.getenv("GROUP_BOOKING_MAX_CARS", "50"))
+
+@app.post("/api/create-group-booking", response_model=GroupBookingResponse)
+def create_group_booking(
+    payload: CreateGroupBookingRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    if not idempotency_key or not idempotency_key.strip():
+        return fast_json.model_response(GroupBookingResponse, _create_group_booking(payload, background_tasks, db))
+
+    fingerprint = hashlib.sha256(payload.model_dump_json(by_alias=True).encode("utf-8")).hexdigest()
+    key = f"group:{idempotency_key.strip()}"
+    with idempotency_slot(key):
+        stored = app_cache.get("idempotency", key)
+        if stored is not None:
+            if stored["fingerprint"] != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different booking payload.")
+            metrics.idempotent_replays_total.inc()
+            response = fast_json.model_response(GroupBookingResponse, stored["response"])
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+
+        resp = _create_group_booking(payload, background_tasks, db)
+        if resp.get("success"):
+            remember_idempotent_booking(key, fingerprint, resp, [b["bookingReference"] for b in resp["bookings"]])
+    return fast_json.model_response(GroupBookingResponse, resp)
+
+def _create_group_booking(payload: CreateGroupBookingRequest, background_tasks: BackgroundTasks, db: Session) -> dict:
     try:
-        db.add(booking)
-        db.commit()
-        db.refresh(booking)
-        dlog("booking_saved", booking_id=booking.id, ref=booking.booking_reference)
+        pickup_dt = parse_datetime_robust(payload.pickup_date_time)
+        return_dt = parse_datetime_robust(payload.return_date_time) if payload.return_date_time else pickup_dt + timedelta(hours=1)
     except Exception as e:
-        db.rollback()
-        dlog("database_error", error=str(e))
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-
-    background_tasks.add_task(safe_calendar_sync, booking.id)
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
+    if return_dt <= pickup_dt:
+        return {"success": False, "error": "VALIDATION_ERROR", "message": "Return time must be after pickup."}
+
+    wanted = {}
+    for item in payload.cars:
+        cat = normalize_category(item.car_category)
+        wanted[cat] = wanted.get(cat, 0) + item.quantity
+    total = sum(wanted.values())
+    if total > GROUP_BOOKING_MAX_CARS:
+        return {
+            "success": False,
+            "error": "VALIDATION_ERROR",
+            "message": f"A group booking can hold at most {GROUP_BOOKING_MAX_CARS} cars ({total} requested).",
+        }
+    dlog("group_booking_requested", categories=wanted, total=total)
+
+    base = {
+        "full_name": payload.full_name.strip(),
+        "phone_number": payload.phone_number.strip(),
+        "pickup_location": payload.pickup_location.strip(),
+        "dropoff_location": payload.dropoff_location.strip(),
+        "notes": payload.notes,
+        "pickup_date_time": pickup_dt,
+        "return_date_time": return_dt,
+        "status": "booked",
+    }
+    attempt = 0
+    while True:
+        snapshot = assignable_cars_by_category(db, list(wanted), pickup_dt, return_dt)
+        shortfall = {cat: n - len(snapshot[cat]) for cat, n in wanted.items() if len(snapshot[cat]) < n}
+        if shortfall:
+            dlog("group_no_availability", shortfall=shortfall)
+            return {
+                "success": False,
+                "error": "NO_AVAILABILITY",
+                "shortfall": shortfall,
+                "message": "Not enough cars for that time slot: " + ", ".join(
+                    f"{n} more {cat}" for cat, n in shortfall.items()) + " needed.",
+            }
+        assigned = [(cat, car) for cat, n in wanted.items() for car in snapshot[cat][:n]]
+        references = allocate_reference_block(db, total)
+        # Core inserts skip the ORM flush hook, so stamp row versions here.
+        top_version = database.next_row_versions(db.connection(), total)
+        stamped_at = datetime.utcnow()
+        rows = [
+            dict(base, booking_reference=ref, car_category=cat, assigned_car_id=car["id"],
+                 row_version=top_version - total + 1 + i, updated_at=stamped_at)
+            for i, (ref, (cat, car)) in enumerate(zip(references, assigned))
+        ]
+        try:
+            # One multi-row VALUES statement; RETURNING order is not guaranteed, so map by reference.
+            returned = dict(db.execute(
+                insert(Booking).values(rows).returning(Booking.booking_reference, Booking.id)
+            ).all())
+            booking_ids = [returned[ref] for ref in references]
+            # PostgreSQL's exclusion constraint rejects a car booked since the snapshot.
+            ensure_no_clash(db, [car["id"] for _, car in assigned], pickup_dt, return_dt, own_bookings=booking_ids)
+            db.commit()
+            break
+        except IntegrityError as e:
+            db.rollback()
+            attempt += 1
+            dlog("group_booking_conflict", overlap=database.is_overlap_violation(e), attempt=attempt)
+            if attempt >= REFERENCE_RETRIES:
+                raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+            time.sleep(random.uniform(0, REFERENCE_BACKOFF_SECONDS * attempt))
+        except Exception as e:
+            db.rollback()
+            dlog("database_error", error=str(e))
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    after_commit(invalidate_booking_caches, [
+        key for ref in references for key in booking_cache_keys(ref, base["phone_number"], base["full_name"])
+    ])
+    after_commit(availability_engine.bookings_added, [
+        (booking_id, car["id"], pickup_dt, return_dt) for booking_id, (_, car) in zip(booking_ids, assigned)
+    ])
+    for booking_id, row in zip(booking_ids, rows):
+        after_commit(booking_events.publish, "booking.created", booking=booking_list_item(
+            tuple(dict(row, id=booking_id).get(c.key) for c in BOOKING_LIST_COLUMNS)))
+    background_tasks.add_task(safe_calendar_sync_batch, list(booking_ids), tracing.current_traceparent())
+    dlog("group_booking_saved", count=total, first=references[0], last=references[-1])
 
-    resp = {
+    return {
         "success": True,
-        "message": "Booking created successfully.",
-        "status": "booked",
-        "bookingReference": booking.booking_reference,
-        "assignedCar": {
-            "id": assigned.id,
-            "plateNumber": assigned.plate_number,
-            "name": assigned.name,
-            "category": assigned.category,
-        },
-        "pickupDateTime": booking.pickup_date_time.isoformat(),
-        "returnDateTime": booking.return_date_time.isoformat() if booking.return_date_time else None,
-        "carCategory": booking.car_category,
-        "pickupLocation": booking.pickup_location,
-        "dropoffLocation": booking.dropoff_location,
-        "fullName": mask_name(booking.full_name),
-        "phoneNumber": mask_phone(booking.phone_number),
-        "calendarStatus": booking.calendar_status or "pending",
+        "message": f"Group booking created: {total} cars, {references[0]} to {references[-1]}.",
+        "bookings": [
+            {"bookingReference": ref, "carCategory": cat, "assignedCar": car}
+            for ref, (cat, car) in zip(references, assigned)
+        ],
+        "pickupDateTime": pickup_dt.isoformat(),
+        "returnDateTime": return_dt.isoformat(),
+        "calendarStatus": "pending",
     }
-    dlog("response_prepared", resp=resp)
-    return resp
+
+availability_flight = SingleFlight("availability")
 
 @app.post("/api/check-availability", response_model=AvailabilityResponse)
 def check_availability(req: CheckAvailabilityRequest, db: Session = Depends(get_db)):
     try:
-        pickup_iso, _ = normalize_datetime_to_iso_with_tz(req.pickup_date_time)
-        return_iso, _ = normalize_datetime_to_iso_with_tz(req.return_date_time)
+        pickup_dt = parse_datetime_robust(req.pickup_date_time)
+        return_dt = parse_datetime_robust(req.return_date_time)
     except Exception as e:
         return {
             "success": False,
@@ -502,22 +1088,14 @@ def check_availability(req: CheckAvailabilityRequest, db: Session = Depends(get_
             "cars": [],
             "message": f"Invalid date format: {str(e)}"
         }
-    
-    all_cars_in_cat = db.query(Car).filter(
-        Car.category == req.car_category,
-        or_(Car.status == "active", Car.status == "available")
-    ).all()
-    
-    available_cars = []
-    for car in all_cars_in_cat:
-        if is_car_available(db, car.id, pickup_iso, return_iso):
-            available_cars.append({
-                "id": car.id,
-                "plateNumber": car.plate_number,
-                "name": car.name,
-                "category": car.category
-            })
-            
+
+    cat = normalize_category(req.car_category)
+    # Identical concurrent questions share one evaluation; the list is shared, so copy it.
+    available_cars = list(availability_flight.do(
+        (cat, pickup_dt.isoformat(), return_dt.isoformat()),
+        lambda: find_available_cars(db, cat, pickup_dt, return_dt),
+    ))
+
     return {
         "success": True,
         "available": len(available_cars) > 0,
@@ -532,46 +1110,177 @@ class GetBookingResponse(BaseModel):
     error: Optional[str] = None
     message: Optional[str] = None
 
+def lookup_booking(db: Session, model, req: GetBookingRequest):
+    """Latest booking matching the request's reference or phone (+ name) in `model`'s table."""
+    query = db.query(model)
+    if req.booking_reference:
+        query = query.filter(model.booking_reference == req.booking_reference)
+    else:
+        query = query.filter(model.phone_number == req.phone_number)
+        if req.full_name:
+            query = query.filter(model.full_name == req.full_name)
+    return query.order_by(model.created_at.desc()).first()
+
 @app.post("/api/get-booking", response_model=GetBookingResponse)
 def get_booking(req: GetBookingRequest, db: Session = Depends(get_db)):
-    query = db.query(Booking)
-    
     if req.booking_reference:
-        query = query.filter(Booking.booking_reference == req.booking_reference)
+        cache_key = ("ref", req.booking_reference)
     elif req.phone_number:
-        query = query.filter(Booking.phone_number == req.phone_number)
-        if req.full_name:
-            query = query.filter(Booking.full_name == req.full_name)
+        cache_key = ("phone", req.phone_number, req.full_name or None)
     else:
         return {
             "success": False,
             "error": "VALIDATION_ERROR",
             "message": "Either Booking Reference or Phone Number is required."
         }
-        
-    booking = query.order_by(Booking.created_at.desc()).first()
-    
+
+    cached = app_cache.get("booking", cache_key)
+    if cached is not None:
+        return cached
+
+    booking = lookup_booking(db, Booking, req)
     if not booking:
-        return {
+        # Old bookings live in the archive; only a miss pays for that second lookup.
+        booking = lookup_booking(db, BookingArchive, req)
+
+    if not booking:
+        result = {
             "success": False,
             "error": "NOT_FOUND",
             "message": "Booking not found."
         }
-        
+    else:
+        result = {
+            "success": True,
+            "booking": booking_to_info(booking),
+        }
+    app_cache.set("booking", cache_key, result)
+    return result
+
+class CallerContextRequest(BaseModel):
+    phone_number: str = Field(..., alias="phoneNumber")
+    pickup_date_time: Optional[str] = Field(None, alias="pickupDateTime")
+    return_date_time: Optional[str] = Field(None, alias="returnDateTime")
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+class CategoryAvailability(BaseModel):
+    category: str
+    available_count: int = Field(..., alias="availableCount")
+    total_count: int = Field(..., alias="totalCount")
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+class CallerPreferences(BaseModel):
+    car_category: Optional[str] = Field(None, alias="carCategory")
+    pickup_location: Optional[str] = Field(None, alias="pickupLocation")
+    dropoff_location: Optional[str] = Field(None, alias="dropoffLocation")
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+class CallerContextResponse(BaseModel):
+    success: bool
+    known_caller: bool = Field(False, alias="knownCaller")
+    customer_name: Optional[str] = Field(None, alias="customerName")
+    upcoming_bookings: List[SingleBookingInfo] = Field(default_factory=list, alias="upcomingBookings")
+    recent_bookings: List[SingleBookingInfo] = Field(default_factory=list, alias="recentBookings")
+    preferences: Optional[CallerPreferences] = None
+    availability: List[CategoryAvailability] = Field(default_factory=list)
+    error: Optional[str] = None
+    message: Optional[str] = None
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+CALLER_CONTEXT_HISTORY = 20
+CALLER_CONTEXT_RECENT = 3
+
+def booking_to_info(b: Booking) -> dict:
+    return {
+        "id": b.id,
+        "bookingReference": b.booking_reference,
+        "customerName": b.full_name,
+        "customerPhone": b.phone_number,
+        "pickupDateTime": b.pickup_date_time.isoformat() if b.pickup_date_time else "",
+        "returnDateTime": b.return_date_time.isoformat() if b.return_date_time else "",
+        "pickupLocation": b.pickup_location,
+        "dropoffLocation": b.dropoff_location,
+        "carCategory": b.car_category,
+        "status": b.status,
+        "calendarStatus": b.calendar_status or "pending",
+    }
+
+def category_availability(db: Session, pickup_dt: datetime, return_dt: datetime) -> List[dict]:
+    """Free/total active cars per category for one window, in a single grouped query.
+
+    A car is busy if it has an overlapping active booking or live hold, as in busy_car_ids().
+    """
+    busy = or_(
+        exists().where(Booking.assigned_car_id == Car.id, overlap_clause(pickup_dt, return_dt)),
+        exists().where(CarHold.car_id == Car.id, hold_overlap_clause(pickup_dt, return_dt)),
+    )
+    rows = db.query(
+        Car.category,
+        func.count(Car.id),
+        func.sum(case((busy, 0), else_=1)),
+    ).filter(
+        Car.status.in_(["active", "available"])
+    ).group_by(Car.category).order_by(Car.category).all()
+    return [
+        {"category": cat, "availableCount": int(free or 0), "totalCount": total}
+        for cat, total, free in rows
+    ]
+
+@app.post("/api/caller-context", response_model=CallerContextResponse)
+def caller_context(req: CallerContextRequest, db: Session = Depends(get_db)):
+    """Everything the agent needs before its first turn: caller history + live availability."""
+    phone = req.phone_number.strip()
+    if not phone:
+        return {"success": False, "error": "VALIDATION_ERROR", "message": "Phone number is required."}
+
+    now = datetime.utcnow()
+    try:
+        pickup_dt = parse_datetime_robust(req.pickup_date_time) if req.pickup_date_time else now
+        return_dt = parse_datetime_robust(req.return_date_time) if req.return_date_time else pickup_dt + timedelta(hours=1)
+    except Exception as e:
+        return {"success": False, "error": "VALIDATION_ERROR", "message": f"Invalid date format: {str(e)}"}
+
+    # One query for the caller's history; recent/upcoming/preferences are split in memory.
+    history = db.query(Booking).filter(
+        Booking.phone_number == phone
+    ).order_by(Booking.created_at.desc()).limit(CALLER_CONTEXT_HISTORY).all()
+
+    upcoming = sorted(
+        (b for b in history if b.status in ACTIVE_BOOKING_STATUSES and b.pickup_date_time >= now),
+        key=lambda b: b.pickup_date_time,
+    )
+    recent = [b for b in history if b.pickup_date_time < now][:CALLER_CONTEXT_RECENT]
+
+    preferences = None
+    if history:
+        last = history[0]
+        preferences = {
+            "carCategory": last.car_category,
+            "pickupLocation": last.pickup_location,
+            "dropoffLocation": last.dropoff_location,
+        }
+
     return {
         "success": True,
-        "booking": {
-            "id": booking.id,
-            "customerName": booking.full_name,
-            "customerPhone": booking.phone_number,
-            "pickupDateTime": booking.pickup_date_time.isoformat() if booking.pickup_date_time else "",
-            "returnDateTime": booking.return_date_time.isoformat() if booking.return_date_time else "",
-            "pickupLocation": booking.pickup_location,
-            "dropoffLocation": booking.dropoff_location,
-            "carCategory": booking.car_category,
-            "status": booking.status,
-            "calendarStatus": booking.calendar_status or "pending",
-        },
+        "knownCaller": bool(history),
+        "customerName": history[0].full_name if history else None,
+        "upcomingBookings": [booking_to_info(b) for b in upcoming],
+        "recentBookings": [booking_to_info(b) for b in recent],
+        "preferences": preferences,
+        "availability": category_availability(db, pickup_dt, return_dt),
+        "message": "Returning caller." if history else "New caller.",
     }
 
 class CancelBookingResponse(BaseModel):
@@ -599,18 +1308,491 @@ def cancel_booking(req: CancelBookingRequest, db: Session = Depends(get_db)):
     if booking.status == "cancelled":
          return {"success": True, "message": "Booking already cancelled."}
          
+    cache_keys = booking_row_cache_keys(booking)
+    booking_id = booking.id
+    reference = booking.booking_reference
     booking.status = "cancelled"
     booking.cancelled_at = datetime.utcnow()
     db.commit()
+    after_commit(invalidate_booking_caches, cache_keys)
+    after_commit(forget_idempotent_booking, reference)
+    after_commit(availability_engine.booking_removed, booking_id)
+    after_commit(booking_events.publish, "booking.cancelled", id=booking_id, bookingReference=reference, status="cancelled")
     
     return {"success": True, "message": "Booking cancelled successfully."}
 
+# --- Temporary holds ---
+# A hold reserves one car for a window for a few minutes while the caller
+# decides. It counts as busy in every overlap check until it expires, and
+# create_booking(holdId=...) converts it. Expiry is driven by a heap-based
+# timer (timers.ExpiryTimer) that deletes each hold at its deadline, so no
+# periodic table scan is needed; the expires_at filter in the overlap checks
+# keeps answers correct even before the timer fires.
+
+HOLD_TTL_SECONDS = int(os.getenv("HOLD_TTL_SECONDS", "120"))
+HOLD_MAX_TTL_SECONDS = int(os.getenv("HOLD_MAX_TTL_SECONDS", "600"))
+
+def expire_hold(hold_id: str) -> None:
+    db = SessionLocal()
+    try:
+        deleted = db.query(CarHold).filter(
+            CarHold.id == hold_id, CarHold.expires_at <= datetime.utcnow(),
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    # Converted or released holds are already gone; nothing to tell the bitmaps then.
+    if deleted:
+        after_commit(availability_engine.booking_removed, ("hold", hold_id))
+
+hold_timer = ExpiryTimer(expire_hold, name="hold-expiry")
+
+def purge_expired_holds() -> None:
+    """One-off cleanup at startup of holds whose timers died with a previous process."""
+    db = SessionLocal()
+    try:
+        db.query(CarHold).filter(CarHold.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def usable_hold(db: Session, hold_id: str, category: str, pickup_dt: datetime, return_dt: datetime) -> Optional[CarHold]:
+    """The live hold `hold_id` if it is for this category and covers the window, else None."""
+    hold = db.get(CarHold, hold_id)
+    if (
+        hold is None
+        or hold.expires_at <= datetime.utcnow()
+        or hold.car_category != category
+        or pickup_dt < hold.pickup_date_time
+        or return_dt > hold.return_date_time
+    ):
+        dlog("hold_unusable", hold_id=hold_id)
+        return None
+    return hold
+
+class CreateHoldRequest(BaseModel):
+    pickup_date_time: str = Field(..., alias="pickupDateTime")
+    return_date_time: str = Field(..., alias="returnDateTime")
+    car_category: str = Field(..., alias="carCategory")
+    car_id: Optional[int] = Field(None, alias="carId")
+    phone_number: Optional[str] = Field(None, alias="phoneNumber")
+    ttl_seconds: Optional[int] = Field(None, alias="ttlSeconds")
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+class HoldResponse(BaseModel):
+    success: bool
+    hold_id: Optional[str] = Field(None, alias="holdId")
+    assigned_car: Optional[CarInfo] = Field(None, alias="assignedCar")
+    pickup_date_time: Optional[str] = Field(None, alias="pickupDateTime")
+    return_date_time: Optional[str] = Field(None, alias="returnDateTime")
+    expires_at: Optional[str] = Field(None, alias="expiresAt")
+    error: Optional[str] = None
+    message: str
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+@app.post("/api/holds", response_model=HoldResponse)
+def create_hold(req: CreateHoldRequest, db: Session = Depends(get_db)):
+    try:
+        pickup_dt = parse_datetime_robust(req.pickup_date_time)
+        return_dt = parse_datetime_robust(req.return_date_time)
+    except Exception as e:
+        return {"success": False, "error": "VALIDATION_ERROR", "message": f"Invalid date format: {str(e)}"}
+    if return_dt <= pickup_dt:
+        return {"success": False, "error": "VALIDATION_ERROR", "message": "Return time must be after pickup."}
+
+    cat = normalize_category(req.car_category)
+    cars = find_assignable_cars(db, cat, pickup_dt, return_dt)
+    if req.car_id is not None:
+        cars = [c for c in cars if c["id"] == req.car_id]
+    if not cars:
+        return {"success": False, "error": "NO_AVAILABILITY", "message": f"No {cat} cars available for that time slot."}
+
+    ttl = max(1, min(req.ttl_seconds or HOLD_TTL_SECONDS, HOLD_MAX_TTL_SECONDS))
+    # A car booked or held since the read above: try the next candidate.
+    for car in cars:
+        hold = CarHold(
+            id=secrets.token_urlsafe(12),
+            car_id=car["id"],
+            car_category=cat,
+            pickup_date_time=pickup_dt,
+            return_date_time=return_dt,
+            phone_number=req.phone_number.strip() if req.phone_number else None,
+            expires_at=datetime.utcnow() + timedelta(seconds=ttl),
+        )
+        hold_id, expires_at = hold.id, hold.expires_at
+        try:
+            db.add(hold)
+            db.flush()
+            ensure_no_clash(db, [car["id"]], pickup_dt, return_dt, own_hold=hold_id)
+            db.commit()
+            break
+        except IntegrityError as e:
+            db.rollback()
+            if not database.is_overlap_violation(e):
+                raise
+            dlog("car_taken_concurrently", car_id=car["id"], hold=True)
+    else:
+        return {"success": False, "error": "NO_AVAILABILITY", "message": f"No {cat} cars available for that time slot."}
+    after_commit(availability_engine.booking_added, ("hold", hold_id), car["id"], pickup_dt, return_dt)
+    hold_timer.schedule(hold_id, time.time() + ttl)
+
+    return {
+        "success": True,
+        "holdId": hold_id,
+        "assignedCar": car,
+        "pickupDateTime": pickup_dt.isoformat(),
+        "returnDateTime": return_dt.isoformat(),
+        "expiresAt": expires_at.isoformat(),
+        "message": f"{car['name']} held for {ttl} seconds.",
+    }
+
+@app.delete("/api/holds/{hold_id}")
+def release_hold(hold_id: str, db: Session = Depends(get_db)):
+    deleted = db.query(CarHold).filter(CarHold.id == hold_id).delete(synchronize_session=False)
+    db.commit()
+    if not deleted:
+        return {"success": False, "error": "NOT_FOUND", "message": "Hold not found or already expired."}
+    after_commit(availability_engine.booking_removed, ("hold", hold_id))
+    return {"success": True, "message": "Hold released."}
+
+# --- Assignment re-optimization ---
+# New bookings are placed best-fit (assignment.py), but bookings arrive in
+# any order, so gaps still accumulate. This pass re-places future, unstarted
+# bookings between identical cars (same category and model, so the caller
+# gets the car they were told about) and commits only if idle time ends up
+# more consolidated. Started bookings and live holds stay where they are.
+
+REOPTIMIZE_INTERVAL_SECONDS = float(os.getenv("REOPTIMIZE_INTERVAL_SECONDS", "0"))  # 0 = only on demand
+
+def reoptimize_assignments(db: Session, category: Optional[str] = None) -> dict:
+    now = datetime.utcnow()
+    cars = db.query(Car.id, Car.name, Car.category).filter(Car.status.in_(["active", "available"]))
+    if category:
+        cars = cars.filter(func.lower(Car.category) == normalize_category(category).lower())
+    groups = {}
+    for car in cars.order_by(Car.id).all():
+        groups.setdefault((car.category.lower(), car.name), []).append(car.id)
+    groups = [ids for ids in groups.values() if len(ids) > 1]
+    car_ids = [i for ids in groups for i in ids]
+    if not car_ids:
+        return {"groups": 0, "considered": 0, "moved": 0, "applied": False}
+
+    bookings = db.query(
+        Booking.id, Booking.assigned_car_id, Booking.pickup_date_time, Booking.return_date_time,
+        Booking.booking_reference, Booking.phone_number, Booking.full_name,
+    ).filter(
+        Booking.assigned_car_id.in_(car_ids),
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        Booking.return_date_time > now,
+    ).all()
+    holds = db.query(CarHold.car_id, CarHold.pickup_date_time, CarHold.return_date_time).filter(
+        CarHold.car_id.in_(car_ids), CarHold.expires_at > datetime.utcnow(),
+    ).all()
+
+    moves = {}
+    considered = 0
+    for ids in groups:
+        fixed, current = {}, {}
+        movable = []
+        for b in bookings:
+            if b.assigned_car_id not in ids:
+                continue
+            current.setdefault(b.assigned_car_id, []).append((b.pickup_date_time, b.return_date_time))
+            if b.pickup_date_time > now:
+                movable.append((b.id, b.pickup_date_time, b.return_date_time, b.assigned_car_id))
+            else:
+                fixed.setdefault(b.assigned_car_id, []).append((b.pickup_date_time, b.return_date_time))
+        for h in holds:
+            if h.car_id in ids:
+                fixed.setdefault(h.car_id, []).append((h.pickup_date_time, h.return_date_time))
+                current.setdefault(h.car_id, []).append((h.pickup_date_time, h.return_date_time))
+        if len(movable) < 2:
+            continue
+        considered += len(movable)
+        placed = assignment.reassign(movable, fixed, ids)
+        if placed is None:
+            continue
+        proposed = {c: list(fixed.get(c, [])) for c in ids}
+        for booking_id, start, end, _ in movable:
+            proposed[placed[booking_id]].append((start, end))
+        horizon_end = max(end for _, _, end, _ in movable)
+        if assignment.consolidation(proposed, now, horizon_end) > assignment.consolidation(current, now, horizon_end):
+            moves.update({m[0]: placed[m[0]] for m in movable if placed[m[0]] != m[3]})
+
+    result = {"groups": len(groups), "considered": considered, "moved": len(moves), "applied": False}
+    if not moves:
+        return result
+
+    by_id = {b.id: b for b in bookings}
+    other = aliased(Booking)
+    try:
+        # Detach first so swaps never overlap mid-transaction (the PostgreSQL
+        # exclusion constraint ignores unassigned rows), then re-attach each
+        # booking only if its new car is still free: a booking created since
+        # the read above aborts the whole pass.
+        db.execute(update(Booking).where(Booking.id.in_(list(moves))).values(assigned_car_id=None))
+        top_version = database.next_row_versions(db.connection(), len(moves))
+        stamped_at = datetime.utcnow()
+        for version, (booking_id, car_id) in enumerate(moves.items(), start=top_version - len(moves) + 1):
+            b = by_id[booking_id]
+            taken = exists().where(
+                other.assigned_car_id == car_id,
+                other.status.in_(ACTIVE_BOOKING_STATUSES),
+                other.pickup_date_time < b.return_date_time,
+                other.return_date_time > b.pickup_date_time,
+            )
+            held = exists().where(
+                CarHold.car_id == car_id,
+                hold_overlap_clause(b.pickup_date_time, b.return_date_time),
+            )
+            done = db.execute(
+                update(Booking).where(Booking.id == booking_id, ~taken, ~held)
+                .values(assigned_car_id=car_id, row_version=version, updated_at=stamped_at)
+            ).rowcount
+            if not done:
+                raise IntegrityError("reoptimize", None, Exception(f"car {car_id} taken concurrently"))
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        dlog("reoptimize_aborted", error=str(e))
+        return result
+
+    after_commit(invalidate_booking_caches, [
+        key for booking_id in moves
+        for key in booking_cache_keys(by_id[booking_id].booking_reference, by_id[booking_id].phone_number, by_id[booking_id].full_name)
+    ])
+    after_commit(availability_engine.bookings_added, [
+        (booking_id, car_id, by_id[booking_id].pickup_date_time, by_id[booking_id].return_date_time)
+        for booking_id, car_id in moves.items()
+    ])
+    dlog("reoptimized", moved=len(moves), considered=considered)
+    result["applied"] = True
+    return result
+
+def periodic_reoptimize(_key) -> None:
+    db = SessionLocal()
+    try:
+        reoptimize_assignments(db)
+    finally:
+        db.close()
+        reoptimize_timer.schedule("reoptimize", time.time() + REOPTIMIZE_INTERVAL_SECONDS)
+
+reoptimize_timer = ExpiryTimer(periodic_reoptimize, name="reoptimize")
+
+@app.post("/api/admin/reoptimize-assignments")
+def admin_reoptimize_assignments(
+    category: Optional[str] = None,
+    x_admin_key: str = Header(None, alias="X-Admin-Key"),
+    db: Session = Depends(get_db),
+):
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    return {"ok": True, "strategy": assignment.STRATEGY_NAME, **reoptimize_assignments(db, category)}
+
+@app.post("/api/admin/archive-bookings")
+def admin_archive_bookings(
+    olderThanDays: int = archive.ARCHIVE_AFTER_DAYS,
+    maxChunks: Optional[int] = 50,
+    x_admin_key: str = Header(None, alias="X-Admin-Key"),
+):
+    """Move bookings returned more than `olderThanDays` ago to the archive; call again while `remaining`."""
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if olderThanDays < 1:
+        raise HTTPException(status_code=400, detail="olderThanDays must be at least 1.")
+
+    stats = archive.archive_bookings(olderThanDays, max_chunks=maxChunks)
+    dlog("bookings_archived", **stats)
+    return {"ok": True, **stats}
+
+# --- Vapi server-tool webhook ---
+
+def call_with_session(handler, *args, **kwargs):
+    """Run a route handler outside FastAPI's DI (own session; safe from a worker thread)."""
+    db = SessionLocal()
+    try:
+        return handler(*args, db=db, **kwargs)
+    finally:
+        db.close()
+
+def vapi_tool_registry(background_tasks: BackgroundTasks) -> dict:
+    return {
+        "create_booking": vapi_tools.Tool(
+            CreateBookingRequest, lambda req: call_with_session(create_booking, req, background_tasks, idempotency_key=None), BookingResponse),
+        "check_availability": vapi_tools.Tool(
+            CheckAvailabilityRequest, lambda req: call_with_session(check_availability, req), AvailabilityResponse),
+        "get_booking": vapi_tools.Tool(
+            GetBookingRequest, lambda req: call_with_session(get_booking, req), GetBookingResponse),
+        "cancel_booking": vapi_tools.Tool(
+            CancelBookingRequest, lambda req: call_with_session(cancel_booking, req), CancelBookingResponse),
+        "caller_context": vapi_tools.Tool(
+            CallerContextRequest, lambda req: call_with_session(caller_context, req), CallerContextResponse),
+    }
+
+@app.post("/api/vapi/tool-calls")
+def vapi_tool_calls(
+    background_tasks: BackgroundTasks,
+    body: dict = Body(...),
+    x_vapi_secret: Optional[str] = Header(None, alias="X-Vapi-Secret"),
+):
+    """One webhook for every assistant tool; all calls of a turn answered in one response."""
+    env_secret = os.getenv("VAPI_SECRET")
+    if env_secret and x_vapi_secret != env_secret:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    message = body.get("message") or {}
+    if message.get("type", "tool-calls") != "tool-calls":
+        # Status updates, transcripts, end-of-call reports: acknowledged, nothing to answer.
+        return {}
+    calls = vapi_tools.parse_tool_calls(body)
+    dlog("vapi_tool_calls", tools=[c.name for c in calls])
+    return {"results": vapi_tools.dispatch(calls, vapi_tool_registry(background_tasks))}
+
+# --- Admin list/export read layer ---
+# Plain column tuples via Core select(): no ORM instances, identity map or
+# unused columns (notes), mapped straight to response dicts.
+
+BOOKING_LIST_COLUMNS = (
+    Booking.id, Booking.booking_reference, Booking.full_name, Booking.phone_number,
+    Booking.pickup_date_time, Booking.return_date_time, Booking.pickup_location,
+    Booking.dropoff_location, Booking.car_category, Booking.status, Booking.calendar_status,
+)
+
+def booking_list_source(include_archived: bool = False):
+    """The hot bookings table, or hot + archive (database.booking_history) for historical listings."""
+    return database.booking_history() if include_archived else Booking.__table__
+
+def booking_list_columns(src) -> list:
+    return [src.c[c.key] for c in BOOKING_LIST_COLUMNS]
+
+def booking_list_filter(status: Optional[str], car_category: Optional[str], src=None) -> list:
+    cols = (Booking.__table__ if src is None else src).c
+    where = []
+    if status:
+        where.append(cols.status == status)
+    if car_category:
+        where.append(cols.car_category == car_category)
+    return where
+
+def booking_list_item(row) -> dict:
+    (id_, ref, name, phone, pickup, ret, pickup_loc, dropoff_loc, category, status, cal_status) = row
+    return {
+        "id": id_,
+        "bookingReference": ref,
+        "customerName": name,
+        "customerPhone": phone,
+        "pickupDateTime": pickup.isoformat() if pickup else "",
+        "returnDateTime": ret.isoformat() if ret else "",
+        "duration": calculate_duration_str(pickup, ret) if ret else "N/A",
+        "pickupLocation": pickup_loc,
+        "dropoffLocation": dropoff_loc,
+        "carCategory": category,
+        "status": status,
+        "calendarStatus": cal_status or "pending",
+    }
+
+def booking_event_item(b: Booking) -> dict:
+    """booking_list_item() for an ORM row, so dashboards can insert a new booking without re-fetching."""
+    return booking_list_item(tuple(getattr(b, c.key) for c in BOOKING_LIST_COLUMNS))
+
+# EventSource cannot send headers, and the admin key must not travel in a
+# URL (access logs, proxies, browser history). The dashboard exchanges the
+# key (header) for a short-lived token signed with it and opens the stream
+# with ?token=; the token only authorizes opening a stream before it expires.
+STREAM_TOKEN_TTL_SECONDS = int(os.getenv("STREAM_TOKEN_TTL_SECONDS", "60"))
+
+def stream_token_signature(expires: int, admin_key: str) -> str:
+    return hmac.new(admin_key.encode(), f"booking-events:{expires}".encode(), hashlib.sha256).hexdigest()
+
+def valid_stream_token(token: Optional[str], admin_key: str) -> bool:
+    expires, _, signature = (token or "").partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, stream_token_signature(int(expires), admin_key))
+
+@app.post("/api/admin/booking-events/token")
+def booking_event_token(x_admin_key: Optional[str] = Header(None, alias="X-Admin-Key")):
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key:
+        raise HTTPException(status_code=403, detail="Forbidden: Valid Admin Key required.")
+    expires = int(time.time()) + STREAM_TOKEN_TTL_SECONDS
+    return {"token": f"{expires}.{stream_token_signature(expires, env_admin_key)}", "expiresIn": STREAM_TOKEN_TTL_SECONDS}
+
+@app.get("/api/admin/booking-events")
+async def booking_event_stream(
+    request: Request,
+    token: Optional[str] = None,
+    lastEventId: Optional[str] = None,
+    x_admin_key: Optional[str] = Header(None, alias="X-Admin-Key"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key and not valid_stream_token(token, env_admin_key):
+        raise HTTPException(status_code=403, detail="Forbidden: Valid Admin Key or stream token required.")
+
+    # ?lastEventId= lets a client that reopens with a fresh token resume where it was.
+    return StreamingResponse(
+        events.sse_stream(booking_events, request.is_disconnected, last_event_id or lastEventId),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+EXPORT_FIELDS = [
+    "id", "bookingReference", "customerName", "customerPhone", "pickupDateTime", "returnDateTime",
+    "duration", "pickupLocation", "dropoffLocation", "carCategory", "status", "calendarStatus",
+]
+EXPORT_CHUNK_ROWS = 1000
+
+def iter_bookings_csv(where: list, src=None):
+    """CSV export streamed in chunks from a server-side cursor on its own connection."""
+    src = Booking.__table__ if src is None else src
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buf.getvalue()
+    stmt = select(*booking_list_columns(src)).where(*where).order_by(src.c.id)
+    with database.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS).execute(stmt)
+        for chunk in result.partitions():
+            buf.seek(0)
+            buf.truncate()
+            writer.writerows(booking_list_item(r) for r in chunk)
+            yield buf.getvalue()
+
+@app.get("/api/admin/export-bookings")
+def export_bookings(
+    status: Optional[str] = None,
+    carCategory: Optional[str] = None,
+    includeArchived: bool = False,
+    x_admin_key: Optional[str] = Header(None, alias="X-Admin-Key"),
+):
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key:
+        raise HTTPException(status_code=403, detail="Forbidden: Valid Admin Key required.")
+
+    src = booking_list_source(includeArchived)
+    return StreamingResponse(
+        iter_bookings_csv(booking_list_filter(status, carCategory, src), src),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="bookings.csv"'},
+    )
+
 @app.get("/api/get-all-bookings", response_model=AllBookingsResponse)
 def get_all_bookings(
     limit: int = 50, 
     offset: int = 0, 
     carCategory: Optional[str] = None, 
     status: str = "booked",
+    includeArchived: bool = False,
     x_admin_key: Optional[str] = Header(None, alias="X-Admin-Key"), 
     db: Session = Depends(get_db)
 ):
@@ -619,37 +1801,67 @@ def get_all_bookings(
     if x_admin_key != env_admin_key:
         raise HTTPException(status_code=403, detail="Forbidden: Valid Admin Key required.")
 
-    query = db.query(Booking).filter(Booking.status == status)
-    if carCategory:
-        query = query.filter(Booking.car_category == carCategory)
-    
-    total_count = query.count()
-    bookings = query.order_by(Booking.created_at.desc()).offset(offset).limit(limit).all()
-    
-    booking_list = []
-    for b in bookings:
-        booking_list.append({
-            "id": b.id,
-            "customerName": b.full_name,
-            "customerPhone": b.phone_number,
-            "pickupDateTime": b.pickup_date_time.isoformat() if b.pickup_date_time else "",
-            "returnDateTime": b.return_date_time.isoformat() if b.return_date_time else "",
-            "duration": calculate_duration_str(b.pickup_date_time, b.return_date_time) if b.return_date_time else "N/A",
-            "pickupLocation": b.pickup_location,
-            "dropoffLocation": b.dropoff_location,
-            "carCategory": b.car_category,
-            "status": b.status,
-            "calendarStatus": b.calendar_status or "pending",
-        })
-        
-    return {
+    src = booking_list_source(includeArchived)
+    where = booking_list_filter(status, carCategory, src)
+    total_count = db.execute(select(func.count()).select_from(src).where(*where)).scalar_one()
+    rows = db.execute(
+        select(*booking_list_columns(src)).where(*where)
+        .order_by(src.c.created_at.desc()).offset(offset).limit(limit)
+    )
+    booking_list = [booking_list_item(r) for r in rows]
+
+    # Rows are built in SingleBookingInfo's alias shape, so skip re-validating them.
+    return fast_json.model_response(AllBookingsResponse, {
         "success": True,
         "bookings": booking_list,
         "total": total_count,
         "message": f"Retrieved {len(booking_list)} bookings."
+    })
+
+# --- Incremental sync for mirrors ---
+# Row versions come from one counter taken inside each writing transaction
+# (database.next_row_versions), so they are assigned in commit order and a
+# client that stored the last watermark can never miss a later change.
+
+BOOKING_CHANGES_MAX_LIMIT = 5000
+
+@app.get("/api/admin/bookings/changes")
+def booking_changes(
+    since: int = 0,
+    limit: int = 500,
+    x_admin_key: Optional[str] = Header(None, alias="X-Admin-Key"),
+    db: Session = Depends(get_db),
+):
+    """Bookings written after row version `since` (cancellations included), oldest change first.
+
+    Pass the returned `watermark` as the next `since`; `hasMore` means another page is waiting.
+    """
+    env_admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026")
+    if x_admin_key != env_admin_key:
+        raise HTTPException(status_code=403, detail="Forbidden: Valid Admin Key required.")
+
+    limit = max(1, min(limit, BOOKING_CHANGES_MAX_LIMIT))
+    rows = db.execute(
+        select(*BOOKING_LIST_COLUMNS, Booking.row_version, Booking.updated_at)
+        .where(Booking.row_version > since)
+        .order_by(Booking.row_version).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    changes = []
+    for r in rows[:limit]:
+        item = booking_list_item(r[:-2])
+        item["rowVersion"] = r[-2]
+        item["updatedAt"] = r[-1].isoformat() if r[-1] else None
+        changes.append(item)
+    return {
+        "success": True,
+        "changes": changes,
+        "watermark": changes[-1]["rowVersion"] if changes else since,
+        "hasMore": has_more,
     }
 
 if __name__ == "__main__":
+    # Single-process dev server; use serve.py for multi-worker deployments.
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
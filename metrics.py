@@ -0,0 +1,229 @@
+"""Minimal Prometheus metrics for the API: HTTP latency, DB queries, calendar sync.
+
+No client library needed; the registry renders the Prometheus text exposition
+format itself. Everything is process-local, so with several workers each
+worker's /metrics shows its own series (scrape every worker, or sum them).
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 4, 5, 8, 12, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *label_values) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(label_values)
+            if s is None:
+                s = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                s[idx] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = self.header()
+        for key, s in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, s):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {s[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {s[-2]}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {s[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests_total = REGISTRY.register(Counter(
+    "rentacar_http_requests_total", "HTTP requests by route, method and status.", ("method", "route", "status")))
+http_request_seconds = REGISTRY.register(Histogram(
+    "rentacar_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")))
+http_in_flight = REGISTRY.register(Gauge(
+    "rentacar_http_requests_in_flight", "Requests currently being served.", ()))
+db_queries_per_request = REGISTRY.register(Histogram(
+    "rentacar_db_queries_per_request", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS))
+db_time_per_request = REGISTRY.register(Histogram(
+    "rentacar_db_time_per_request_seconds", "Time spent in SQL per request.", ("route",)))
+db_queries_total = REGISTRY.register(Counter(
+    "rentacar_db_queries_total", "SQL statements executed (including background work).", ()))
+calendar_sync_seconds = REGISTRY.register(Histogram(
+    "rentacar_calendar_sync_duration_seconds", "Background calendar sync duration by outcome.", ("outcome",)))
+idempotent_replays_total = REGISTRY.register(Counter(
+    "rentacar_idempotent_replays_total", "Create-booking retries answered from the idempotency store.", ()))
+
+
+# --- DB statement accounting ---
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("rentacar_request_queries", default=None)
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_metrics_t0")
+    elapsed = time.perf_counter() - started.pop() if started else 0.0
+    db_queries_total.inc()
+    stats = _request_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+def install_db_metrics() -> None:
+    """Listen on every Engine (so test/worker engines created later are covered too)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+# --- HTTP middleware ---
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware: per-route latency, status codes, in-flight and DB cost."""
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        state = {"status": 500, "done": False}
+        t0 = time.perf_counter()
+
+        def finish():
+            # Recorded when the last body chunk is sent, so background tasks that
+            # run afterwards (calendar sync) don't count towards request latency.
+            if state["done"]:
+                return
+            state["done"] = True
+            http_in_flight.dec()
+            # Route templates keep label cardinality bounded; unmatched paths share one label.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_requests_total.inc(method, route, str(state["status"]))
+            http_request_seconds.observe(time.perf_counter() - t0, method, route)
+            db_queries_per_request.observe(stats.count, route)
+            db_time_per_request.observe(stats.seconds, route)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _request_queries.reset(token)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,192 @@
+"""Opt-in, per-request cProfile capture for slow-call investigations.
+
+A request is profiled when it carries `X-Profile: 1` together with a valid
+`X-Admin-Key`, or when it is picked by PROFILE_SAMPLE_RATE (0.0-1.0, default
+0). The handler body (create_booking, check_availability, ...) runs under
+cProfile in the worker thread that executes it; the result is kept in a
+bounded in-memory store and the response carries `X-Profile-Id` so it can be
+fetched from /api/admin/profiles/{id}.
+
+When a request is not selected the overhead is one ContextVar lookup in the
+wrapped handler and one header scan in the middleware.
+"""
+import cProfile
+import functools
+import inspect
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi.routing import APIRoute
+
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+
+class ProfileRecord:
+    __slots__ = ("id", "method", "path", "trigger", "started_at", "duration_ms", "stats")
+
+    def __init__(self, id: str, method: str, path: str, trigger: str):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.now(timezone.utc)
+        self.duration_ms: Optional[float] = None
+        self.stats: Optional[dict] = None
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "startedAt": self.started_at.isoformat(),
+            "durationMs": self.duration_ms,
+            "captured": self.stats is not None,
+        }
+
+    def dump(self) -> bytes:
+        """Same bytes pstats.Stats.dump_stats() writes; open with pstats or snakeviz."""
+        return marshal.dumps(self.stats or {})
+
+    def text(self, sort: str = "cumulative", limit: int = 40) -> str:
+        out = io.StringIO()
+        p = pstats.Stats(_StatsSource(self.stats or {}), stream=out)
+        p.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+class _StatsSource:
+    """Adapter so pstats.Stats can load an in-memory stats dict."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileStore:
+    def __init__(self, keep: int = KEEP):
+        self.keep = keep
+        self._items: "OrderedDict[str, ProfileRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def new(self, method: str, path: str, trigger: str) -> ProfileRecord:
+        rec = ProfileRecord(f"{int(time.time())}-{next(self._ids)}", method, path, trigger)
+        with self._lock:
+            self._items[rec.id] = rec
+            while len(self._items) > self.keep:
+                self._items.popitem(last=False)
+        return rec
+
+    def get(self, profile_id: str) -> Optional[ProfileRecord]:
+        with self._lock:
+            return self._items.get(profile_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return [r.summary() for r in reversed(self._items.values())]
+
+
+store = ProfileStore()
+_current: ContextVar[Optional[ProfileRecord]] = ContextVar("rentacar_profile", default=None)
+
+
+def _run_profiled(rec: ProfileRecord, fn, args, kwargs):
+    prof = cProfile.Profile()
+    t0 = time.perf_counter()
+    try:
+        return prof.runcall(fn, *args, **kwargs)
+    finally:
+        rec.duration_ms = round((time.perf_counter() - t0) * 1000, 3)
+        prof.create_stats()
+        rec.stats = prof.stats
+
+
+def wrap_endpoint(fn):
+    """Run `fn` under cProfile when the current request was selected for profiling."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            rec = _current.get()
+            if rec is None:
+                return await fn(*args, **kwargs)
+            # Coroutines share the event-loop thread, so other requests may appear in this profile.
+            prof = cProfile.Profile()
+            t0 = time.perf_counter()
+            prof.enable()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                rec.duration_ms = round((time.perf_counter() - t0) * 1000, 3)
+                prof.create_stats()
+                rec.stats = prof.stats
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        rec = _current.get()
+        if rec is None:
+            return fn(*args, **kwargs)
+        return _run_profiled(rec, fn, args, kwargs)
+    return wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """Route class that wraps every endpoint with wrap_endpoint()."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, wrap_endpoint(endpoint), **kwargs)
+
+
+class ProfilingMiddleware:
+    """Selects requests for profiling and tags the response with X-Profile-Id."""
+
+    def __init__(self, app, sample_rate: float = SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    def _trigger(self, scope) -> Optional[str]:
+        headers = dict(scope.get("headers") or ())
+        if headers.get(b"x-profile") in (b"1", b"true"):
+            admin_key = os.getenv("ADMIN_KEY", "RENTACAR_ELITE_2026").encode()
+            if headers.get(b"x-admin-key") == admin_key:
+                return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        rec = store.new(scope["method"], scope["path"], trigger)
+        token = _current.set(rec)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", rec.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,111 @@
+"""Count SQL statements per block of code and flag N+1 patterns.
+
+    with count_queries() as q:
+        client.post("/api/create-booking", json=payload)
+    assert q.count <= 4, q.report()
+
+    with assert_max_queries(4):
+        ...
+
+Counting hooks SQLAlchemy's Engine-level cursor events and is scoped with a
+ContextVar, so concurrent requests (and the thread pool FastAPI runs sync
+handlers in) only see their own statements.
+"""
+import logging
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Repeats at or above this count are reported as a likely N+1 loop.
+REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "3"))
+
+_active: ContextVar[Tuple["QueryLog", ...]] = ContextVar("rentacar_query_logs", default=())
+_installed = False
+
+_WS = re.compile(r"\s+")
+
+
+def _normalize(statement: str) -> str:
+    return _WS.sub(" ", statement).strip()
+
+
+class QueryLog:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """Identical statements (same SQL, any parameters) executed `threshold`+ times."""
+        return [(sql, n) for sql, n in Counter(self.statements).most_common() if n >= threshold]
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries:"]
+        lines += [f"  {i + 1}. {sql}" for i, sql in enumerate(self.statements)]
+        for sql, n in self.repeated():
+            lines.append(f"  repeated x{n}: {sql}")
+        return "\n".join(lines)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    logs = _active.get()
+    if logs:
+        sql = _normalize(statement)
+        for log in logs:
+            log.statements.append(sql)
+
+
+def install() -> None:
+    global _installed
+    if not _installed:
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryLog]:
+    install()
+    log = QueryLog()
+    token = _active.set(_active.get() + (log,))
+    try:
+        yield log
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_max_queries(budget: int, label: str = "block") -> Iterator[QueryLog]:
+    with count_queries() as log:
+        yield log
+    if log.count > budget:
+        raise AssertionError(f"{label} exceeded its query budget ({log.count} > {budget})\n{log.report()}")
+
+
+class RepeatedQueryMiddleware:
+    """Debug-only ASGI middleware: warn when a request repeats the same statement.
+
+    Enabled by main.py when DEBUG_BOOKING=1; costs nothing otherwise.
+    """
+
+    def __init__(self, app, threshold: int = REPEAT_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with count_queries() as log:
+            await self.app(scope, receive, send)
+        for sql, n in log.repeated(self.threshold):
+            logger.warning("[N+1] %s %s ran %d identical statements: %s", scope["method"], scope["path"], n, sql)
@@ -63,18 +63,8 @@ function App() {
           return [...prev, { role: newRole, text: message.transcript || '' }];
         });
       }
-
-      if (message.type === 'tool-call-result') {
-        const toolName =
-          message.toolCallResult?.name ||
-          message.name ||
-          message.toolCall?.name;
-
-        console.log("TOOL CALL RESULT:", toolName, message);
-        if (toolName === 'create-booking' || toolName === 'create_booking') {
-          setRefreshKey(prev => prev + 1);
-        }
-      }
+      // Bookings made during the call reach the Schedule and Booked views over
+      // the booking event stream (useBookingEvents); no refetch needed here.
     });
 
 
@@ -15,6 +15,7 @@ import {
 } from 'date-fns';
 import { ChevronLeft, ChevronRight, Calendar as CalendarIcon, Clock, User, MapPin } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
+import { useBookingEvents } from '../hooks/useBookingEvents';
 
 const ADMIN_KEY = import.meta.env.VITE_ADMIN_KEY || 'RENTACAR_ELITE_2026';
 
@@ -56,6 +57,13 @@ export const BookingCalendar = ({ refreshKey }: { refreshKey?: number }) => {
         fetchBookings();
     }, [refreshKey, fetchBookings]);
 
+    // Live updates: patch the schedule in place instead of re-fetching it.
+    useBookingEvents<Booking>({
+        onCreated: (booking) => setBookings(prev => prev.some(b => b.id === booking.id) ? prev : [booking, ...prev]),
+        onCancelled: (event) => setBookings(prev => prev.filter(b => b.id !== event.id)),
+        onResync: fetchBookings,
+    });
+
     const renderHeader = () => {
         return (
             <div className="flex items-center justify-between px-4 py-6">
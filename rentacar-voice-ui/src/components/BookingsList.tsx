@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { User, Phone, MapPin, Car, Shield, Lock, Search, Filter, ChevronDown, Loader2 } from 'lucide-react';
+import { useBookingEvents } from '../hooks/useBookingEvents';
 
 interface Booking {
     id: number;
@@ -40,7 +41,11 @@ export const BookingsList = ({ refreshKey = 0 }: { refreshKey?: number }) => {
             });
             const data = await resp.json();
             if (data.success) {
-                setBookings(prev => reset ? data.bookings : [...prev, ...data.bookings]);
+                // Live inserts shift offsets, so a later page can repeat a booking we already show.
+                setBookings(prev => reset ? data.bookings : [
+                    ...prev,
+                    ...data.bookings.filter((b: Booking) => !prev.some(p => p.id === b.id)),
+                ]);
                 setTotal(data.total);
                 setHasMore(data.bookings.length === 10);
             }
@@ -58,7 +63,27 @@ export const BookingsList = ({ refreshKey = 0 }: { refreshKey?: number }) => {
         }
     }, [isAdmin, fetchBookings]);
 
-    // Refetch when a new booking is created (e.g. via voice) so Booked Ride list updates immediately
+    // New and cancelled bookings arrive over the event stream and are patched in place;
+    // the full list is only re-fetched on a manual refresh or when the stream asks to resync.
+    useBookingEvents<Booking>({
+        onCreated: (booking) => {
+            if (booking.status !== 'booked' || (categoryFilter && booking.carCategory !== categoryFilter)) return;
+            if (bookings.some(b => b.id === booking.id)) return;
+            setBookings(prev => [booking, ...prev]);
+            setTotal(prev => prev + 1);
+        },
+        onCancelled: (event) => {
+            if (!bookings.some(b => b.id === event.id)) return;
+            setBookings(prev => prev.filter(b => b.id !== event.id));
+            setTotal(prev => Math.max(0, prev - 1));
+        },
+        onResync: () => {
+            fetchBookings(true);
+            setPage(1);
+        },
+    }, isAdmin);
+
+    // Manual refresh from the toolbar
     useEffect(() => {
         if (isAdmin && refreshKey > 0) {
             fetchBookings(true);
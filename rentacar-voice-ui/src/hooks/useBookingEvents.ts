@@ -0,0 +1,89 @@
+import { useEffect, useRef } from 'react';
+
+const ADMIN_KEY = import.meta.env.VITE_ADMIN_KEY || 'RENTACAR_ELITE_2026';
+
+export interface BookingCancelledEvent {
+    id: number;
+    bookingReference: string;
+    status: string;
+}
+
+export interface BookingCalendarEvent {
+    id: number;
+    bookingReference: string;
+    calendarStatus: string;
+}
+
+export interface BookingEventHandlers<T> {
+    // The new booking in the same shape /api/get-all-bookings returns.
+    onCreated?: (booking: T) => void;
+    onCancelled?: (event: BookingCancelledEvent) => void;
+    onCalendar?: (event: BookingCalendarEvent) => void;
+    // The server dropped events for this client: re-fetch the list once.
+    onResync?: () => void;
+}
+
+// Live booking changes from /api/admin/booking-events (Server-Sent Events), so
+// dashboards patch their lists in place instead of re-fetching them.
+// EventSource cannot send headers, so the admin key buys a short-lived signed
+// stream token (POST /api/admin/booking-events/token) that goes in the URL
+// instead. EventSource retries on its own; once the server rejects an expired
+// token it gives up, and we reopen with a fresh token from the last event id.
+export function useBookingEvents<T>(handlers: BookingEventHandlers<T>, enabled = true) {
+    const handlersRef = useRef(handlers);
+
+    useEffect(() => {
+        handlersRef.current = handlers;
+    }, [handlers]);
+
+    useEffect(() => {
+        if (!enabled) return;
+        let source: EventSource | null = null;
+        let retry: ReturnType<typeof setTimeout> | undefined;
+        let lastEventId = '';
+        let closed = false;
+        const data = (e: Event) => {
+            lastEventId = (e as MessageEvent).lastEventId || lastEventId;
+            return JSON.parse((e as MessageEvent).data);
+        };
+
+        const open = async () => {
+            try {
+                const resp = await fetch('/api/admin/booking-events/token', {
+                    method: 'POST',
+                    headers: { 'X-Admin-Key': ADMIN_KEY },
+                });
+                if (!resp.ok) throw new Error(`token request failed: ${resp.status}`);
+                const { token } = await resp.json();
+                if (closed) return;
+                const params = new URLSearchParams({ token });
+                if (lastEventId) params.set('lastEventId', lastEventId);
+                source = new EventSource(`/api/admin/booking-events?${params}`);
+            } catch {
+                if (!closed) retry = setTimeout(open, 5000);
+                return;
+            }
+
+            source.addEventListener('booking.created', (e) => handlersRef.current.onCreated?.(data(e).booking as T));
+            source.addEventListener('booking.cancelled', (e) => handlersRef.current.onCancelled?.(data(e)));
+            source.addEventListener('booking.calendar', (e) => handlersRef.current.onCalendar?.(data(e)));
+            source.addEventListener('resync', () => {
+                // The list is re-fetched, so a later reconnect starts from now.
+                lastEventId = '';
+                handlersRef.current.onResync?.();
+            });
+            source.onerror = () => {
+                if (source?.readyState !== EventSource.CLOSED || closed) return;
+                source = null;
+                retry = setTimeout(open, 1000);
+            };
+        };
+
+        open();
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            source?.close();
+        };
+    }, [enabled]);
+}
@@ -0,0 +1,114 @@
+"""Production launcher: migrate once, preload the app, then fork N uvicorn workers.
+
+    WEB_CONCURRENCY=4 python serve.py --host 0.0.0.0 --port 8000
+
+The parent process takes the migration file lock and runs init_db() exactly
+once, imports main (so every worker shares the preloaded code pages), binds
+the listening socket, and forks the workers. Each worker resets the DB pool
+and cache connections it inherited, then serves on the shared socket. Dead
+workers are restarted; SIGINT/SIGTERM shut everything down.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+logger = logging.getLogger("serve")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock: socket.socket, log_level: str) -> None:
+    import database
+
+    # Connections opened in the parent must not be shared across processes.
+    database.engine.dispose(close=False)
+    app_module.app_cache = app_module.build_app_cache()
+
+    config = uvicorn.Config(app_module.app, log_level=log_level, access_log=False)
+    server = uvicorn.Server(config)
+    asyncio.run(server.serve(sockets=[sock]))
+
+
+def spawn(app_module, sock, log_level) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            run_worker(app_module, sock, log_level)
+        except Exception:
+            logger.exception("Worker %s crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    import database
+    database.init_db()
+    os.environ["RENTACAR_DB_READY"] = "1"
+
+    import main as app_module  # preload before forking
+
+    sock = bind_socket(args.host, args.port)
+    logger.info("Serving on %s:%s with %d workers", args.host, args.port, args.workers)
+
+    workers = {spawn(app_module, sock, args.log_level) for _ in range(args.workers)}
+    stopping = False
+
+    def shutdown(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            logger.warning("Worker %s exited (status %s); restarting", pid, status)
+            time.sleep(0.5)
+            workers.add(spawn(app_module, sock, args.log_level))
+
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Single-flight request coalescing for identical concurrent computations.
+
+    flight = SingleFlight("availability")
+    cars = flight.do(key, lambda: expensive(...))
+
+The first caller for a key (the leader) runs the function; callers that
+arrive with the same key while it is running wait for it and get the same
+result (or exception) instead of repeating the work. Nothing is cached:
+once the leader finishes, the next call for the key runs again, so results
+are never staler than one in-flight evaluation.
+
+Handlers run in the threadpool, so waiting is a plain threading.Event.
+Leader/shared counts are kept per group and exported through metrics.py.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+import metrics
+
+singleflight_total = metrics.REGISTRY.register(metrics.Counter(
+    "rentacar_singleflight_total", "Coalesced computations: leader runs vs. callers that shared a result.",
+    ("group", "outcome")))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, group: str):
+        self.group = group
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            singleflight_total.inc(self.group, "shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        singleflight_total.inc(self.group, "leader")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        total = self.leaders + self.shared
+        return {
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "inFlight": in_flight,
+            "coalescedRatio": round(self.shared / total, 4) if total else 0.0,
+        }
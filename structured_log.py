@@ -0,0 +1,189 @@
+"""Structured JSON logging off the request path.
+
+Handlers only enqueue records (QueueHandler over a bounded queue); a single
+listener thread formats them as one JSON object per line and writes them out.
+Events are logged with log_event(logger, "event_name", field=value, ...):
+
+- fields may be zero-argument callables, evaluated only if the record is
+  actually emitted (level enabled and kept by sampling);
+- per-event sampling: LOG_SAMPLE_RATE (default 1.0) and LOG_SAMPLE_RATES
+  ("payload_received=0.05,assigned_car=0.2"); WARNING and above are never
+  sampled out;
+- PII redaction by field name (configure_redaction), applied recursively to
+  nested dicts/lists in the listener thread; credentials in URL query
+  strings (?key=, ?token=, SECRET_QUERY_PARAMS) are masked in every message
+  and string field, so access-log lines never carry them;
+- when the queue is full the record is dropped and counted instead of
+  blocking the caller.
+
+Emitted, sampled-out and dropped records and the time callers spend in
+log_event are exported through metrics.py.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+import metrics
+
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+DEFAULT_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+log_records_total = metrics.REGISTRY.register(metrics.Counter(
+    "rentacar_log_records_total", "Structured log records by outcome", ("outcome",)))
+log_call_seconds_total = metrics.REGISTRY.register(metrics.Counter(
+    "rentacar_log_call_seconds_total", "Time spent by callers inside log_event (seconds)"))
+
+_redactors: Dict[str, Callable[[str], str]] = {}
+SECRET_QUERY_PARAMS = ("key", "token")
+_SECRET_QUERY_RE = re.compile(r"([?&](?:%s)=)[^&\s\"']*" % "|".join(SECRET_QUERY_PARAMS), re.IGNORECASE)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in spec.split(","):
+        name, sep, value = part.partition("=")
+        if sep and name.strip():
+            rates[name.strip()] = float(value)
+    return rates
+
+
+_sample_rates: Dict[str, float] = _parse_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+
+
+def set_sample_rate(event: Optional[str], rate: float) -> None:
+    """Set the keep-probability for one event, or the default when event is None."""
+    global DEFAULT_SAMPLE_RATE
+    if event is None:
+        DEFAULT_SAMPLE_RATE = rate
+    else:
+        _sample_rates[event] = rate
+
+
+def configure_redaction(redactors: Dict[str, Callable[[str], str]]) -> None:
+    """Register field-name -> masking function (e.g. main.mask_phone for "phoneNumber")."""
+    _redactors.update(redactors)
+
+
+def scrub_query_secrets(text: str) -> str:
+    """`/x?key=abc&n=1` -> `/x?key=[REDACTED]&n=1`."""
+    return _SECRET_QUERY_RE.sub(r"\1[REDACTED]", text) if "=" in text else text
+
+
+def redact(value):
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            fn = _redactors.get(k)
+            out[k] = fn(v) if fn is not None and isinstance(v, str) else redact(v)
+        return out
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return scrub_query_secrets(value)
+    return value
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields) -> None:
+    t0 = time.perf_counter()
+    try:
+        if not logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING:
+            rate = _sample_rates.get(event, DEFAULT_SAMPLE_RATE)
+            if rate < 1.0 and random.random() >= rate:
+                log_records_total.inc("sampled_out")
+                return
+        resolved = {k: (v() if callable(v) else v) for k, v in fields.items()}
+        logger.log(level, event, extra={"event": event, "fields": resolved})
+    finally:
+        log_call_seconds_total.inc(amount=time.perf_counter() - t0)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None) or scrub_query_secrets(record.getMessage()),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            doc.update(redact(fields))
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            doc["exc"] = record.exc_text
+        return json.dumps(doc, default=str, separators=(",", ":"))
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: full queue -> record dropped and counted.
+
+    prepare() is deliberately left cheap (no message formatting); the
+    listener's formatter does that work on its own thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            log_records_total.inc("emitted")
+        except queue.Full:
+            log_records_total.inc("dropped")
+
+
+def setup_logging(level: int = logging.INFO, stream=None, queue_size: int = QUEUE_SIZE) -> None:
+    """Route the root logger through a bounded queue to a JSON stream handler."""
+    global _listener
+    if _listener is not None:
+        return
+    q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    out = logging.StreamHandler(stream or sys.stderr)
+    out.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(DroppingQueueHandler(q))
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    # serve.py forks workers after import; the listener thread does not survive fork.
+    os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def _restart_in_child() -> None:
+    global _listener
+    if _listener is None:
+        return
+    q: "queue.Queue" = queue.Queue(maxsize=_listener.queue.maxsize)
+    for h in logging.getLogger().handlers:
+        if isinstance(h, DroppingQueueHandler):
+            h.queue = q
+    _listener = logging.handlers.QueueListener(q, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,47 @@
+import csv
+import io
+
+import main
+
+ADMIN = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+
+
+def _book(client, phone, category, pickup):
+    r = client.post("/api/create-booking", json={
+        "fullName": "Export Caller", "phoneNumber": phone, "pickupLocation": "A", "dropoffLocation": "B",
+        "carCategory": category, "pickupDateTime": pickup, "returnDateTime": pickup[:11] + "18:00",
+    })
+    assert r.json()["success"] is True
+    return r.json()["bookingReference"]
+
+
+def test_list_and_export_share_the_projected_rows(client):
+    refs = [
+        _book(client, "03001000001", "SUV", "2026-10-01 10:00"),
+        _book(client, "03001000002", "Sedan", "2026-10-02 10:00"),
+    ]
+    client.post("/api/cancel-booking", json={"phoneNumber": "03001000002"})
+
+    listed = client.get("/api/get-all-bookings", headers=ADMIN).json()
+    assert [b["bookingReference"] for b in listed["bookings"]] == [refs[0]]
+    assert listed["bookings"][0]["duration"] == "8h"
+
+    r = client.get("/api/admin/export-bookings", headers=ADMIN)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["bookingReference"] for row in rows] == refs
+    assert rows[0] == {k: str(v) for k, v in listed["bookings"][0].items()}
+    assert [row["status"] for row in rows] == ["booked", "cancelled"]
+
+    only_sedan = client.get("/api/admin/export-bookings?carCategory=Sedan", headers=ADMIN).text
+    assert refs[1] in only_sedan and refs[0] not in only_sedan
+    assert client.get("/api/admin/export-bookings").status_code == 403
+
+
+def test_export_streams_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(main, "EXPORT_CHUNK_ROWS", 1)
+    _book(client, "03001000003", "SUV", "2026-10-03 10:00")
+    _book(client, "03001000004", "SUV", "2026-10-04 10:00")
+    chunks = list(main.iter_bookings_csv(main.booking_list_filter(None, None)))
+    assert len(chunks) == 3  # header + one chunk per row
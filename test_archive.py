@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import archive
+import database
+
+ADMIN_HEADERS = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+NOW = datetime(2027, 6, 1, 12)
+
+
+def _seed(old: int, recent: int = 1):
+    """`old` bookings returned two years before NOW plus `recent` returned last week."""
+    db = database.SessionLocal()
+    try:
+        for i in range(old + recent):
+            pickup = NOW - (timedelta(days=730 - i) if i < old else timedelta(days=7))
+            db.add(database.Booking(
+                booking_reference=f"RC-OLD-{i:04d}", full_name="History Caller", phone_number="0300 000 1111",
+                pickup_location="Airport", dropoff_location="Home", car_category="SUV", assigned_car_id=3,
+                pickup_date_time=pickup, return_date_time=pickup + timedelta(hours=4),
+                status="cancelled" if i % 3 == 0 else "booked", created_at=pickup - timedelta(days=1),
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _counts():
+    db = database.SessionLocal()
+    try:
+        return db.query(database.Booking).count(), db.query(database.BookingArchive).count()
+    finally:
+        db.close()
+
+
+def test_archive_is_chunked_and_resumable(client):
+    _seed(old=7)
+    first = archive.archive_bookings(365, chunk_rows=3, max_chunks=1, now=NOW)
+    assert first["archived"] == 3 and first["remaining"] is True
+    assert _counts() == (5, 3)
+
+    rest = archive.archive_bookings(365, chunk_rows=3, now=NOW)
+    assert rest == {"archived": 4, "chunks": 2, "cutoff": (NOW - timedelta(days=365)).isoformat(), "remaining": False}
+    assert _counts() == (1, 7)
+    assert archive.archive_bookings(365, chunk_rows=3, now=NOW)["archived"] == 0
+
+
+def test_failed_chunk_leaves_rows_in_the_hot_table(client, monkeypatch):
+    _seed(old=2)
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("interrupted")
+
+    real_delete = database.Booking.__table__.delete
+    monkeypatch.setattr(database.Booking.__table__, "delete", boom)
+    with pytest.raises(RuntimeError):
+        archive.archive_bookings(365, now=NOW)
+    assert _counts() == (3, 0)
+
+    monkeypatch.setattr(database.Booking.__table__, "delete", real_delete)
+    assert archive.archive_bookings(365, now=NOW)["archived"] == 2
+    assert _counts() == (1, 2)
+
+
+def test_reads_see_archived_bookings_through_the_history_view(client):
+    _seed(old=2)
+    archive.archive_bookings(365, now=NOW)
+
+    found = client.post("/api/get-booking", json={"bookingReference": "RC-OLD-0001"}).json()
+    assert found["success"] is True and found["booking"]["status"] == "booked"
+
+    hot = client.get("/api/get-all-bookings", params={"status": ""}, headers=ADMIN_HEADERS).json()
+    assert [b["bookingReference"] for b in hot["bookings"]] == ["RC-OLD-0002"]
+    full = client.get("/api/get-all-bookings", params={"status": "", "includeArchived": True}, headers=ADMIN_HEADERS).json()
+    assert full["total"] == 3
+    assert [b["bookingReference"] for b in full["bookings"]] == ["RC-OLD-0002", "RC-OLD-0001", "RC-OLD-0000"]
+
+    csv_rows = client.get("/api/admin/export-bookings", params={"includeArchived": True}, headers=ADMIN_HEADERS).text
+    assert csv_rows.count("RC-OLD-") == 3
+
+
+def test_archive_endpoint_requires_admin_key(client):
+    assert client.post("/api/admin/archive-bookings").status_code == 401
+    r = client.post("/api/admin/archive-bookings", params={"olderThanDays": 0}, headers=ADMIN_HEADERS)
+    assert r.status_code == 400
+    r = client.post("/api/admin/archive-bookings", headers=ADMIN_HEADERS)
+    assert r.json()["ok"] is True and r.json()["archived"] == 0
+
+
+def test_archive_table_mirrors_booking_columns():
+    hot = [c.name for c in database.Booking.__table__.columns]
+    cold = [c.name for c in database.BookingArchive.__table__.columns]
+    assert cold[:len(hot)] == hot and cold[len(hot):] == ["archived_at"]
+
+
+def test_new_bookings_never_reuse_archived_ids_or_references(client):
+    booking = {"fullName": "Again", "phoneNumber": "0300 222 3333", "pickupLocation": "Airport", "dropoffLocation": "Home",
+               "carCategory": "Sedan", "pickupDateTime": "2027-05-01 10:00", "returnDateTime": "2027-05-01 12:00"}
+    first = client.post("/api/create-booking", json=booking).json()
+    # Archive everything, including the newest (highest-id) booking.
+    assert archive.archive_bookings(0, now=datetime(2030, 1, 1))["archived"] == 1
+
+    second = client.post("/api/create-booking", json=dict(booking, phoneNumber="0300 222 4444")).json()
+    assert second["bookingReference"] != first["bookingReference"]
+    assert archive.archive_bookings(0, now=datetime(2030, 1, 1))["archived"] == 1
+    db = database.SessionLocal()
+    try:
+        ids = db.execute(database.booking_history().select()).all()
+        assert len({r.id for r in ids}) == len({r.booking_reference for r in ids}) == 2
+    finally:
+        db.close()
+
+
+def test_migration_rebuilds_bookings_with_autoincrement(tmp_path):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    database.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # A pre-archive database: bookings without AUTOINCREMENT, and one row already archived with id 5.
+        conn.execute(text("DROP TABLE bookings"))
+        conn.execute(text("CREATE TABLE bookings (id INTEGER PRIMARY KEY, booking_reference VARCHAR(20), "
+                          "full_name VARCHAR(200) NOT NULL, phone_number VARCHAR(50) NOT NULL, "
+                          "pickup_location VARCHAR(250) NOT NULL, dropoff_location VARCHAR(250) NOT NULL, "
+                          "car_category VARCHAR(50) NOT NULL, notes TEXT, pickup_date_time DATETIME NOT NULL, "
+                          "return_date_time DATETIME, assigned_car_id INTEGER, status VARCHAR(30) NOT NULL, "
+                          "calendar_status VARCHAR(30), calendar_event_id VARCHAR(120), created_at DATETIME, "
+                          "cancelled_at DATETIME, row_version BIGINT NOT NULL DEFAULT 0, updated_at DATETIME)"))
+        conn.execute(text("CREATE INDEX idx_booking_status ON bookings (status)"))
+        conn.execute(text("INSERT INTO bookings (id, full_name, phone_number, pickup_location, dropoff_location, "
+                          "car_category, pickup_date_time, status) VALUES (2, 'A', '1', 'x', 'y', 'SUV', '2026-01-01', 'booked')"))
+        conn.execute(text("INSERT INTO bookings_archive (id, full_name, phone_number, pickup_location, dropoff_location, "
+                          "car_category, pickup_date_time, status, archived_at) "
+                          "VALUES (5, 'B', '2', 'x', 'y', 'SUV', '2025-01-01', 'booked', '2026-01-01')"))
+    with engine.begin() as conn:
+        database.migrate_booking_autoincrement(conn)
+        database.migrate_booking_autoincrement(conn)  # idempotent
+        assert "AUTOINCREMENT" in conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'bookings'")).scalar_one()
+        assert conn.execute(text("SELECT id FROM bookings")).scalars().all() == [2]
+        conn.execute(text("INSERT INTO bookings (full_name, phone_number, pickup_location, dropoff_location, "
+                          "car_category, pickup_date_time, status) VALUES ('C', '3', 'x', 'y', 'SUV', '2026-02-01', 'booked')"))
+        assert conn.execute(text("SELECT MAX(id) FROM bookings")).scalar_one() == 6
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import assignment
+import database
+
+ADMIN = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+BOOKING = {
+    "fullName": "Fit Caller", "phoneNumber": "0300 222 3333", "pickupLocation": "Airport", "dropoffLocation": "Home",
+    "carCategory": "Sedan", "pickupDateTime": "2026-12-10 13:00", "returnDateTime": "2026-12-10 15:00",
+}
+
+
+def _book(car_id, start, hours, ref):
+    db = database.SessionLocal()
+    b = database.Booking(
+        booking_reference=ref, full_name="Other", phone_number="1", pickup_location="X", dropoff_location="Y",
+        car_category=db.get(database.Car, car_id).category, pickup_date_time=start,
+        return_date_time=start + timedelta(hours=hours), assigned_car_id=car_id, status="booked",
+    )
+    db.add(b)
+    db.commit()
+    booking_id = b.id
+    db.close()
+    return booking_id
+
+
+def test_gap_around_and_best_fit_order():
+    day = datetime(2027, 1, 1)
+    schedule = [(day.replace(hour=8), day.replace(hour=10)), (day.replace(hour=18), day.replace(hour=20))]
+    assert assignment.gap_around(schedule, day.replace(hour=9), day.replace(hour=11)) is None
+    gap = assignment.gap_around(schedule, day.replace(hour=12), day.replace(hour=14))
+    assert gap == (day.replace(hour=10), day.replace(hour=18))
+    gaps = {1: (None, None), 2: (None, day.replace(hour=16)), 3: gap}
+    # Tightest closed hole first, then the snuggest half-open one, untouched cars last.
+    assert assignment.best_fit([1, 2, 3], gaps, day.replace(hour=12), day.replace(hour=14)) == [3, 2, 1]
+    assert assignment.first_fit([1, 2, 3], gaps, day, day) == [1, 2, 3]
+
+
+def test_create_booking_prefers_the_tightest_gap(client, monkeypatch):
+    _book(2, datetime(2026, 12, 10, 16), 2, "RC-FIT-1")
+    assert client.post("/api/create-booking", json=BOOKING).json()["assignedCar"]["id"] == 2
+
+    monkeypatch.setattr(assignment, "STRATEGY", assignment.first_fit)
+    later = dict(BOOKING, phoneNumber="0300 222 4444", pickupDateTime="2026-12-11 13:00", returnDateTime="2026-12-11 15:00")
+    assert client.post("/api/create-booking", json=later).json()["assignedCar"]["id"] == 1
+
+
+def test_reoptimize_packs_identical_cars(client):
+    db = database.SessionLocal()
+    twin = database.Car(name="Toyota Prado", category="SUV", status="available")
+    db.add(twin)
+    db.commit()
+    twin_id = twin.id
+    db.close()
+    _book(3, datetime(2026, 12, 20, 10), 2, "RC-FIT-A")
+    moved = _book(twin_id, datetime(2026, 12, 20, 14), 2, "RC-FIT-B")
+
+    assert client.post("/api/admin/reoptimize-assignments").status_code == 401
+    result = client.post("/api/admin/reoptimize-assignments", headers=ADMIN).json()
+    assert result["moved"] == 1 and result["applied"] is True
+
+    db = database.SessionLocal()
+    assert db.get(database.Booking, moved).assigned_car_id == 3
+    db.close()
+    free = client.post("/api/check-availability", json={
+        "carCategory": "SUV", "pickupDateTime": "2026-12-20 09:00", "returnDateTime": "2026-12-20 17:00"}).json()
+    assert twin_id in [c["id"] for c in free["cars"]]
+
+    # Already packed: a second pass changes nothing.
+    assert client.post("/api/admin/reoptimize-assignments", headers=ADMIN).json()["moved"] == 0
@@ -0,0 +1,119 @@
+"""Slot bitmaps must agree exactly with the SQL overlap rule (main.is_car_available)."""
+import random
+from datetime import datetime, timedelta
+
+import database
+import main
+from availability import AvailabilityEngine, SlotBitmaps
+
+ADMIN = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+
+
+def _random_window(rnd, base):
+    start = base + timedelta(minutes=rnd.randrange(0, 14 * 24 * 60, rnd.choice([1, 5, 15, 60])))
+    return start, start + timedelta(minutes=rnd.choice([1, 7, 15, 30, 45, 60, 95, 240, 24 * 60]))
+
+
+def test_bitmaps_match_sql_overlap_rule_on_random_schedules(client):
+    rnd = random.Random(20261019)
+    base = datetime(2027, 2, 1)
+    db = database.SessionLocal()
+    car_ids = [c.id for c in db.query(database.Car).all()]
+    maps = SlotBitmaps(base - timedelta(days=1), days=30)
+    for i in range(150):
+        start, end = _random_window(rnd, base)
+        b = database.Booking(
+            booking_reference=f"RC-PROP-{i}", full_name="P", phone_number="1", pickup_location="X",
+            dropoff_location="Y", car_category="SUV", pickup_date_time=start, return_date_time=end,
+            assigned_car_id=rnd.choice(car_ids), status=rnd.choice(["booked", "confirmed", "cancelled"]),
+        )
+        db.add(b)
+        db.flush()
+        if b.status != "cancelled":
+            maps.add(b.id, b.assigned_car_id, start, end)
+    db.commit()
+
+    # Incremental removal must give the same answers as never having added the booking.
+    cancelled = db.query(database.Booking).filter(database.Booking.status == "booked").limit(20).all()
+    for b in cancelled:
+        b.status = "cancelled"
+        maps.remove(b.id)
+    db.commit()
+
+    for _ in range(400):
+        start, end = _random_window(rnd, base)
+        busy = maps.busy(car_ids, start, end)
+        for car_id in car_ids:
+            assert (car_id in busy) == (not main.is_car_available(db, car_id, start, end)), (car_id, start, end)
+    db.close()
+
+
+def test_engine_serves_availability_and_tracks_local_writes(client, query_counter):
+    pickup = (datetime.now() + timedelta(days=10)).replace(hour=10, minute=0, second=0, microsecond=0)
+    window = {
+        "pickupDateTime": pickup.strftime("%Y-%m-%d %H:%M"),
+        "returnDateTime": (pickup + timedelta(hours=3)).strftime("%Y-%m-%d %H:%M"),
+        "carCategory": "SUV",
+    }
+    assert client.post("/api/check-availability", json=window).json()["availableCount"] == 2
+    booked = client.post("/api/create-booking", json=dict(window, fullName="Bit Map", phoneNumber="0300111",
+                                                           pickupLocation="A", dropoffLocation="B")).json()
+    assert booked["success"] is True
+
+    # Warm bitmaps already include the new booking: no SQL at all.
+    with query_counter() as q:
+        r = client.post("/api/check-availability", json=window).json()
+    assert q.count == 0, q.report()
+    assert r["availableCount"] == 1
+
+    client.post("/api/cancel-booking", json={"phoneNumber": "0300111"})
+    with query_counter() as q:
+        assert client.post("/api/check-availability", json=window).json()["availableCount"] == 2
+    assert q.count == 0, q.report()
+    stats = client.get("/api/admin/cache-stats", headers=ADMIN).json()["availability"]
+    assert stats["rebuilds"] >= 1
+
+
+def test_write_from_another_worker_forces_rebuild(client):
+    pickup = (datetime.now() + timedelta(days=12)).replace(hour=9, minute=0, second=0, microsecond=0)
+    window = {
+        "pickupDateTime": pickup.strftime("%Y-%m-%d %H:%M"),
+        "returnDateTime": (pickup + timedelta(hours=2)).strftime("%Y-%m-%d %H:%M"),
+        "carCategory": "Economy",
+    }
+    assert client.post("/api/check-availability", json=window).json()["availableCount"] == 1
+
+    # Simulate another worker: a row written directly plus a bumped generation token.
+    db = database.SessionLocal()
+    car = db.query(database.Car).filter(database.Car.category == "Economy").one()
+    db.add(database.Booking(
+        booking_reference="RC-OTHER-1", full_name="O", phone_number="2", pickup_location="X", dropoff_location="Y",
+        car_category="Economy", pickup_date_time=pickup, return_date_time=pickup + timedelta(hours=2),
+        assigned_car_id=car.id, status="booked",
+    ))
+    db.commit()
+    db.close()
+    main.app_cache.set("availability", "generation", "written-by-another-worker")
+
+    assert client.post("/api/check-availability", json=window).json()["availableCount"] == 0
+
+
+def test_engine_horizon_follows_the_utc_clock(client):
+    now = [datetime(2027, 3, 1, 23, 30)]
+    loads = []
+    engine = AvailabilityEngine(lambda: main.app_cache, lambda db, start, end: loads.append(start) or [], clock=lambda: now[0])
+    # Just past UTC midnight of the window's first day: covered regardless of the host's local time zone.
+    assert engine.busy_car_ids(None, [1], datetime(2027, 2, 28, 23, 45), datetime(2027, 3, 1, 1, 0)) == set()
+    assert loads == [datetime(2027, 2, 28, 23, 30)]
+
+    now[0] += timedelta(days=1)
+    engine.busy_car_ids(None, [1], now[0], now[0] + timedelta(hours=1))
+    assert engine.rebuilds == 1
+    now[0] += timedelta(days=1, minutes=1)
+    engine.busy_car_ids(None, [1], now[0], now[0] + timedelta(hours=1))
+    assert engine.rebuilds == 2 and loads[-1] == datetime(2027, 3, 2, 23, 30)
+
+
+def test_engine_defaults_to_utc():
+    clock = AvailabilityEngine(lambda: main.app_cache, lambda db, start, end: []).clock
+    assert abs(clock() - datetime.utcnow()) < timedelta(seconds=5)
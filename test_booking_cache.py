@@ -0,0 +1,58 @@
+import time
+
+from cache import TTLCache
+
+ADMIN_HEADERS = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+
+PAYLOAD = {
+    "fullName": "Cache Caller",
+    "phoneNumber": "03001112233",
+    "pickupLocation": "Airport",
+    "dropoffLocation": "Home",
+    "carCategory": "Sedan",
+    "pickupDateTime": "2026-08-01 10:00",
+    "returnDateTime": "2026-08-01 14:00",
+}
+
+
+def test_ttl_cache_lru_and_expiry():
+    c = TTLCache(maxsize=2, ttl=0.05)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1          # "a" becomes most recent
+    c.set("c", 3)                   # evicts "b"
+    assert c.get("b") is None
+    assert c.get("c") == 3
+    time.sleep(0.06)
+    assert c.get("a") is None
+    s = c.stats()
+    assert s["hits"] == 2 and s["misses"] == 2 and s["evictions"] == 1
+
+
+def _stats(client):
+    return client.get("/api/admin/cache-stats", headers=ADMIN_HEADERS).json()["cache"]["namespaces"]["booking"]
+
+
+def test_get_booking_is_cached_and_invalidated(client):
+    ref = client.post("/api/create-booking", json=PAYLOAD).json()["bookingReference"]
+
+    before = _stats(client)
+    for _ in range(3):
+        d = client.post("/api/get-booking", json={"bookingReference": ref}).json()
+        assert d["booking"]["status"] == "booked"
+    after = _stats(client)
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
+
+    # Cancelling must drop both the reference and the phone keys.
+    client.post("/api/get-booking", json={"phoneNumber": PAYLOAD["phoneNumber"]})
+    assert client.post("/api/cancel-booking", json={"phoneNumber": PAYLOAD["phoneNumber"]}).json()["success"]
+    assert client.post("/api/get-booking", json={"bookingReference": ref}).json()["booking"]["status"] == "cancelled"
+    assert client.post("/api/get-booking", json={"phoneNumber": PAYLOAD["phoneNumber"]}).json()["booking"]["status"] == "cancelled"
+
+
+def test_create_booking_invalidates_negative_phone_lookup(client):
+    lookup = {"phoneNumber": PAYLOAD["phoneNumber"], "fullName": PAYLOAD["fullName"]}
+    assert client.post("/api/get-booking", json=lookup).json()["error"] == "NOT_FOUND"
+    client.post("/api/create-booking", json=PAYLOAD)
+    assert client.post("/api/get-booking", json=lookup).json()["success"] is True
@@ -0,0 +1,85 @@
+from sqlalchemy import create_engine, text
+
+import database
+
+ADMIN_HEADERS = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+BOOKING = {
+    "fullName": "Mirror Caller",
+    "phoneNumber": "0300 111 2222",
+    "pickupLocation": "Airport",
+    "dropoffLocation": "Home",
+    "carCategory": "Sedan",
+    "pickupDateTime": "2027-02-01 10:00",
+    "returnDateTime": "2027-02-01 14:00",
+}
+
+
+def _changes(client, since, limit=500):
+    r = client.get("/api/admin/bookings/changes", params={"since": since, "limit": limit}, headers=ADMIN_HEADERS)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_changes_since_watermark_include_cancellations(client):
+    first = client.post("/api/create-booking", json=BOOKING).json()
+    second = client.post("/api/create-booking", json=dict(BOOKING, phoneNumber="0300 333 4444")).json()
+    page = _changes(client, 0)
+    assert [c["bookingReference"] for c in page["changes"]] == [first["bookingReference"], second["bookingReference"]]
+    assert page["hasMore"] is False
+    watermark = page["watermark"]
+    assert watermark == page["changes"][-1]["rowVersion"]
+
+    # Nothing new: same watermark back, no rows.
+    assert _changes(client, watermark) == {"success": True, "changes": [], "watermark": watermark, "hasMore": False}
+
+    client.post("/api/cancel-booking", json={"phoneNumber": BOOKING["phoneNumber"]})
+    page = _changes(client, watermark)
+    assert [(c["bookingReference"], c["status"]) for c in page["changes"]] == [(first["bookingReference"], "cancelled")]
+    assert page["watermark"] > watermark and page["changes"][0]["updatedAt"]
+
+
+def test_group_insert_and_paging_get_distinct_versions(client):
+    group = client.post("/api/create-group-booking", json={
+        "fullName": "Tour Lead", "phoneNumber": "0300 999 0000", "pickupLocation": "Airport", "dropoffLocation": "Hotel",
+        "pickupDateTime": "2027-02-02 09:00", "returnDateTime": "2027-02-02 18:00",
+        "cars": [{"carCategory": "Sedan", "quantity": 2}, {"carCategory": "SUV", "quantity": 1}],
+    }).json()
+    assert group["success"] is True, group
+
+    seen, since = [], 0
+    while True:
+        page = _changes(client, since, limit=2)
+        seen += [c["rowVersion"] for c in page["changes"]]
+        since = page["watermark"]
+        if not page["hasMore"]:
+            break
+    assert len(seen) == 3 and seen == sorted(set(seen))
+
+
+def test_changes_require_admin_key(client):
+    assert client.get("/api/admin/bookings/changes").status_code == 403
+
+
+def test_migration_backfills_versions_on_an_old_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    database.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_booking_row_version"))
+        conn.execute(text("ALTER TABLE bookings DROP COLUMN row_version"))
+        conn.execute(text("ALTER TABLE bookings DROP COLUMN updated_at"))
+        for ref, status, created, cancelled in [
+            ("RC-OLD-1", "booked", "2026-01-01 10:00:00", None),
+            ("RC-OLD-2", "cancelled", "2026-01-02 10:00:00", "2026-01-03 10:00:00"),
+        ]:
+            conn.execute(text(
+                "INSERT INTO bookings (booking_reference, full_name, phone_number, pickup_location, dropoff_location, "
+                "car_category, pickup_date_time, return_date_time, status, created_at, cancelled_at) "
+                "VALUES (:ref, 'Old Caller', '0300', 'Airport', 'Home', 'SUV', :t, :t, :status, :t, :c)"
+            ), {"ref": ref, "status": status, "t": created, "c": cancelled})
+    with engine.begin() as conn:
+        database.migrate_row_versions(conn)
+        database.migrate_row_versions(conn)  # idempotent
+        rows = conn.execute(text("SELECT booking_reference, row_version, updated_at FROM bookings ORDER BY id")).all()
+        assert [(r[0], r[1]) for r in rows] == [("RC-OLD-1", 1), ("RC-OLD-2", 2)]
+        assert str(rows[1][2]).startswith("2026-01-03")
+        assert database.next_row_versions(conn) == 3
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+
+import events
+
+BOOKING = {
+    "fullName": "Feed Caller", "phoneNumber": "0300 444 5555", "pickupLocation": "Airport", "dropoffLocation": "Home",
+    "carCategory": "SUV", "pickupDateTime": "2026-12-08 10:00", "returnDateTime": "2026-12-08 12:00",
+}
+
+
+def _parse(frame: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+async def _open(broadcaster, last_event_id=None):
+    async def connected():
+        return False
+
+    stream = events.sse_stream(broadcaster, connected, last_event_id, heartbeat=0.05)
+    # The first frame is only produced once the stream has subscribed.
+    assert await stream.__anext__() == b"retry: 3000\n\n"
+    return stream
+
+
+async def _read(stream, count, timeout=2.0):
+    """The next `count` event frames (keepalives skipped), within one overall deadline."""
+    frames = []
+    try:
+        async with asyncio.timeout(timeout):
+            while len(frames) < count:
+                frame = await stream.__anext__()
+                if not frame.startswith(b":"):
+                    frames.append(frame)
+    finally:
+        await stream.aclose()
+    return frames
+
+
+async def _collect(broadcaster, count, last_event_id=None):
+    return await _read(await _open(broadcaster, last_event_id), count)
+
+
+def test_fan_out_replay_and_resync():
+    b = events.Broadcaster()
+
+    def publish():
+        for i in range(3):
+            b.publish("booking.cancelled", id=i)
+
+    async def two_clients():
+        streams = [await _open(b), await _open(b)]
+        publisher = threading.Thread(target=publish)  # handlers publish from the threadpool
+        publisher.start()
+        try:
+            return await asyncio.gather(*(_read(s, 3) for s in streams))
+        finally:
+            publisher.join()
+
+    first, second = asyncio.run(two_clients())
+    assert first == second
+    assert [_parse(f)["data"]["id"] for f in first] == [0, 1, 2]
+    assert b.stats()["subscribers"] == 0
+
+    # Reconnect after the first event: the two missed ones are replayed.
+    missed = asyncio.run(_collect(b, 2, last_event_id=_parse(first[0])["id"]))
+    assert missed == first[1:]
+    # An id from another process cannot be replayed.
+    assert asyncio.run(_collect(b, 1, last_event_id="deadbeef-1")) == [events.RESYNC]
+
+
+def test_slow_consumer_gets_resync():
+    b = events.Broadcaster(queue_size=2)
+
+    async def scenario():
+        sub, _ = b.subscribe(asyncio.get_running_loop())
+        for i in range(5):
+            b.publish("booking.cancelled", id=i)
+        await asyncio.sleep(0)
+        frames = [sub.queue.get_nowait() for _ in range(sub.queue.qsize())]
+        b.unsubscribe(sub)
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert events.RESYNC in frames and len(frames) <= 2
+
+
+def test_booking_lifecycle_is_published(client):
+    import main
+
+    start = f"{main.booking_events.epoch}-{main.booking_events.stats()['published']}"
+    created = client.post("/api/create-booking", json=BOOKING).json()
+    client.post("/api/cancel-booking", json={"phoneNumber": BOOKING["phoneNumber"]})
+
+    frames = [_parse(f) for f in asyncio.run(_collect(main.booking_events, 3, last_event_id=start))]
+    assert [f["event"] for f in frames] == ["booking.created", "booking.calendar", "booking.cancelled"]
+    booking = frames[0]["data"]["booking"]
+    assert booking["bookingReference"] == created["bookingReference"]
+    assert booking["customerName"] == "Feed Caller" and booking["status"] == "booked"
+    assert frames[1]["data"]["calendarStatus"] == "skipped"
+    assert frames[2]["data"] == {"id": booking["id"], "bookingReference": created["bookingReference"], "status": "cancelled"}
+
+
+def test_stream_requires_admin_key_or_signed_token(client, monkeypatch):
+    import main
+
+    assert client.get("/api/admin/booking-events").status_code == 403
+    # The admin key itself is never accepted in the URL.
+    assert client.get("/api/admin/booking-events?key=RENTACAR_ELITE_2026").status_code == 403
+
+    assert client.post("/api/admin/booking-events/token").status_code == 403
+    issued = client.post("/api/admin/booking-events/token", headers={"X-Admin-Key": "RENTACAR_ELITE_2026"}).json()
+    token = issued["token"]
+    assert issued["expiresIn"] == main.STREAM_TOKEN_TTL_SECONDS
+    assert main.valid_stream_token(token, "RENTACAR_ELITE_2026")
+    assert not main.valid_stream_token(token, "another-key")
+    expires, _, signature = token.partition(".")
+    assert not main.valid_stream_token(f"{int(expires) + 600}.{signature}", "RENTACAR_ELITE_2026")
+    assert client.get(f"/api/admin/booking-events?token={int(expires) + 600}.{signature}").status_code == 403
+
+    monkeypatch.setattr(main.time, "time", lambda: int(expires) + 1)
+    assert not main.valid_stream_token(token, "RENTACAR_ELITE_2026")
+
+
+def test_failed_post_commit_side_effects_do_not_fail_the_booking(client, monkeypatch):
+    import database
+    import main
+
+    def down(*args, **kwargs):
+        raise ConnectionError("relay unreachable")
+
+    monkeypatch.setattr(main.booking_events, "publish", down)
+    monkeypatch.setattr(main, "invalidate_booking_caches", down)
+    r = client.post("/api/create-booking", json=BOOKING, headers={"Idempotency-Key": "post-commit"})
+    assert r.status_code == 200 and r.json()["success"] is True
+    # Stored for replay, so a client retry cannot book twice.
+    assert client.post("/api/create-booking", json=BOOKING, headers={"Idempotency-Key": "post-commit"}).headers["idempotent-replayed"] == "true"
+    db = database.SessionLocal()
+    assert db.query(database.Booking).count() == 1
+    db.close()
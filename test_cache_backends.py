@@ -0,0 +1,226 @@
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from cache import InProcessBackend, RedisBackend, RespConnection, make_cache
+
+
+class StandInRedis(socketserver.ThreadingTCPServer):
+    """Just enough of the Redis protocol (GET/SET PX/DEL/SCAN/PUBLISH/SUBSCRIBE, DEBUG SLEEP) for the backend."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super().__init__(("127.0.0.1", port), _RespHandler)
+        self.data = {}
+        self.subscribers = {}
+        self.clients = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop listening and cut every open client connection (an outage, not a clean shutdown)."""
+        self.shutdown()
+        self.server_close()
+        for sock in self.clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            n = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def _write(self, value):
+        self.wfile.write(_encode(value))
+
+    def handle(self):
+        srv = self.server
+        srv.clients.append(self.request)
+        while True:
+            try:
+                args = self._read_command()
+            except (OSError, ValueError):
+                return
+            if args is None:
+                return
+            cmd = args[0].upper()
+            if cmd == b"DEBUG":  # DEBUG SLEEP <seconds>: a reply that arrives after the client gave up
+                time.sleep(float(args[2]))
+                self._write("+OK")
+                continue
+            with srv.lock:
+                now = time.monotonic()
+                if cmd == b"GET":
+                    entry = srv.data.get(args[1])
+                    self._write(entry[0] if entry and entry[1] > now else None)
+                elif cmd == b"SET":
+                    ttl = int(args[4]) / 1000 if len(args) > 4 else 1e9
+                    srv.data[args[1]] = (args[2], now + ttl)
+                    self._write("+OK")
+                elif cmd == b"DEL":
+                    self._write(sum(srv.data.pop(k, None) is not None for k in args[1:]))
+                elif cmd == b"SCAN":
+                    pattern = args[args.index(b"MATCH") + 1].decode()
+                    self._write([b"0", [k for k in srv.data if fnmatch.fnmatchcase(k.decode(), pattern)]])
+                elif cmd == b"PUBLISH":
+                    subs = srv.subscribers.get(args[1], [])
+                    for w in subs:
+                        w.write(_encode([b"message", args[1], args[2]]))
+                        w.flush()
+                    self._write(len(subs))
+                elif cmd == b"SUBSCRIBE":
+                    srv.subscribers.setdefault(args[1], []).append(self.wfile)
+                    self._write([b"subscribe", args[1], 1])
+                else:
+                    self._write(RuntimeError("unknown command"))
+
+
+def _encode(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RuntimeError):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return value.encode() + b"\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(v) for v in value)
+
+
+@pytest.fixture
+def redis_url():
+    server = StandInRedis().start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.stop()
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_memory_backend_namespaces_are_isolated():
+    c = make_cache("memory://", {"booking": (8, 30)})
+    assert isinstance(c, InProcessBackend)
+    c.set("booking", ("ref", "RC-1"), {"success": True})
+    c.set("fleet", "suv", [1, 2])
+    c.delete("fleet", "suv")
+    assert c.get("booking", ("ref", "RC-1")) == {"success": True}
+    assert c.get("fleet", "suv") is None
+
+
+def test_redis_backend_shares_values_and_invalidates_across_workers(redis_url):
+    worker_a = make_cache(redis_url, {"booking": (8, 30)})
+    worker_b = make_cache(redis_url, {"booking": (8, 30)})
+    assert isinstance(worker_a, RedisBackend)
+    try:
+        key = ("phone", "0300", None)
+        worker_a.set("booking", key, {"status": "booked"})
+        assert worker_b.get("booking", key) == {"status": "booked"}   # remote hit, now near-cached
+        assert worker_b.stats()["remoteHits"] == 1
+
+        worker_a.delete("booking", key)
+        assert _wait_for(lambda: worker_b.stats()["invalidationsReceived"] == 1)
+        assert worker_b.get("booking", key) is None
+
+        worker_a.set("fleet", "suv", [{"id": 3}])
+        assert worker_b.get("fleet", "suv") == [{"id": 3}]
+        worker_a.clear("fleet")
+        assert _wait_for(lambda: worker_b.get("fleet", "suv") is None)
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_redis_backend_relays_events_to_other_workers(redis_url):
+    worker_a = make_cache(redis_url)
+    worker_b = make_cache(redis_url)
+    received_a, received_b = [], []
+    worker_a.on_event(received_a.append)
+    worker_b.on_event(received_b.append)
+    try:
+        worker_a.publish_event({"type": "booking.cancelled", "data": {"id": 7}})
+        assert _wait_for(lambda: received_b == [{"type": "booking.cancelled", "data": {"id": 7}}])
+        assert received_a == []  # the publisher delivers locally on its own
+        assert worker_b.stats()["invalidationsReceived"] == 0
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_connection_is_dropped_after_a_timeout_so_replies_never_desync():
+    server = StandInRedis().start()
+    try:
+        conn = RespConnection("127.0.0.1", server.server_address[1], timeout=0.2, retry_after=0)
+        with pytest.raises(OSError):
+            conn.execute("DEBUG", "SLEEP", "0.5")
+        # The late "+OK" went to the old socket, not to these commands.
+        assert conn.execute("SET", "k", "v") == "OK"
+        assert conn.execute("GET", "k") == b"v"
+        conn.close()
+    finally:
+        server.stop()
+
+
+def test_redis_outage_degrades_to_near_cache_and_recovers():
+    server = StandInRedis().start()
+    port = server.server_address[1]
+    worker = make_cache(f"redis://127.0.0.1:{port}/0", {"booking": (8, 30)})
+    worker._conn.retry_after = 0
+    try:
+        server.stop()
+        assert worker.get("booking", "missing") is None
+        worker.set("booking", "k", {"v": 1})          # near cache only; no exception
+        assert worker.get("booking", "k") == {"v": 1}
+        worker.delete("booking", "k")
+        worker.clear()
+        assert worker.stats()["remoteErrors"] >= 4
+
+        server = StandInRedis(port).start()
+        worker.set("booking", "k", {"v": 2})
+        other = make_cache(f"redis://127.0.0.1:{port}/0", {"booking": (8, 30)})
+        try:
+            assert other.get("booking", "k") == {"v": 2}
+        finally:
+            other.close()
+    finally:
+        worker.close()
+        server.stop()
+
+
+def test_redis_backend_starts_degraded_when_the_server_is_down():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    worker = make_cache(f"redis://127.0.0.1:{port}/0", {"booking": (8, 30)})
+    try:
+        assert worker.get("booking", "k") is None
+        worker.set("booking", "k", {"v": 1})
+        assert worker.get("booking", "k") == {"v": 1}
+        assert worker.stats()["remoteErrors"] >= 1
+    finally:
+        worker.close()
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+
+def _book(client, **overrides):
+    payload = {
+        "fullName": "Context Caller",
+        "phoneNumber": "03211234567",
+        "pickupLocation": "Airport",
+        "dropoffLocation": "Clifton",
+        "carCategory": "SUV",
+        "pickupDateTime": "2026-07-01 10:00",
+        "returnDateTime": "2026-07-01 12:00",
+    }
+    payload.update(overrides)
+    r = client.post("/api/create-booking", json=payload)
+    assert r.json()["success"] is True
+    return r.json()
+
+
+def test_unknown_caller_gets_availability_only(client):
+    r = client.post("/api/caller-context", json={"phoneNumber": "00000000"})
+    d = r.json()
+    assert d["success"] is True
+    assert d["knownCaller"] is False
+    assert d["upcomingBookings"] == [] and d["recentBookings"] == []
+    by_cat = {a["category"]: a for a in d["availability"]}
+    assert by_cat["SUV"] == {"category": "SUV", "availableCount": 2, "totalCount": 2}
+    assert by_cat["Sedan"]["availableCount"] == 2
+
+
+def test_returning_caller_context(client):
+    future = datetime.utcnow() + timedelta(days=3)
+    past = datetime.utcnow() - timedelta(days=30)
+    _book(client, pickupDateTime=past.strftime("%Y-%m-%d %H:%M"),
+          returnDateTime=(past + timedelta(hours=4)).strftime("%Y-%m-%d %H:%M"))
+    ref = _book(client, pickupDateTime=future.strftime("%Y-%m-%d %H:%M"),
+                returnDateTime=(future + timedelta(hours=4)).strftime("%Y-%m-%d %H:%M"),
+                pickupLocation="Gulshan")["bookingReference"]
+
+    r = client.post("/api/caller-context", json={
+        "phoneNumber": "03211234567",
+        "pickupDateTime": (future + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M"),
+        "returnDateTime": (future + timedelta(hours=2)).strftime("%Y-%m-%d %H:%M"),
+    })
+    d = r.json()
+    assert d["knownCaller"] is True
+    assert d["customerName"] == "Context Caller"
+    assert [b["bookingReference"] for b in d["upcomingBookings"]] == [ref]
+    assert len(d["recentBookings"]) == 1
+    assert d["preferences"] == {"carCategory": "SUV", "pickupLocation": "Gulshan", "dropoffLocation": "Clifton"}
+    # The upcoming booking holds one of the two SUVs during the requested window.
+    by_cat = {a["category"]: a for a in d["availability"]}
+    assert by_cat["SUV"]["availableCount"] == 1
+
+
+def test_check_availability_matches_create_assignment(client):
+    first = _book(client)
+    second = _book(client, phoneNumber="03009999999")
+    assert first["assignedCar"]["id"] != second["assignedCar"]["id"]
+
+    r = client.post("/api/check-availability", json={
+        "pickupDateTime": "2026-07-01 11:00",
+        "returnDateTime": "2026-07-01 11:30",
+        "carCategory": "suv",
+    })
+    assert r.json()["available"] is False
+
+    r = client.post("/api/create-booking", json={
+        "fullName": "Third", "phoneNumber": "1", "pickupLocation": "A", "dropoffLocation": "B",
+        "carCategory": "SUV", "pickupDateTime": "2026-07-01 11:30", "returnDateTime": "2026-07-01 12:30",
+    })
+    assert r.json()["error"] == "NO_AVAILABILITY"
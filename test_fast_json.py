@@ -0,0 +1,42 @@
+import json
+
+import fast_json
+import main
+
+BOOKING = {
+    "fullName": "Fast Caller", "phoneNumber": "03001112233", "pickupLocation": "A", "dropoffLocation": "B",
+    "carCategory": "Sedan", "pickupDateTime": "2026-09-05 10:00", "returnDateTime": "2026-09-05 12:00",
+}
+ADMIN = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+
+
+def _validated(model_cls, data):
+    return model_cls.model_validate(data).model_dump(mode="json", by_alias=True)
+
+
+def test_model_response_matches_validated_shape():
+    data = {
+        "success": True, "message": "ok", "bookingReference": "RC-1",
+        "assignedCar": {"id": 1, "plateNumber": "P-1", "name": "Car", "category": "SUV"},
+        "notAField": "dropped",
+    }
+    body = json.loads(fast_json.model_response(main.BookingResponse, data).body)
+    assert body == _validated(main.BookingResponse, data)
+    assert list(body) == list(_validated(main.BookingResponse, data))
+
+
+def test_endpoints_keep_their_response_shape(client):
+    created = client.post("/api/create-booking", json=BOOKING)
+    assert created.headers["content-type"] == "application/json"
+    assert created.json() == _validated(main.BookingResponse, created.json())
+    assert created.json()["error"] is None
+
+    listed = client.get("/api/get-all-bookings", headers=ADMIN).json()
+    assert listed == _validated(main.AllBookingsResponse, listed)
+    assert listed["bookings"][0]["bookingReference"] == created.json()["bookingReference"]
+
+
+def test_stdlib_fallback_encodes_models(monkeypatch):
+    monkeypatch.setattr(fast_json, "orjson", None)
+    car = main.CarInfo(id=1, plate_number="P-1", name="Car", category="SUV")
+    assert json.loads(fast_json.dumps({"car": car})) == {"car": {"id": 1, "plateNumber": "P-1", "name": "Car", "category": "SUV"}}
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+import generate_data
+
+
+def test_generated_history_is_consistent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'gen.db'}")
+    stats = generate_data.generate(cars=40, bookings=4000, seed=7, start=datetime(2026, 1, 1), batch_size=500, engine=engine)
+    assert stats["bookings"] == 4000
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM cars")).scalar() == 40
+        assert conn.execute(text("SELECT COUNT(*) FROM bookings")).scalar() == 4000
+        # No two bookings on one car overlap, cancelled or not.
+        overlaps = conn.execute(text("""
+            SELECT COUNT(*) FROM bookings a JOIN bookings b
+              ON a.assigned_car_id = b.assigned_car_id AND a.id < b.id
+             AND a.pickup_date_time < b.return_date_time AND a.return_date_time > b.pickup_date_time
+        """)).scalar()
+        assert overlaps == 0
+        # Indexes dropped for the load are back.
+        indexes = {r[0] for r in conn.execute(text("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='bookings'"))}
+        assert {"idx_booking_status", "idx_booking_pickup_dt"} <= indexes
+        assert conn.execute(text("SELECT COUNT(DISTINCT booking_reference) FROM bookings")).scalar() == 4000
+        # Rows read back through the ORM's DateTime type.
+        cancelled = conn.execute(text("SELECT COUNT(*) FROM bookings WHERE status = 'cancelled'")).scalar()
+        assert 200 < cancelled < 600
+
+    import database
+    from sqlalchemy.orm import Session
+    with Session(engine) as db:
+        b = db.query(database.Booking).first()
+        assert isinstance(b.pickup_date_time, datetime) and b.return_date_time > b.pickup_date_time
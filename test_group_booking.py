@@ -0,0 +1,112 @@
+from datetime import datetime
+
+import database
+
+GROUP = {
+    "fullName": "Acme Corp", "phoneNumber": "021 111 2222", "pickupLocation": "Head Office", "dropoffLocation": "Head Office",
+    "pickupDateTime": "2026-12-15 09:00", "returnDateTime": "2026-12-17 18:00",
+    "cars": [{"carCategory": "SUV", "quantity": 2}, {"carCategory": "sedan", "quantity": 1}],
+}
+
+
+def _bookings():
+    db = database.SessionLocal()
+    try:
+        return db.query(database.Booking).order_by(database.Booking.booking_reference).all()
+    finally:
+        db.close()
+
+
+def test_group_booking_is_one_insert_one_commit_and_a_reference_block(client, query_counter, monkeypatch):
+    import main
+
+    synced = []
+    monkeypatch.setattr(main, "safe_calendar_sync_batch", lambda ids, traceparent=None: synced.append(list(ids)))
+    client.post("/api/create-booking", json={
+        "fullName": "Solo", "phoneNumber": "0300 999 0000", "pickupLocation": "A", "dropoffLocation": "B",
+        "carCategory": "Economy", "pickupDateTime": "2026-12-01 10:00", "returnDateTime": "2026-12-01 12:00"})
+
+    main.app_cache.clear()
+    with query_counter() as q:
+        r = client.post("/api/create-group-booking", json=GROUP).json()
+    assert r["success"] is True, r
+    inserts = [s for s in q.statements if s.lstrip().upper().startswith("INSERT")]
+    assert len(inserts) == 1, q.report()
+
+    refs = [b["bookingReference"] for b in r["bookings"]]
+    seqs = [int(ref.rsplit("-", 1)[1]) for ref in refs]
+    assert seqs == [2, 3, 4]
+    assert sorted(b["assignedCar"]["id"] for b in r["bookings"]) == [1, 3, 4]
+    assert {b["carCategory"] for b in r["bookings"]} == {"SUV", "Sedan"}
+
+    rows = _bookings()
+    assert len(rows) == 4 and all(b.status == "booked" for b in rows[1:])
+    assert synced == [[b.id for b in rows[1:]]]
+
+
+def test_group_booking_is_all_or_nothing(client):
+    too_many = dict(GROUP, cars=[{"carCategory": "SUV", "quantity": 3}, {"carCategory": "Sedan", "quantity": 1}])
+    r = client.post("/api/create-group-booking", json=too_many).json()
+    assert r["success"] is False and r["error"] == "NO_AVAILABILITY"
+    assert r["shortfall"] == {"SUV": 1}
+    assert _bookings() == []
+
+    assert client.post("/api/create-group-booking", json=GROUP).json()["success"] is True
+    # The same window is now full for SUVs.
+    again = client.post("/api/create-group-booking", json=dict(GROUP, cars=[{"carCategory": "SUV", "quantity": 1}])).json()
+    assert again["shortfall"] == {"SUV": 1}
+
+
+def test_group_booking_limits_and_idempotency(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "GROUP_BOOKING_MAX_CARS", 2)
+    assert client.post("/api/create-group-booking", json=GROUP).json()["error"] == "VALIDATION_ERROR"
+    monkeypatch.setattr(main, "GROUP_BOOKING_MAX_CARS", 50)
+
+    headers = {"Idempotency-Key": "acme-offsite"}
+    first = client.post("/api/create-group-booking", json=GROUP, headers=headers)
+    again = client.post("/api/create-group-booking", json=GROUP, headers=headers)
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.json() == first.json()
+    assert len(_bookings()) == 3
+
+
+def test_cancelling_a_member_drops_the_group_replay(client):
+    import main
+
+    headers = {"Idempotency-Key": "acme-retreat"}
+    first = client.post("/api/create-group-booking", json=GROUP, headers=headers).json()
+    assert client.post("/api/cancel-booking", json={"phoneNumber": GROUP["phoneNumber"]}).json()["success"] is True
+
+    again = client.post("/api/create-group-booking", json=GROUP, headers=headers)
+    assert "idempotent-replayed" not in again.headers
+    # A fresh attempt: the two members still booked leave the fleet short.
+    assert again.json()["success"] is False and again.json()["error"] == "NO_AVAILABILITY"
+    for member in first["bookings"]:
+        assert main.app_cache.get("idempotency", f"booking:{member['bookingReference']}") is None
+
+
+def test_stale_snapshot_rolls_back_the_whole_group(client, monkeypatch):
+    import main
+
+    solo = client.post("/api/create-booking", json={
+        "fullName": "Solo", "phoneNumber": "0300 999 0000", "pickupLocation": "A", "dropoffLocation": "B",
+        "carCategory": "SUV", "pickupDateTime": "2026-12-16 10:00", "returnDateTime": "2026-12-16 12:00"}).json()
+    taken = solo["assignedCar"]["id"]
+
+    # The first snapshot predates the solo booking; the retry sees the truth.
+    real = main.assignable_cars_by_category
+    calls = []
+
+    def stale_once(db, categories, pickup_dt, return_dt):
+        calls.append(1)
+        if len(calls) == 1:
+            return {cat: main.category_fleet(db, cat) for cat in categories}
+        return real(db, categories, pickup_dt, return_dt)
+
+    monkeypatch.setattr(main, "assignable_cars_by_category", stale_once)
+    r = client.post("/api/create-group-booking", json=GROUP).json()
+    assert len(calls) == 2
+    assert r["shortfall"] == {"SUV": 1}
+    assert [b.assigned_car_id for b in _bookings()] == [taken]
@@ -0,0 +1,89 @@
+import time
+
+import database
+import main
+
+WINDOW = {"carCategory": "SUV", "pickupDateTime": "2026-12-05 10:00", "returnDateTime": "2026-12-05 14:00"}
+BOOKING = dict(WINDOW, fullName="Hold Caller", phoneNumber="0300 765 4321", pickupLocation="Airport", dropoffLocation="Home")
+
+
+def _holds():
+    db = database.SessionLocal()
+    try:
+        return db.query(database.CarHold).count()
+    finally:
+        db.close()
+
+
+def _available(client):
+    return client.post("/api/check-availability", json=WINDOW).json()["availableCount"]
+
+
+def test_hold_blocks_availability_and_converts_to_booking(client):
+    assert _available(client) == 2
+    held = client.post("/api/holds", json=dict(WINDOW, carId=4)).json()
+    assert held["success"] is True and held["assignedCar"]["id"] == 4
+    assert _available(client) == 1
+
+    # Someone else booking the same window gets the other SUV.
+    other = client.post("/api/create-booking", json=dict(BOOKING, phoneNumber="0311 000 0000")).json()
+    assert other["assignedCar"]["id"] == 3
+
+    booked = client.post("/api/create-booking", json=dict(BOOKING, holdId=held["holdId"])).json()
+    assert booked["success"] is True and booked["assignedCar"]["id"] == 4
+    assert _holds() == 0
+    assert _available(client) == 0
+
+
+def test_hold_expires_through_timer(client):
+    held = client.post("/api/holds", json=dict(WINDOW, ttlSeconds=1)).json()
+    assert _available(client) == 1
+    deadline = time.time() + 5
+    while _holds() and time.time() < deadline:
+        time.sleep(0.05)
+    assert _holds() == 0
+    assert _available(client) == 2
+    # An expired hold no longer pins a car; the booking falls back to normal assignment.
+    booked = client.post("/api/create-booking", json=dict(BOOKING, holdId=held["holdId"])).json()
+    assert booked["success"] is True
+
+
+def test_release_hold(client):
+    held = client.post("/api/holds", json=WINDOW).json()
+    assert client.delete(f"/api/holds/{held['holdId']}").json()["success"] is True
+    assert _available(client) == 2
+    assert client.delete(f"/api/holds/{held['holdId']}").json()["error"] == "NOT_FOUND"
+
+
+def test_no_hold_when_fleet_is_busy(client):
+    for car_id in (3, 4):
+        assert client.post("/api/holds", json=dict(WINDOW, carId=car_id)).json()["success"] is True
+    assert client.post("/api/holds", json=WINDOW).json()["error"] == "NO_AVAILABILITY"
+    assert main.hold_timer.pending() >= 2
+
+
+def test_caller_context_availability_counts_holds(client):
+    def suv_free():
+        ctx = client.post("/api/caller-context", json={
+            "phoneNumber": "0300 555 0000", "pickupDateTime": WINDOW["pickupDateTime"], "returnDateTime": WINDOW["returnDateTime"],
+        }).json()
+        return next(c["availableCount"] for c in ctx["availability"] if c["category"] == "SUV")
+
+    assert suv_free() == 2
+    client.post("/api/holds", json=dict(WINDOW, carId=4))
+    assert suv_free() == 1 == _available(client)
+
+
+def test_concurrent_bookings_and_holds_never_share_a_car(client):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def attempt(i):
+        if i % 3 == 2:
+            r = client.post("/api/holds", json=dict(WINDOW, phoneNumber=f"0300 000 00{i:02d}")).json()
+        else:
+            r = client.post("/api/create-booking", json=dict(BOOKING, phoneNumber=f"0300 000 00{i:02d}")).json()
+        return r["assignedCar"]["id"] if r.get("success") else None
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        cars = [c for c in pool.map(attempt, range(12)) if c is not None]
+    assert sorted(cars) == [3, 4]
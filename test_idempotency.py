@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+BOOKING = {
+    "fullName": "Retry Caller", "phoneNumber": "0300 123 4567", "pickupLocation": "Airport", "dropoffLocation": "Home",
+    "carCategory": "SUV", "pickupDateTime": "2026-12-01 10:00", "returnDateTime": "2026-12-01 12:00",
+}
+
+
+def _booking_count():
+    db = database.SessionLocal()
+    try:
+        return db.query(database.Booking).count()
+    finally:
+        db.close()
+
+
+def test_key_replay_returns_original_without_touching_the_db(client, query_counter):
+    headers = {"Idempotency-Key": "call-42-turn-3"}
+    first = client.post("/api/create-booking", json=BOOKING, headers=headers)
+    assert first.json()["success"] is True
+    assert "idempotent-replayed" not in first.headers
+
+    with query_counter() as q:
+        again = client.post("/api/create-booking", json=BOOKING, headers=headers)
+    assert q.count == 0, q.report()
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.json() == first.json()
+    assert _booking_count() == 1
+
+    changed = dict(BOOKING, carCategory="Sedan")
+    assert client.post("/api/create-booking", json=changed, headers=headers).status_code == 422
+
+
+def test_payload_fingerprint_absorbs_retries_without_a_key(client):
+    first = client.post("/api/create-booking", json=BOOKING).json()
+    # Cosmetic differences normalize to the same booking.
+    retry = dict(BOOKING, fullName="  retry   CALLER ", phoneNumber="03001234567", carCategory="suv")
+    assert client.post("/api/create-booking", json=retry).json()["bookingReference"] == first["bookingReference"]
+    other = dict(BOOKING, pickupDateTime="2026-12-02 10:00", returnDateTime="2026-12-02 12:00")
+    assert client.post("/api/create-booking", json=other).json()["bookingReference"] != first["bookingReference"]
+    assert _booking_count() == 2
+
+
+def test_failures_are_not_replayed(client):
+    bad = dict(BOOKING, returnDateTime="2026-12-01 09:00")
+    assert client.post("/api/create-booking", json=bad, headers={"Idempotency-Key": "k"}).json()["success"] is False
+    fixed = dict(bad, returnDateTime="2026-12-01 12:00")
+    # Same key, different payload, but nothing was stored for the failed attempt.
+    assert client.post("/api/create-booking", json=fixed, headers={"Idempotency-Key": "k"}).json()["success"] is True
+
+
+def test_concurrent_duplicates_create_one_booking(client):
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda _: client.post("/api/create-booking", json=BOOKING).json(), range(6)))
+    assert len({r["bookingReference"] for r in results}) == 1
+    assert _booking_count() == 1
+
+
+def test_cancelled_booking_is_not_replayed(client):
+    for headers in ({}, {"Idempotency-Key": "call-7-turn-2"}):
+        first = client.post("/api/create-booking", json=BOOKING, headers=headers).json()
+        assert client.post("/api/cancel-booking", json={"phoneNumber": BOOKING["phoneNumber"]}).json()["success"] is True
+        again = client.post("/api/create-booking", json=BOOKING, headers=headers)
+        assert "idempotent-replayed" not in again.headers
+        assert again.json()["success"] is True and again.json()["bookingReference"] != first["bookingReference"]
+        client.post("/api/cancel-booking", json={"phoneNumber": BOOKING["phoneNumber"]})
+
+
+def test_idempotency_slot_only_serializes_the_same_key():
+    import threading
+    import main
+
+    with main.idempotency_slot("key:a"):
+        def enter_other():
+            with main.idempotency_slot("key:b"):
+                pass
+
+        other = threading.Thread(target=enter_other)
+        other.start()
+        other.join(timeout=1)
+        assert not other.is_alive()  # a different key is not held up
+
+        same = threading.Event()
+
+        def wait_same():
+            with main.idempotency_slot("key:a"):
+                same.set()
+
+        t = threading.Thread(target=wait_same)
+        t.start()
+        assert not same.wait(0.2)
+    t.join(timeout=1)
+    assert same.is_set()
+    assert main.IDEMPOTENCY_IN_FLIGHT == {}
@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import random
+
+import httpx
+
+import load_test
+
+
+def test_flows_run_in_process_without_double_bookings(client):
+    import main
+
+    async def run():
+        stats = load_test.Stats()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            rnd = random.Random(3)
+            flows = list(load_test.FLOWS)
+            sessions = [
+                load_test.run_session(http, stats, random.Random(rnd.random()), load_test.FLOWS,
+                                      [1.0 if f == name else 0.0 for f in flows], 0)
+                for name in flows for _ in range(4)
+            ]
+            await asyncio.gather(*sessions)
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats.failures == []
+    assert sum(v["ok"] for v in stats.flows.values()) == 12
+    report = load_test.build_report(argparse.Namespace(), stats, 1.0, load_test.find_double_bookings())
+    assert report["double_bookings"]["count"] == 0
+    assert report["steps"]["create_booking"]["requests"] > 0
+
+
+def test_recorded_flow_substitutes_session_vars():
+    calls = []
+
+    class FakeSession:
+        vars = {"phone": "0300", "ref": ""}
+
+        async def call(self, step, method, path, **kwargs):
+            calls.append((step, kwargs["json"]))
+            return {"bookingReference": "RC-1"} if step == "create_booking" else {"success": True}
+
+    flow = load_test.recorded_flow([
+        {"path": "/api/create-booking", "json": {"phoneNumber": "{phone}"}},
+        {"path": "/api/get-booking", "json": {"bookingReference": "{ref}"}},
+    ])
+    asyncio.run(flow(FakeSession()))
+    assert calls == [("create_booking", {"phoneNumber": "0300"}), ("get_booking", {"bookingReference": "RC-1"})]
@@ -0,0 +1,35 @@
+import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram("t_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    h.observe(0.05, "/a")
+    h.observe(0.5, "/a")
+    h.observe(5.0, "/a")
+    text = "\n".join(h.render())
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 't_seconds_count{route="/a"} 3' in text
+
+
+def test_metrics_endpoint_reports_routes_and_db_queries(client):
+    client.post("/api/check-availability", json={
+        "pickupDateTime": "2026-09-01 10:00", "returnDateTime": "2026-09-01 12:00", "carCategory": "SUV",
+    })
+    client.post("/api/create-booking", json={
+        "fullName": "Metrics Caller", "phoneNumber": "0300", "pickupLocation": "A", "dropoffLocation": "B",
+        "carCategory": "SUV", "pickupDateTime": "2026-09-01 10:00", "returnDateTime": "2026-09-01 12:00",
+    })
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'rentacar_http_requests_total{method="POST",route="/api/check-availability",status="200"}' in body
+    assert 'rentacar_http_request_duration_seconds_count{method="POST",route="/api/create-booking"}' in body
+    assert 'rentacar_db_queries_per_request_count{route="/api/create-booking"}' in body
+    assert "rentacar_http_requests_in_flight" in body
+    assert 'rentacar_calendar_sync_duration_seconds_count{outcome="skipped"}' in body
+    # The scrape itself is not measured.
+    assert 'route="/metrics"' not in body
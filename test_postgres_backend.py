@@ -0,0 +1,181 @@
+"""Runs only when TEST_POSTGRES_URL points at a local PostgreSQL, e.g.
+
+    TEST_POSTGRES_URL=postgresql://postgres@localhost/rentacar_test pytest test_postgres_backend.py
+"""
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+import database
+
+PG_URL = os.getenv("TEST_POSTGRES_URL")
+pytestmark = pytest.mark.skipif(not PG_URL, reason="TEST_POSTGRES_URL not set")
+
+
+@pytest.fixture
+def pg(monkeypatch, tmp_path):
+    original_engine = database.engine
+    pg_engine = create_engine(PG_URL)
+    monkeypatch.setattr(database, "engine", pg_engine)
+    monkeypatch.setattr(database, "MIGRATION_LOCK_PATH", str(tmp_path / "migrate.lock"))
+    database.SessionLocal.configure(bind=pg_engine)
+    database.Base.metadata.drop_all(bind=pg_engine)
+    database.init_db()
+
+    db = database.SessionLocal()
+    db.add_all([
+        database.Car(name="Toyota Prado", category="SUV", status="available"),
+        database.Car(name="Kia Sportage", category="SUV", status="available"),
+    ])
+    db.commit()
+    db.close()
+
+    yield pg_engine
+
+    database.SessionLocal.configure(bind=original_engine)
+    pg_engine.dispose()
+
+
+def _booking(car_id, start, end, status="booked"):
+    return database.Booking(
+        full_name="PG Tester", phone_number="0300", pickup_location="A", dropoff_location="B",
+        car_category="SUV", pickup_date_time=start, return_date_time=end,
+        assigned_car_id=car_id, status=status,
+    )
+
+
+def test_exclusion_constraint_rejects_overlap_on_same_car(pg):
+    db = database.SessionLocal()
+    try:
+        db.add(_booking(1, datetime(2026, 7, 1, 10), datetime(2026, 7, 1, 12)))
+        db.commit()
+
+        # Back-to-back windows and other cars are fine; cancelled rows never block.
+        db.add_all([
+            _booking(1, datetime(2026, 7, 1, 12), datetime(2026, 7, 1, 14)),
+            _booking(2, datetime(2026, 7, 1, 11), datetime(2026, 7, 1, 13)),
+            _booking(1, datetime(2026, 7, 1, 11), datetime(2026, 7, 1, 13), status="cancelled"),
+        ])
+        db.commit()
+
+        db.add(_booking(1, datetime(2026, 7, 1, 11), datetime(2026, 7, 1, 11, 30)))
+        with pytest.raises(IntegrityError) as exc:
+            db.commit()
+        assert database.is_overlap_violation(exc.value)
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_api_availability_uses_range_overlap(pg):
+    from fastapi.testclient import TestClient
+    import main
+
+    main.app_cache.clear()
+    with TestClient(main.app) as client:
+        payload = {
+            "fullName": "PG Caller", "phoneNumber": "0300", "pickupLocation": "A", "dropoffLocation": "B",
+            "carCategory": "SUV", "pickupDateTime": "2026-07-01 10:00", "returnDateTime": "2026-07-01 12:00",
+        }
+        # Distinct callers: an identical payload would be replayed as an idempotent retry.
+        ids = {
+            client.post("/api/create-booking", json=dict(payload, phoneNumber=f"030{i}")).json()["assignedCar"]["id"]
+            for i in range(2)
+        }
+        assert ids == {1, 2}
+        assert client.post("/api/create-booking", json=dict(payload, phoneNumber="0302")).json()["error"] == "NO_AVAILABILITY"
+
+        window = {"pickupDateTime": "2026-07-01 11:00", "returnDateTime": "2026-07-01 11:30", "carCategory": "SUV"}
+        assert client.post("/api/check-availability", json=window).json()["availableCount"] == 0
+
+    with pg.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN SELECT 1 FROM bookings WHERE booking_window && tsrange('2026-07-01 11:00', '2026-07-01 11:30')"
+        )).fetchall()
+    assert plan  # the && predicate is valid SQL against the generated column
+
+
+def test_group_booking_conflict_rolls_back_atomically(pg, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    main.app_cache.clear()
+    db = database.SessionLocal()
+    db.add(_booking(1, datetime(2026, 7, 2, 10), datetime(2026, 7, 2, 12)))
+    db.commit()
+    db.close()
+
+    real = main.assignable_cars_by_category
+    calls = []
+
+    def stale_once(db, categories, pickup_dt, return_dt):
+        calls.append(1)
+        if len(calls) == 1:
+            return {cat: main.category_fleet(db, cat) for cat in categories}
+        return real(db, categories, pickup_dt, return_dt)
+
+    monkeypatch.setattr(main, "assignable_cars_by_category", stale_once)
+    group = {
+        "fullName": "PG Corp", "phoneNumber": "0300", "pickupLocation": "A", "dropoffLocation": "B",
+        "pickupDateTime": "2026-07-02 09:00", "returnDateTime": "2026-07-02 18:00",
+        "cars": [{"carCategory": "SUV", "quantity": 2}],
+    }
+    with TestClient(main.app) as client:
+        r = client.post("/api/create-group-booking", json=group).json()
+        # The exclusion constraint rejected the stale snapshot; the retry saw one free SUV.
+        assert r["shortfall"] == {"SUV": 1}
+        one = client.post("/api/create-group-booking", json=dict(group, cars=[{"carCategory": "SUV", "quantity": 1}])).json()
+        assert one["success"] is True and one["bookings"][0]["assignedCar"]["id"] == 2
+
+    db = database.SessionLocal()
+    try:
+        assert db.query(database.Booking).count() == 2
+    finally:
+        db.close()
+
+
+def test_archive_moves_locked_chunks_and_history_view_unions(pg):
+    import archive
+
+    db = database.SessionLocal()
+    try:
+        db.add_all([_booking(1, datetime(2024, 1, d, 10), datetime(2024, 1, d, 12)) for d in range(1, 6)])
+        db.add(_booking(1, datetime(2027, 1, 1, 10), datetime(2027, 1, 1, 12)))
+        db.commit()
+    finally:
+        db.close()
+
+    stats = archive.archive_bookings(365, chunk_rows=2, now=datetime(2026, 1, 1))
+    assert (stats["archived"], stats["chunks"], stats["remaining"]) == (5, 3, False)
+    with pg.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM bookings")).scalar_one() == 1
+        history = database.booking_history()
+        assert len(conn.execute(history.select()).all()) == 6
+
+
+def test_holds_and_bookings_never_share_a_car(pg):
+    from concurrent.futures import ThreadPoolExecutor
+    from fastapi.testclient import TestClient
+    import main
+
+    main.app_cache.clear()
+    main.availability_engine.mark_stale()
+    window = {"carCategory": "SUV", "pickupDateTime": "2027-08-01 10:00", "returnDateTime": "2027-08-01 14:00"}
+    booking = dict(window, fullName="PG Racer", pickupLocation="A", dropoffLocation="B")
+
+    with TestClient(main.app) as client:
+        def attempt(i):
+            phone = f"0300 000 00{i:02d}"
+            if i % 2:
+                r = client.post("/api/holds", json=dict(window, phoneNumber=phone)).json()
+            else:
+                r = client.post("/api/create-booking", json=dict(booking, phoneNumber=phone)).json()
+            return r["assignedCar"]["id"] if r.get("success") else None
+
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            cars = [c for c in pool.map(attempt, range(12)) if c is not None]
+    # The exclusion constraint alone would let holds overlap each other and bookings.
+    assert sorted(cars) == [1, 2]
@@ -0,0 +1,46 @@
+import marshal
+
+import profiling
+
+ADMIN = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+AVAILABILITY = {"pickupDateTime": "2026-09-01 10:00", "returnDateTime": "2026-09-01 12:00", "carCategory": "SUV"}
+
+
+def test_unprofiled_requests_carry_no_profile_id(client):
+    r = client.post("/api/check-availability", json=AVAILABILITY)
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    # Header trigger needs the admin key.
+    r = client.post("/api/check-availability", json=AVAILABILITY, headers={"X-Profile": "1"})
+    assert "x-profile-id" not in r.headers
+
+
+def test_header_triggered_profile_is_downloadable(client):
+    r = client.post("/api/check-availability", json=AVAILABILITY, headers={"X-Profile": "1", **ADMIN})
+    assert r.status_code == 200
+    assert r.json()["available"] is True
+    profile_id = r.headers["x-profile-id"]
+
+    listing = client.get("/api/admin/profiles", headers=ADMIN).json()["profiles"]
+    entry = next(p for p in listing if p["id"] == profile_id)
+    assert entry["path"] == "/api/check-availability"
+    assert entry["trigger"] == "header"
+    assert entry["captured"] is True
+
+    raw = client.get(f"/api/admin/profiles/{profile_id}", headers=ADMIN)
+    assert raw.status_code == 200
+    stats = marshal.loads(raw.content)
+    assert any(func[2] == "check_availability" for func in stats)
+
+    text = client.get(f"/api/admin/profiles/{profile_id}?format=text", headers=ADMIN).text
+    assert "find_available_cars" in text
+
+    assert client.get("/api/admin/profiles", headers={"X-Admin-Key": "nope"}).status_code == 401
+    assert client.get("/api/admin/profiles/missing", headers=ADMIN).status_code == 404
+
+
+def test_store_is_bounded():
+    store = profiling.ProfileStore(keep=2)
+    ids = [store.new("GET", "/x", "sample").id for _ in range(3)]
+    assert store.get(ids[0]) is None
+    assert [p["id"] for p in store.list()] == [ids[2], ids[1]]
@@ -0,0 +1,91 @@
+"""Per-endpoint SQL budgets. A budget must hold for any fleet/booking volume,
+so each endpoint is measured against a small and a large fleet."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+
+ADMIN_HEADERS = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+
+BUDGETS = {
+    "create_booking": 6,  # includes the row_versions counter bump and the SQLite post-insert overlap check
+    "check_availability": 2,
+    "get_booking": 1,
+    "cancel_booking": 3,
+    "caller_context": 2,
+    "get_all_bookings": 2,
+    "export_bookings": 1,
+    "admin_analytics": 6,
+}
+
+BOOKING = {
+    "fullName": "Budget Caller",
+    "phoneNumber": "03005550000",
+    "pickupLocation": "Airport",
+    "dropoffLocation": "Home",
+    "carCategory": "SUV",
+    "pickupDateTime": "2027-03-01 10:00",
+    "returnDateTime": "2027-03-01 12:00",
+}
+
+
+def _grow_fleet(extra_cars: int):
+    """Add SUVs that are each busy during BOOKING's window, so assignment has to skip them all."""
+    db = database.SessionLocal()
+    start = datetime(2027, 3, 1, 9)
+    cars = [database.Car(name=f"Busy SUV {i}", category="SUV", status="available") for i in range(extra_cars)]
+    db.add_all(cars)
+    db.flush()
+    db.add_all([
+        database.Booking(
+            booking_reference=f"RC-BUSY-{c.id}", full_name="Other", phone_number="1",
+            pickup_location="X", dropoff_location="Y", car_category="SUV",
+            pickup_date_time=start, return_date_time=start + timedelta(hours=5),
+            assigned_car_id=c.id, status="booked",
+        )
+        for c in cars
+    ])
+    db.commit()
+    db.close()
+
+
+@pytest.mark.parametrize("extra_cars", [0, 150])
+def test_endpoint_query_budgets(client, query_counter, monkeypatch, extra_cars):
+    import main
+
+    # TestClient runs background tasks before returning; calendar sync is not the endpoint's cost.
+    monkeypatch.setattr(main, "safe_calendar_sync", lambda booking_id, traceparent=None: None)
+    _grow_fleet(extra_cars)
+    calls = [
+        ("create_booking", lambda: client.post("/api/create-booking", json=BOOKING)),
+        ("check_availability", lambda: client.post("/api/check-availability", json={
+            "pickupDateTime": BOOKING["pickupDateTime"], "returnDateTime": BOOKING["returnDateTime"], "carCategory": "SUV"})),
+        ("get_booking", lambda: client.post("/api/get-booking", json={"phoneNumber": BOOKING["phoneNumber"]})),
+        ("caller_context", lambda: client.post("/api/caller-context", json={"phoneNumber": BOOKING["phoneNumber"]})),
+        ("get_all_bookings", lambda: client.get("/api/get-all-bookings", headers=ADMIN_HEADERS)),
+        ("export_bookings", lambda: client.get("/api/admin/export-bookings", headers=ADMIN_HEADERS)),
+        ("admin_analytics", lambda: client.get("/api/admin/analytics", headers=ADMIN_HEADERS)),
+        ("cancel_booking", lambda: client.post("/api/cancel-booking", json={"phoneNumber": BOOKING["phoneNumber"]})),
+    ]
+    for name, call in calls:
+        # Cold caches: the budget covers the worst case, not a lucky cache hit.
+        main.app_cache.clear()
+        with query_counter() as q:
+            r = call()
+        assert r.status_code == 200, (name, r.text)
+        assert q.count <= BUDGETS[name], f"{name}: {q.report()}"
+        assert not q.repeated(threshold=3), f"{name} repeats statements (N+1?): {q.report()}"
+
+
+def test_assert_max_queries_reports_statements():
+    from query_guard import assert_max_queries
+    from sqlalchemy import text
+
+    with pytest.raises(AssertionError) as exc:
+        with assert_max_queries(1, "loop"):
+            with database.engine.connect() as conn:
+                for _ in range(3):
+                    conn.execute(text("SELECT 1"))
+    assert "loop exceeded its query budget (3 > 1)" in str(exc.value)
+    assert "repeated x3: SELECT 1" in str(exc.value)
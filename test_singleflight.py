@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import main
+from singleflight import SingleFlight
+
+ADMIN = {"X-Admin-Key": "RENTACAR_ELITE_2026"}
+WINDOW = {"pickupDateTime": "2026-11-20 10:00", "returnDateTime": "2026-11-20 14:00", "carCategory": "SUV"}
+
+
+def _wait_for_waiters(flight, key, n, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters >= n:
+                return
+        time.sleep(0.001)
+    raise AssertionError("followers never joined the flight")
+
+
+def test_followers_share_the_leaders_result_and_error():
+    flight = SingleFlight("test")
+    runs = []
+
+    def compute():
+        runs.append(1)
+        _wait_for_waiters(flight, "k", 3)
+        return ["value"]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: flight.do("k", compute), range(4)))
+    assert runs == [1]
+    assert all(r == ["value"] for r in results)
+    assert flight.stats()["leaders"] == 1 and flight.stats()["shared"] == 3
+
+    def boom():
+        _wait_for_waiters(flight, "e", 1)
+        raise ValueError("db down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(flight.do, "e", boom) for _ in range(2)]
+        for f in futures:
+            with pytest.raises(ValueError):
+                f.result()
+    # Nothing is cached once the flight lands.
+    assert flight.do("k", lambda: "fresh") == "fresh"
+
+
+def test_concurrent_identical_availability_checks_are_coalesced(client, monkeypatch):
+    real = main.find_available_cars
+    calls = []
+    key = ("SUV", "2026-11-20T10:00:00", "2026-11-20T14:00:00")
+
+    def slow_find(db, cat, p, r):
+        calls.append(cat)
+        _wait_for_waiters(main.availability_flight, key, 4)
+        return real(db, cat, p, r)
+
+    monkeypatch.setattr(main, "find_available_cars", slow_find)
+    before = main.availability_flight.stats()["shared"]
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        bodies = list(pool.map(lambda _: client.post("/api/check-availability", json=WINDOW).json(), range(5)))
+
+    assert len(calls) == 1
+    assert all(b == bodies[0] and b["availableCount"] == 2 for b in bodies)
+    stats = client.get("/api/admin/cache-stats", headers=ADMIN).json()["singleflight"]["availability"]
+    assert stats["shared"] - before == 4
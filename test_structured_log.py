@@ -0,0 +1,73 @@
+import io
+import json
+import logging
+import queue
+
+import main
+import structured_log
+
+
+def _capture_logger(name):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(structured_log.JsonFormatter())
+    log = logging.getLogger(name)
+    log.handlers[:] = [handler]
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log, stream
+
+
+def test_fields_are_json_and_pii_is_masked_with_main_helpers():
+    log, stream = _capture_logger("test.structured.redact")
+    structured_log.log_event(log, "payload_received", payload={
+        "fullName": "Ayesha Khan", "phoneNumber": "03001234567", "carCategory": "SUV",
+    })
+    doc = json.loads(stream.getvalue())
+    assert doc["event"] == "payload_received"
+    assert doc["payload"] == {
+        "fullName": main.mask_name("Ayesha Khan"),
+        "phoneNumber": main.mask_phone("03001234567"),
+        "carCategory": "SUV",
+    }
+
+
+def test_credentials_in_query_strings_are_masked():
+    log, stream = _capture_logger("test.structured.query")
+    log.info('%s - "%s %s HTTP/1.1" %d', "127.0.0.1", "GET", "/api/admin/booking-events?key=RENTACAR_ELITE_2026&x=1", 403)
+    structured_log.log_event(log, "request", url="/api/admin/booking-events?token=123.abc")
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert "RENTACAR_ELITE_2026" not in first["event"] and "?key=[REDACTED]&x=1" in first["event"]
+    assert second["url"] == "/api/admin/booking-events?token=[REDACTED]"
+
+
+def test_lazy_fields_only_built_when_emitted():
+    log, stream = _capture_logger("test.structured.lazy")
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return {"x": 1}
+
+    structured_log.log_event(log, "debug_only", level=logging.DEBUG, data=expensive)
+    structured_log.set_sample_rate("never_kept", 0.0)
+    structured_log.log_event(log, "never_kept", data=expensive)
+    assert calls == [] and stream.getvalue() == ""
+
+    structured_log.log_event(log, "kept", data=expensive)
+    assert calls == [1]
+    assert json.loads(stream.getvalue())["data"] == {"x": 1}
+
+
+def test_full_queue_drops_instead_of_blocking():
+    q = queue.Queue(maxsize=1)
+    handler = structured_log.DroppingQueueHandler(q)
+    log = logging.getLogger("test.structured.queue")
+    log.handlers[:] = [handler]
+    log.propagate = False
+    before = dict(structured_log.log_records_total._values)
+    log.warning("first")
+    log.warning("second")
+    assert q.qsize() == 1
+    dropped = structured_log.log_records_total._values.get(("dropped",), 0) - before.get(("dropped",), 0)
+    assert dropped == 1
@@ -0,0 +1,61 @@
+import calendar_service
+import tracing
+
+BOOKING = {
+    "fullName": "Trace Caller", "phoneNumber": "03009998877", "pickupLocation": "A", "dropoffLocation": "B",
+    "carCategory": "SUV", "pickupDateTime": "2026-09-03 10:00", "returnDateTime": "2026-09-03 12:00",
+}
+
+
+def test_booking_trace_covers_handler_sql_reference_and_calendar(client, monkeypatch):
+    monkeypatch.setenv("GOOGLE_CALENDAR_ID", "cal")
+    monkeypatch.setenv("GOOGLE_SERVICE_ACCOUNT_FILE", "sa.json")
+    monkeypatch.setattr(calendar_service, "get_calendar_service", lambda: None)
+    exporter = tracing.InMemoryExporter()
+    tracing.set_exporter(exporter)
+    try:
+        r = client.post("/api/create-booking", json=BOOKING)
+    finally:
+        tracing.set_exporter(None)
+    assert r.json()["success"] is True
+
+    server = exporter.by_name("POST /api/create-booking")[0]
+    assert server.kind == "SERVER" and server.parent_id is None
+    assert r.headers["traceparent"] == server.traceparent
+
+    handler = exporter.by_name("handler create_booking")[0]
+    assert handler.parent_id == server.span_id
+    ref = exporter.by_name("generate_elite_reference")[0]
+    assert ref.parent_id == handler.span_id
+    queries = exporter.by_name("db.query")
+    assert any(q.parent_id == ref.span_id for q in queries)
+    assert any(q.attributes["db.operation"] == "INSERT" for q in queries)
+
+    # The background task gets the handler's context passed explicitly.
+    sync = exporter.by_name("safe_calendar_sync")[0]
+    assert sync.parent_id == handler.span_id
+    assert sync.start_ns >= server.end_ns
+    cal = exporter.by_name("calendar_service.create_calendar_event")[0]
+    assert cal.parent_id == sync.span_id
+    assert {s.trace_id for s in exporter.spans} == {server.trace_id}
+
+
+def test_incoming_traceparent_is_continued(client):
+    exporter = tracing.InMemoryExporter()
+    tracing.set_exporter(exporter)
+    parent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    try:
+        client.post("/api/check-availability", headers={"traceparent": parent}, json={
+            "pickupDateTime": "2026-09-01 10:00", "returnDateTime": "2026-09-01 12:00", "carCategory": "SUV",
+        })
+    finally:
+        tracing.set_exporter(None)
+    server = exporter.by_name("POST /api/check-availability")[0]
+    assert server.trace_id == "a" * 32 and server.parent_id == "b" * 16
+
+
+def test_disabled_tracing_uses_noop_span():
+    assert not tracing.enabled()
+    with tracing.start_span("anything") as span:
+        assert span is tracing.NOOP_SPAN
+    assert tracing.current_traceparent() is None
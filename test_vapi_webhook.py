@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+
+import pytest
+
+import main
+import vapi_tools
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "vapi")
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+def _results(response):
+    assert response.status_code == 200
+    return {r["toolCallId"]: r for r in response.json()["results"]}
+
+
+def test_parallel_fixture_answers_every_call_in_order(client):
+    r = client.post("/api/vapi/tool-calls", json=_fixture("tool_calls_parallel.json"))
+    assert [x["toolCallId"] for x in r.json()["results"]] == ["call_avail_suv", "call_avail_sedan", "call_context", "call_lookup"]
+    results = _results(r)
+    suv = json.loads(results["call_avail_suv"]["result"])
+    assert suv["available"] is True and suv["availableCount"] == 2
+    assert json.loads(results["call_avail_sedan"]["result"])["availableCount"] == 2
+    assert json.loads(results["call_context"]["result"])["knownCaller"] is False
+    assert json.loads(results["call_lookup"]["result"])["success"] is False
+
+
+def test_create_booking_fixture_with_legacy_shape_and_errors(client):
+    results = _results(client.post("/api/vapi/tool-calls", json=_fixture("tool_calls_create_booking.json")))
+    created = json.loads(results["call_create"]["result"])
+    assert created["success"] is True and created["assignedCar"]["category"] == "SUV"
+    assert "Invalid arguments" in results["call_bad"]["error"]
+    assert results["call_unknown"]["error"] == "Unknown tool: transfer_call"
+
+    # Same handler as the REST endpoint: the booking is visible there too.
+    lookup = client.post("/api/get-booking", json={"bookingReference": created["bookingReference"]}).json()
+    assert lookup["success"] is True
+
+
+def test_malformed_json_arguments_fail_only_that_call(client):
+    body = {"message": {"type": "tool-calls", "toolCalls": [
+        {"id": "call_broken", "function": {"name": "check_availability", "arguments": '{"carCategory": "SUV",'}},
+        {"id": "call_ok", "function": {"name": "check_availability", "arguments": json.dumps({
+            "carCategory": "SUV", "pickupDateTime": "2026-12-05 10:00", "returnDateTime": "2026-12-05 14:00"})}},
+    ]}}
+    results = _results(client.post("/api/vapi/tool-calls", json=body))
+    assert results["call_broken"]["error"].startswith("Invalid arguments: malformed JSON")
+    assert json.loads(results["call_ok"]["result"])["availableCount"] == 2
+
+
+def test_non_tool_messages_are_acknowledged(client):
+    r = client.post("/api/vapi/tool-calls", json={"message": {"type": "status-update", "status": "ended"}})
+    assert r.status_code == 200 and r.json() == {}
+
+
+def test_secret_is_enforced_when_configured(client, monkeypatch):
+    monkeypatch.setenv("VAPI_SECRET", "s3cret")
+    body = _fixture("tool_calls_parallel.json")
+    assert client.post("/api/vapi/tool-calls", json=body).status_code == 401
+    assert client.post("/api/vapi/tool-calls", json=body, headers={"X-Vapi-Secret": "s3cret"}).status_code == 200
+
+
+def test_dispatch_runs_calls_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def wait(req):
+        barrier.wait()  # deadlocks unless all three calls run at once
+        return {"ok": True}
+
+    tools = {"wait": vapi_tools.Tool(main.CheckAvailabilityRequest, wait)}
+    args = {"pickupDateTime": "x", "returnDateTime": "y", "carCategory": "SUV"}
+    calls = [vapi_tools.ToolCall(f"c{i}", "wait", args) for i in range(3)]
+    results = vapi_tools.dispatch(calls, tools)
+    assert [r["toolCallId"] for r in results] == ["c0", "c1", "c2"]
+    assert all(json.loads(r["result"]) == {"ok": True} for r in results)
+
+
+@pytest.mark.parametrize("name", ["create-booking", "createBooking", "create_booking", " Create_Booking "])
+def test_tool_name_normalization(name):
+    assert vapi_tools.normalize_tool_name(name) == "create_booking"
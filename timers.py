@@ -0,0 +1,62 @@
+"""Heap-based expiry timer: run a callback for each key at its deadline.
+
+One daemon thread sleeps until the earliest deadline in a min-heap, so the
+cost is O(log n) per scheduled key and nothing polls or scans a table.
+Cancelling is lazy: the callback must tolerate keys that are already gone
+(e.g. a hold that was converted or released before it expired).
+
+The thread is started on first use and restarted in a forked worker, where
+the parent's thread does not exist.
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryTimer:
+    def __init__(self, callback: Callable[[Hashable], None], name: str = "expiry-timer"):
+        self.callback = callback
+        self.name = name
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self.fired = 0
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Run callback(key) at `deadline` (a time.time() timestamp)."""
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), key))
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                deadline, _, key = self._heap[0]
+                delay = deadline - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+            try:
+                self.callback(key)
+                self.fired += 1
+            except Exception:
+                logger.exception("%s callback failed for %r", self.name, key)
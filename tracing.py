@@ -0,0 +1,340 @@
+"""Minimal OpenTelemetry-style tracing: spans for requests, handlers, SQL and calendar sync.
+
+No SDK needed; span/trace ids and the `traceparent` header follow W3C Trace
+Context, and finished spans are written as one JSON object per line
+(field names as in OTLP/JSON) so they can be read offline or converted.
+
+TRACE_EXPORTER selects the sink: "none" (default, tracing off), "console"
+(stderr) or "file" (TRACE_FILE, default traces.jsonl). With tracing off,
+start_span() returns a shared no-op span and the SQL hooks return
+immediately.
+
+The current span lives in a ContextVar, so it follows a request into the
+threadpool that runs sync handlers. Work that outlives the request (the
+calendar sync background task) should not rely on that: pass
+current_traceparent() along explicitly and open its span with
+start_span(..., traceparent=...).
+"""
+import functools
+import inspect
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str = "INTERNAL", attributes: Optional[dict] = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = "UNSET"
+        self._token = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if _exporter is not None:
+            _exporter.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+class _NoopSpan:
+    traceparent = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+# --- Exporters ---
+
+class ConsoleExporter:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str, separators=(",", ":"))
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class FileExporter(ConsoleExporter):
+    def __init__(self, path: str):
+        super().__init__(open(path, "a", buffering=1, encoding="utf-8"))
+
+
+class InMemoryExporter:
+    """Collects finished spans; used by tests."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def by_name(self, name: str) -> List[Span]:
+        return [s for s in self.spans if s.name == name]
+
+
+_exporter = None
+_current: ContextVar[Optional[Span]] = ContextVar("rentacar_span", default=None)
+
+
+def set_exporter(exporter) -> None:
+    """Install an exporter (None turns tracing off)."""
+    global _exporter
+    _exporter = exporter
+
+
+def configure_from_env() -> None:
+    kind = os.getenv("TRACE_EXPORTER", "none").lower()
+    if kind == "console":
+        set_exporter(ConsoleExporter())
+    elif kind == "file":
+        set_exporter(FileExporter(os.getenv("TRACE_FILE", "traces.jsonl")))
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+# --- Context ---
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2]
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_traceparent() -> Optional[str]:
+    span = _current.get()
+    return span.traceparent if span is not None else None
+
+
+def begin_span(name: str, kind: str = "INTERNAL", traceparent: Optional[str] = None, attributes: Optional[dict] = None):
+    """Start a span and make it current; caller must pass it to finish_span()."""
+    if _exporter is None:
+        return NOOP_SPAN
+    remote = parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id = remote
+    else:
+        parent = _current.get()
+        trace_id, parent_id = (parent.trace_id, parent.span_id) if parent else (secrets.token_hex(16), None)
+    span = Span(name, trace_id, parent_id, kind, attributes)
+    span._token = _current.set(span)
+    return span
+
+
+def finish_span(span) -> None:
+    if span is NOOP_SPAN:
+        return
+    span.end()
+    if span._token is not None:
+        try:
+            _current.reset(span._token)
+        except ValueError:
+            # Ended from a different context (e.g. after the response was sent).
+            pass
+        span._token = None
+
+
+@contextmanager
+def start_span(name: str, kind: str = "INTERNAL", traceparent: Optional[str] = None, **attributes):
+    span = begin_span(name, kind, traceparent, attributes)
+    try:
+        yield span
+    except BaseException as exc:
+        span.record_exception(exc)
+        raise
+    finally:
+        finish_span(span)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator: run the function inside a span (named after it by default)."""
+    def decorate(fn):
+        span_name = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _exporter is None:
+                    return await fn(*args, **kwargs)
+                with start_span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return fn(*args, **kwargs)
+            with start_span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def wrap_endpoint(fn):
+    """Handler span named after the endpoint function (used by main's route class)."""
+    return traced(f"handler {fn.__name__}")(fn)
+
+
+# --- SQL ---
+
+_db_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Only statements issued inside a trace get a span (no root spans for startup/migrations).
+    if _exporter is None or _current.get() is None:
+        return
+    span = begin_span("db.query", kind="CLIENT", attributes={
+        "db.system": conn.dialect.name,
+        "db.statement": statement[:500],
+        "db.operation": statement.lstrip().split(" ", 1)[0].upper(),
+    })
+    conn.info.setdefault("_trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("_trace_spans")
+    if spans:
+        finish_span(spans.pop())
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("_trace_spans") if conn is not None else None
+    if spans:
+        span = spans.pop()
+        span.record_exception(exception_context.original_exception)
+        finish_span(span)
+
+
+def install_db_tracing() -> None:
+    """Listen on every Engine, like metrics.install_db_metrics()."""
+    global _db_installed
+    if _db_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _db_installed = True
+
+
+# --- HTTP middleware ---
+
+class TracingMiddleware:
+    """Pure ASGI middleware: one SERVER span per request, honouring an incoming traceparent.
+
+    The span ends when the last body chunk is sent (like PrometheusMiddleware),
+    so background tasks are not counted in the request span; the response
+    carries the traceparent of the request span.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        incoming = headers.get(b"traceparent")
+        span = begin_span(
+            f"{scope['method']} {scope['path']}",
+            kind="SERVER",
+            traceparent=incoming.decode("latin-1") if incoming else None,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        )
+
+        def finish():
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.route", route)
+            span.end()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                span.set_attribute("http.status_code", status)
+                if status >= 500:
+                    span.status = "ERROR"
+                message["headers"] = list(message.get("headers", [])) + [(b"traceparent", span.traceparent.encode())]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            finish()
+            finish_span(span)
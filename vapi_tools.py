@@ -0,0 +1,130 @@
+"""Vapi server-tool webhook: parse a `tool-calls` message and dispatch its calls.
+
+A single assistant turn can carry several tool calls. Vapi sends them in one
+POST:
+
+    {"message": {"type": "tool-calls",
+                 "toolCallList": [{"id": "call_1", "name": "check_availability",
+                                   "arguments": {...}}, ...]}}
+
+(older payloads use "toolCalls" with OpenAI-style {"function": {"name",
+"arguments"}}; arguments may be a JSON string). The reply must list one
+entry per call, in order:
+
+    {"results": [{"toolCallId": "call_1", "result": "<json>"}, ...]}
+
+or {"toolCallId": ..., "error": "..."} for a failed call. Independent calls
+are run concurrently on a small thread pool; each runs in a copy of the
+request's context so metrics/tracing still attribute them to the webhook.
+"""
+import contextvars
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from fastapi.responses import Response
+from pydantic import BaseModel, ValidationError
+
+MAX_WORKERS = int(os.getenv("VAPI_TOOL_WORKERS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class ToolCall:
+    __slots__ = ("id", "name", "arguments", "error")
+
+    def __init__(self, id: str, name: str, arguments: dict, error: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.arguments = arguments
+        # Set when the call itself could not be parsed; answered without running the tool.
+        self.error = error
+
+
+def normalize_tool_name(name: str) -> str:
+    """create-booking / createBooking / create_booking -> create_booking."""
+    name = re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name.strip())
+    return name.replace("-", "_").lower()
+
+
+def _arguments(raw) -> dict:
+    """Arguments as a dict; raises ValueError for a JSON string that does not decode."""
+    if isinstance(raw, str):
+        raw = json.loads(raw) if raw.strip() else {}
+    return raw if isinstance(raw, dict) else {}
+
+
+def parse_tool_calls(body: dict) -> List[ToolCall]:
+    message = body.get("message") or {}
+    raw_calls = message.get("toolCallList") or message.get("toolCalls") or []
+    calls = []
+    for raw in raw_calls:
+        fn = raw.get("function") or {}
+        name = raw.get("name") or fn.get("name") or ""
+        args = raw.get("arguments") if "arguments" in raw else fn.get("arguments")
+        try:
+            arguments, error = _arguments(args), None
+        except ValueError as e:  # json.JSONDecodeError
+            arguments, error = {}, f"Invalid arguments: malformed JSON ({e})"
+        calls.append(ToolCall(raw.get("id", ""), normalize_tool_name(name), arguments, error))
+    return calls
+
+
+class Tool:
+    """A webhook-callable tool: arguments are validated into `request_model`, then `fn(req)` runs.
+
+    `response_model` shapes plain-dict results the way the REST route's
+    response_model does, so both paths return the same JSON.
+    """
+
+    def __init__(self, request_model, fn: Callable, response_model=None):
+        self.request_model = request_model
+        self.fn = fn
+        self.response_model = response_model
+
+    def result_payload(self, value) -> str:
+        """Handler return value (dict, model or JSON Response) -> JSON string for Vapi."""
+        if isinstance(value, Response):
+            return value.body.decode("utf-8")
+        if isinstance(value, dict) and self.response_model is not None:
+            value = self.response_model.model_validate(value)
+        if isinstance(value, BaseModel):
+            return value.model_dump_json(by_alias=True)
+        return json.dumps(value, default=str)
+
+
+def run_call(call: ToolCall, tools: Dict[str, Tool]) -> dict:
+    if call.error is not None:
+        return {"toolCallId": call.id, "error": call.error}
+    tool = tools.get(call.name)
+    if tool is None:
+        return {"toolCallId": call.id, "error": f"Unknown tool: {call.name}"}
+    try:
+        req = tool.request_model.model_validate(call.arguments)
+    except ValidationError as e:
+        return {"toolCallId": call.id, "error": f"Invalid arguments: {e.errors(include_url=False)}"}
+    try:
+        return {"toolCallId": call.id, "result": tool.result_payload(tool.fn(req))}
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        return {"toolCallId": call.id, "error": str(detail)}
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="vapi-tool")
+    return _executor
+
+
+def dispatch(calls: List[ToolCall], tools: Dict[str, Tool]) -> List[dict]:
+    """Run all calls (concurrently when there is more than one); results keep call order."""
+    if len(calls) <= 1:
+        return [run_call(c, tools) for c in calls]
+    futures = [
+        _pool().submit(contextvars.copy_context().run, run_call, c, tools)
+        for c in calls
+    ]
+    return [f.result() for f in futures]